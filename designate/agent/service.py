@@ -50,6 +50,12 @@ class Service(service.Service):
             cfg.CONF['service:agent'].listen,
             cfg.CONF['service:agent'].tcp_backlog,
             cfg.CONF['service:agent'].tcp_recv_timeout,
+            udp_recv_batch_size=cfg.CONF['service:agent'].udp_recv_batch_size,
+            udp_queue_size=cfg.CONF['service:agent'].udp_queue_size,
+            udp_queue_threads=cfg.CONF['service:agent'].udp_queue_threads,
+            tcp_pipeline_size=cfg.CONF['service:agent'].tcp_pipeline_size,
+            tcp_max_conns_per_client=(
+                cfg.CONF['service:agent'].tcp_max_conns_per_client),
         )
 
         backend_driver = cfg.CONF['service:agent'].backend_driver
@@ -14,6 +14,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 import pecan
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from designate import exceptions
@@ -21,15 +22,98 @@ from designate import utils
 from designate.api.v2.controllers import common
 from designate.api.v2.controllers import rest
 from designate.objects import RecordSet
+from designate.objects import RecordSetList
 from designate.objects.adapters import DesignateAdapter
 
+CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+class RecordSetsBatchController(rest.RestController):
+
+    @pecan.expose(template='json:', content_type='application/json')
+    @utils.validate_uuid('zone_id')
+    def post_all(self, zone_id):
+        """Create, Update and Delete RecordSets"""
+        request = pecan.request
+        response = pecan.response
+        context = request.environ['context']
+
+        body = request.body_dict
+
+        if not isinstance(body, dict):
+            raise exceptions.BadRequest('The body must be an object')
+
+        invalid = set(body) - set(['create', 'update', 'delete'])
+        if invalid:
+            raise exceptions.BadRequest(
+                'Invalid keys %s' % ', '.join(sorted(invalid)))
+
+        for key in ('create', 'update', 'delete'):
+            if not isinstance(body.get(key, []), list):
+                raise exceptions.BadRequest('%s must be a list' % key)
+
+        max_size = CONF['service:api'].max_recordset_batch_size
+        if sum(len(body.get(key, [])) for key in body) > max_size:
+            raise exceptions.BadRequest(
+                'A batch may change at most %d recordsets' % max_size)
+
+        create = RecordSetList()
+        for values in body.get('create', []):
+            recordset = DesignateAdapter.parse('API_v2', values, RecordSet())
+
+            recordset.validate()
+
+            # SOA recordsets cannot be created manually
+            if recordset.type == 'SOA':
+                raise exceptions.BadRequest(
+                    "Creating a SOA recordset is not allowed")
+
+            create.append(recordset)
+
+        update = RecordSetList()
+        for values in body.get('update', []):
+            values = dict(values)
+            recordset_id = values.pop('id', None)
+            if not utils.is_uuid_like(recordset_id):
+                raise exceptions.InvalidUUID(
+                    'Invalid UUID recordset_id: %s' % recordset_id)
+
+            # Central fetches and checks the existing recordsets at once,
+            # only send the changes
+            recordset = DesignateAdapter.parse('API_v2', values, RecordSet())
+            if 'records' not in values:
+                recordset.obj_reset_changes(['records'])
+            recordset.id = recordset_id
+
+            update.append(recordset)
+
+        delete = body.get('delete', [])
+        for recordset_id in delete:
+            if not utils.is_uuid_like(recordset_id):
+                raise exceptions.InvalidUUID(
+                    'Invalid UUID recordset_id: %s' % recordset_id)
+
+        # Persist the resources
+        recordsets = self.central_api.batch_recordsets(
+            context, zone_id, create=create, update=update, delete=delete)
+
+        response.status_int = 202
+
+        return {
+            'recordsets': [
+                DesignateAdapter.render('API_v2', recordset, request=request)
+                for recordset in recordsets
+            ]
+        }
+
+
 class RecordSetsController(rest.RestController):
     SORT_KEYS = ['created_at', 'id', 'updated_at', 'zone_id', 'tenant_id',
                  'name', 'type', 'ttl', 'records']
 
+    batch = RecordSetsBatchController()
+
     @pecan.expose(template='json:', content_type='application/json')
     @utils.validate_uuid('zone_id', 'recordset_id')
     def get_one(self, zone_id, recordset_id):
@@ -17,6 +17,7 @@ import pecan
 from oslo_log import log as logging
 
 from designate import exceptions
+from designate import export_store
 from designate import policy
 from designate import utils
 from designate.api.v2.controllers import rest
@@ -37,8 +38,28 @@ class ZoneExportController(rest.RestController):
         export = self.central_api.get_zone_export(context, export_id)
 
         if export.location and export.location.startswith('designate://'):
-            return self.central_api.\
-                export_zone(context, export['zone_id'])
+            # Rendering the export checks the caller can still see the zone,
+            # so does sending its stored copy
+            self.central_api.get_zone(context, export['zone_id'])
+
+            try:
+                chunks = export_store.get_export_store().read(export_id)
+            except exceptions.ZoneExportNotFound:
+                # The export was made before exports were stored, or the
+                # store isn't shared with the Worker which wrote it, render
+                # it again
+                LOG.warning('Zone export %s is not in the export store, '
+                            'rendering it again. The export store must be '
+                            'shared by the Worker and API services',
+                            export_id)
+                return self.central_api.\
+                    export_zone(context, export['zone_id'])
+
+            # Send the export as it is read, in chunks
+            response = pecan.response
+            response.content_type = 'text/dns'
+            response.app_iter = chunks
+            return response
         else:
             msg = 'Zone can not be exported synchronously'
             raise exceptions.BadRequest(msg)
@@ -129,6 +150,14 @@ class ZoneExportsController(rest.RestController):
         zone_export = self.central_api.delete_zone_export(
             context, zone_export_id)
 
+        # The export is gone either way, don't fail the request if its
+        # stored copy can't be removed
+        try:
+            export_store.get_export_store().delete(zone_export_id)
+        except Exception:
+            LOG.exception('Failed to delete the stored copy of %s',
+                          zone_export)
+
         LOG.info("Deleted %(zone_export)s", {'zone_export': zone_export})
 
         response.status_int = 204
@@ -0,0 +1,308 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import re
+import time
+
+from oslo_config import cfg
+from oslo_log import log as logging
+import oslo_messaging
+
+LOG = logging.getLogger(__name__)
+
+# The most repeats a blacklist pattern evaluated by re may have. re tries
+# every way of splitting the name between them, so each repeat raises the
+# degree of the time a search can take.
+MAX_REPEATS = 2
+
+# A literal name, with its dots escaped
+_LITERAL = r'(?:[^.^$*+?{}\[\]\\|()]|\\[.^$*+?{}\[\]\\|()\-])+'
+
+# A literal name anchored at the end, which may also be anchored at the
+# beginning or be preceded by any number of labels of a character class
+_SUFFIX = re.compile(
+    r'(?P<begin>\^)?'
+    r'(?:\((?:\?:)?(?P<label>\[[^\]]*\])(?P<repeat>[+*])\\\.\)\*)?'
+    r'(?P<literal>%s)\$' % _LITERAL)
+
+# The tokens of a pattern which tell how re backtracks over it. Any other
+# character is an atom of its own.
+_TOKEN = re.compile(
+    r'(?P<reference>\\[1-9]|\(\?P=|\(\?\(|\(\?<?[=!])|'
+    r'(?P<escape>\\.)|'
+    r'(?P<set>\[\^?\]?(?:\\.|[^\]\\])*\])|'
+    r'(?P<comment>\(\?#[^)]*\))|'
+    r'(?P<flags>\(\?(?P<global_flags>[aiLmsux]+)\))|'
+    r'(?P<open>\((?:\?(?:P<\w+>|'
+    r'(?P<scoped_flags>[aiLmsux]*(?:-[imsx]+)?):))?)|'
+    r'(?P<close>\))|'
+    r'(?P<alternation>\|)|'
+    r'(?P<quantifier>(?:[*+?]|\{(?!\})(?P<min>\d*)(?P<comma>,?)(?P<max>\d*)\})'
+    r'[?+]?)',
+    re.DOTALL)
+
+
+class SuffixTrie(object):
+    """A trie of the suffixes of names, matched one character at a time
+    from the end of the name.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, suffix, value):
+        node = self.root
+        for char in reversed(suffix):
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def find(self, name):
+        """Yield (index, value) for every suffix of name in the trie, from
+        the shortest, where name[index:] is the suffix value was added with
+        """
+        node = self.root
+        index = len(name)
+        while True:
+            for value in node.get(None, ()):
+                yield index, value
+            if index == 0:
+                return
+            index -= 1
+            node = node.get(name[index])
+            if node is None:
+                return
+
+
+class MatcherCache(object):
+    """Keep the matcher built by load(context), building it again once it is
+    older than the ttl_option of [service:central], or has been
+    invalidated.
+    """
+
+    def __init__(self, load, ttl_option):
+        self.load = load
+        self.ttl_option = ttl_option
+        self.matcher = None
+        self.loaded_at = 0
+
+    def get(self, context):
+        ttl = cfg.CONF['service:central'][self.ttl_option]
+        if self.matcher is None or time.time() - self.loaded_at >= ttl:
+            self.matcher = self.load(context)
+            self.loaded_at = time.time()
+        return self.matcher
+
+    def invalidate(self):
+        self.matcher = None
+
+
+class MatcherCacheEndpoint(object):
+    """Notification endpoint which invalidates a MatcherCache whenever the
+    resources its matcher is built from change, through any central process
+    """
+
+    def __init__(self, matcher_cache, event_type):
+        self.matcher_cache = matcher_cache
+        self.filter_rule = oslo_messaging.NotificationFilter(
+            event_type=event_type)
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        LOG.debug('Invalidating the %(cache)s cache after %(event_type)s',
+                  {'cache': self.matcher_cache.ttl_option,
+                   'event_type': event_type})
+        self.matcher_cache.invalidate()
+
+
+class TldMatcher(object):
+    """Match zone names against the TLDs, with a suffix trie of their
+    labels.
+    """
+
+    def __init__(self, tlds):
+        self.tlds = set(tlds)
+        self.names = set(tld.lower() for tld in self.tlds)
+        self.trie = SuffixTrie()
+        for tld in self.tlds:
+            self.trie.add('.' + tld, tld)
+
+    def has_tld(self, zone_name):
+        """Whether the zone name ends with one of the TLDs"""
+        return any(self.trie.find('.' + zone_name.strip('.')))
+
+    def is_tld(self, zone_name):
+        """Whether the zone name is one of the TLDs, ignoring case"""
+        return zone_name.rstrip('.').lower() in self.names
+
+
+class BlacklistMatcher(object):
+    """Match zone names against all of the blacklist patterns at once.
+
+    Each pattern keeps the re.search semantics it always had, but is
+    compiled once, into the cheapest form that evaluates it:
+
+    * Literal names anchored at the end (``example\\.com\\.$``), anchored at
+      both ends, or preceded by labels (``^([A-Za-z0-9_\\-]+\\.)*``) go in a
+      suffix trie, walked once per name.
+    * The other patterns are joined in one regex, apart from the ones with
+      global flags, which are compiled on their own.
+
+    Patterns which could make re backtrack catastrophically, as rejected by
+    compile_pattern, are ignored.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.trie = SuffixTrie()
+        self.regexes = []
+
+        combined = []
+        for pattern in self.patterns:
+            try:
+                regex = compile_pattern(pattern)
+            except ValueError as e:
+                LOG.error('Ignoring the blacklist pattern %(pattern)s: '
+                          '%(error)s', {'pattern': pattern, 'error': e})
+                continue
+
+            if self._add_suffix(pattern):
+                continue
+
+            if regex.flags & ~re.UNICODE or regex.groupindex:
+                self.regexes.append(regex)
+            else:
+                combined.append('(?:%s)' % pattern)
+
+        if combined:
+            self.regexes.insert(0, re.compile('|'.join(combined)))
+
+    def _add_suffix(self, pattern):
+        suffix = _suffix(pattern)
+        if suffix is None:
+            return False
+        self.trie.add(*suffix)
+        return True
+
+    def search(self, name):
+        """Whether any of the patterns matches name"""
+        names = [name]
+        if name.endswith('\n'):
+            # $ also matches before a newline at the end
+            names.append(name[:-1])
+        for suffix_name in names:
+            for index, check in self.trie.find(suffix_name):
+                if check is None or check(suffix_name[:index]):
+                    return True
+
+        return any(regex.search(name) for regex in self.regexes)
+
+
+def compile_pattern(pattern):
+    """Compile a blacklist pattern, unless re could backtrack over it for
+    long.
+
+    That is when a repeat contains another repeat, an optional part or an
+    alternation, when there are more than MAX_REPEATS repeats, or with
+    backreferences and lookarounds. Literal names, even preceded by labels,
+    are matched without re and always accepted.
+
+    :raises: ValueError if the pattern is invalid or could backtrack
+    """
+    try:
+        regex = re.compile(pattern)
+    except re.error as e:
+        raise ValueError('Invalid pattern: %s' % e)
+
+    if _suffix(pattern) is not None:
+        return regex
+
+    # Whether each open group has repeats, optional parts or alternations
+    groups = [False]
+    # Whether the last atom is a group which has any
+    last = False
+    repeats = 0
+    index = 0
+    while index < len(pattern):
+        token = _TOKEN.match(pattern, index)
+        if token is None:
+            last = False
+            index += 1
+            continue
+        index = token.end()
+
+        kind = token.lastgroup
+        if kind == 'reference':
+            raise ValueError('Backreferences and lookarounds are not '
+                             'supported')
+        if 'x' in (token.group('global_flags') or
+                   token.group('scoped_flags') or ''):
+            raise ValueError('The verbose flag is not supported')
+
+        if kind == 'open':
+            groups.append(False)
+        elif kind == 'close':
+            last = groups.pop()
+            groups[-1] = groups[-1] or last
+            continue
+        elif kind == 'alternation':
+            groups[-1] = True
+        elif kind == 'quantifier' and _is_repeat(token):
+            if last:
+                raise ValueError('Nested repeats are not supported')
+            repeats += 1
+            if repeats > MAX_REPEATS:
+                raise ValueError('More than %d repeats are not supported' %
+                                 MAX_REPEATS)
+        if kind == 'quantifier':
+            groups[-1] = True
+        last = False
+
+    return regex
+
+
+def _is_repeat(quantifier):
+    """Whether a quantifier token may match its atom more than once"""
+    if quantifier.group('quantifier')[0] in '*+':
+        return True
+    if quantifier.group('quantifier')[0] == '?':
+        return False
+    if quantifier.group('comma') and not quantifier.group('max'):
+        return True
+    return int(quantifier.group('max') or quantifier.group('min')) > 1
+
+
+def _suffix(pattern):
+    """The suffix and prefix check a pattern of a literal name is added to
+    the trie with, or None if the pattern isn't one
+    """
+    match = _SUFFIX.fullmatch(pattern)
+    if match is None:
+        return None
+    literal = re.sub(r'\\(.)', r'\1', match.group('literal'))
+
+    if match.group('label') is None:
+        return literal, _exact if match.group('begin') else None
+
+    if not match.group('begin'):
+        # The labels may match nothing, before any suffix
+        return literal, None
+
+    label = re.compile(match.group('label'))
+    if label.match('.') or label.match('\n'):
+        return None
+    # The label can't match a dot, so this is linear in the length of the
+    # prefix
+    labels = re.compile(
+        '(?:%s%s\\.)*' % (label.pattern, match.group('repeat')))
+    return literal, lambda prefix: bool(labels.fullmatch(prefix))
+
+
+def _exact(prefix):
+    return prefix == ''
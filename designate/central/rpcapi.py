@@ -62,8 +62,10 @@ class CentralAPI(object):
         6.0 - Renamed domains to zones
         6.1 - Add ServiceStatus methods
         6.2 - Changed 'find_recordsets' method args
+        6.3 - Add zone journal purging task
+        6.4 - Add batch_recordsets
     """
-    RPC_API_VERSION = '6.2'
+    RPC_API_VERSION = '6.4'
 
     # This allows us to mark some methods as not logged.
     # This can be for a few reasons - some methods my not actually call over
@@ -76,7 +78,7 @@ class CentralAPI(object):
 
         target = messaging.Target(topic=self.topic,
                                   version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='6.2')
+        self.client = rpc.get_client(target, version_cap='6.4')
 
     @classmethod
     def get_instance(cls):
@@ -172,6 +174,10 @@ class CentralAPI(object):
         return self.client.call(context, 'purge_zones',
                                 criterion=criterion, limit=limit)
 
+    def purge_zone_journal(self, context, criterion, max_serials):
+        return self.client.call(context, 'purge_zone_journal',
+                                criterion=criterion, max_serials=max_serials)
+
     def count_zones(self, context, criterion=None):
         return self.client.call(context, 'count_zones', criterion=criterion)
 
@@ -231,6 +237,12 @@ class CentralAPI(object):
                                 recordset_id=recordset_id,
                                 increment_serial=increment_serial)
 
+    def batch_recordsets(self, context, zone_id, create=None, update=None,
+                         delete=None):
+        return self.client.call(context, 'batch_recordsets',
+                                zone_id=zone_id, create=create,
+                                update=update, delete=delete)
+
     def count_recordsets(self, context, criterion=None):
         return self.client.call(context, 'count_recordsets',
                                 criterion=criterion)
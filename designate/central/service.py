@@ -14,14 +14,13 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
-import re
 import collections
+import contextlib
 import copy
 import functools
 import threading
 import itertools
 import string
-import signal
 import random
 from random import SystemRandom
 import time
@@ -48,6 +47,7 @@ from designate import service
 from designate import scheduler
 from designate import storage
 from designate import utils
+from designate.central import matchers
 from designate.mdns import rpcapi as mdns_rpcapi
 from designate.storage import transaction
 from designate.storage import transaction_shallow_copy
@@ -118,6 +118,18 @@ def synchronized_zone(zone_arg=1, new_zone=False):
             if zone_id in ZONE_LOCKS.held:
                 return f(self, *args, **kwargs)
 
+            if (cfg.CONF['service:central'].zone_concurrency ==
+                    'optimistic'):
+                if not new_zone:
+                    return _optimistic_zone_call(
+                        self, zone_id, f, args, kwargs)
+                # Two zones with the same name are kept apart by the unique
+                # name of the zones table, but the checks of a new zone
+                # against its subzones and superzones can't be made part of
+                # a write. Only the creations of zones which could be
+                # subzones of one another take the same lock.
+                lock_name = _new_zone_lock_name(args, kwargs)
+
             with self.coordination.get_lock(lock_name):
                 try:
                     ZONE_LOCKS.held.add(zone_id)
@@ -132,7 +144,76 @@ def synchronized_zone(zone_arg=1, new_zone=False):
     return outer
 
 
+def _new_zone_lock_name(args, kwargs):
+    """The name of the lock a new zone is created under with optimistic
+    zone concurrency.
+
+    Zone names have at least two labels, so a zone and all of its subzones
+    end with the same two labels.
+    """
+    for arg in itertools.chain(kwargs.values(), args):
+        if isinstance(arg, objects.Zone) and arg.obj_attr_is_set('name'):
+            labels = (arg.name or '').lower().rstrip('.').split('.')
+            return 'create-zone-%s.' % '.'.join(labels[-2:])
+    return 'create-new-zone'
+
+
+def _optimistic_zone_call(service, zone_id, f, args, kwargs):
+    """Call f without taking a lock, retrying it when it conflicts with a
+    concurrent change to the zone.
+
+    The version of the zone is read before each attempt, and f only updates
+    the zone while it still has that version (see _update_zone_row).
+    """
+    if not hasattr(ZONE_LOCKS, 'versions'):
+        ZONE_LOCKS.versions = {}
+
+    retries = cfg.CONF['service:central'].zone_concurrency_retries
+    attempt = 0
+
+    # f changes the objects it is given, keep the arguments as they were
+    # for the retries. The context is left alone.
+    original = None
+    if retries and not storage.in_transaction():
+        original = copy.deepcopy((args[1:], kwargs))
+
+    while True:
+        if attempt:
+            call_args, kwargs = original
+            if attempt < retries:
+                call_args, kwargs = copy.deepcopy(original)
+            args = args[:1] + call_args
+        ZONE_LOCKS.held.add(zone_id)
+        try:
+            if zone_id:
+                context = args[0].elevated(all_tenants=True)
+                try:
+                    ZONE_LOCKS.versions[zone_id] = (
+                        service.storage.get_zone_version(context, zone_id))
+                except exceptions.ZoneNotFound:
+                    # Leave it to f to handle the missing zone
+                    pass
+            return f(service, *args, **kwargs)
+        except exceptions.ZoneVersionConflict:
+            attempt += 1
+            if attempt > retries or storage.in_transaction():
+                raise
+            LOG.debug('Zone %(zone_id)s was changed concurrently, retrying '
+                      '(attempt %(attempt)d)',
+                      {'zone_id': zone_id, 'attempt': attempt})
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+        finally:
+            ZONE_LOCKS.held.discard(zone_id)
+            ZONE_LOCKS.versions.pop(zone_id, None)
+
+
 def notification(notification_type):
+    """Emit a notification_type notification of the result of the call
+
+    The notifications are buffered until the outermost decorated call
+    returns. With notification_type None, nothing is emitted for the call
+    itself, and it queues its own notifications with _queue_notification.
+    """
     def outer(f):
         @functools.wraps(f)
         def notification_wrapper(self, *args, **kwargs):
@@ -151,17 +232,9 @@ def notification(notification_type):
                 # Call the wrapped function
                 result = f(self, *args, **kwargs)
 
-                # Feed the args/result to a notification plugin
-                # to determine what is emitted
-                payloads = notifications.get_plugin().emit(
-                    notification_type, context, result, args, kwargs)
-
-                # Enqueue the notification
-                for payload in payloads:
-                    LOG.debug('Queueing notification for %(type)s ',
-                              {'type': notification_type})
-                    NOTIFICATION_BUFFER.queue.appendleft(
-                        (context, notification_type, payload,))
+                if notification_type is not None:
+                    _queue_notification(
+                        notification_type, context, result, args, kwargs)
 
                 return result
 
@@ -184,8 +257,22 @@ def notification(notification_type):
     return outer
 
 
+def _queue_notification(notification_type, context, result, args, kwargs):
+    # Feed the args/result to a notification plugin
+    # to determine what is emitted
+    payloads = notifications.get_plugin().emit(
+        notification_type, context, result, args, kwargs)
+
+    # Enqueue the notification
+    for payload in payloads:
+        LOG.debug('Queueing notification for %(type)s ',
+                  {'type': notification_type})
+        NOTIFICATION_BUFFER.queue.appendleft(
+            (context, notification_type, payload,))
+
+
 class Service(service.RPCService):
-    RPC_API_VERSION = '6.2'
+    RPC_API_VERSION = '6.4'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -193,6 +280,10 @@ class Service(service.RPCService):
         self._scheduler = None
         self._storage = None
         self._quota = None
+        self._blacklists = matchers.MatcherCache(
+            self._load_blacklists, 'blacklist_cache_ttl')
+        self._tlds = matchers.MatcherCache(self._load_tlds, 'tld_cache_ttl')
+        self._cache_listener = None
 
         super(Service, self).__init__(
             self.service_name, cfg.CONF['service:central'].topic,
@@ -238,12 +329,48 @@ class Service(service.RPCService):
                         "configured")
 
         super(Service, self).start()
+        self._start_cache_listener()
         self.coordination.start()
 
     def stop(self, graceful=True):
         self.coordination.stop()
+
+        try:
+            if self._cache_listener:
+                self._cache_listener.stop()
+        except Exception as e:
+            LOG.warning(
+                'Unable to gracefully stop the notification listener: %s', e
+            )
+
         super(Service, self).stop(graceful)
 
+    def _start_cache_listener(self):
+        # Invalidate the cached blacklists and TLDs whenever any central
+        # process notifies a change to them.
+        targets = [
+            messaging.Target(topic=topic)
+            for topic in cfg.CONF.oslo_messaging_notifications.topics
+        ]
+        endpoints = [
+            matchers.MatcherCacheEndpoint(
+                self._blacklists, r'^dns\.blacklist\.(create|update|delete)$'),
+            matchers.MatcherCacheEndpoint(
+                self._tlds, r'^dns\.tld\.(create|update|delete)$'),
+        ]
+
+        # Each member of a listener pool only receives a share of the
+        # notifications, so every process listens in a pool of its own. The
+        # pools are numbered by worker so that restarts reuse their queues.
+        prefix = (cfg.CONF['service:central'].cache_listener_pool or
+                  'designate-central-%s' % cfg.CONF.host)
+        pool = '%s-%d' % (prefix, utils.get_worker_slot(prefix))
+
+        self._cache_listener = rpc.get_notification_listener(
+            targets, endpoints, pool=pool
+        )
+        self._cache_listener.start()
+
     @property
     def mdns_api(self):
         return mdns_rpcapi.MdnsAPI.get_instance()
@@ -272,30 +399,17 @@ class Service(service.RPCService):
             raise exceptions.InvalidZoneName('More than one label is '
                                              'required')
 
-        tlds = self.storage.find_tlds(context)
-        if tlds:
+        tlds = self._tlds.get(context)
+        if tlds.tlds:
             LOG.debug("Checking if %s has a valid TLD", zone_name)
-            allowed = False
-            for i in range(-len(zone_labels), 0):
-                last_i_labels = zone_labels[i:]
-                LOG.debug("Checking %s against the TLD list", last_i_labels)
-                if ".".join(last_i_labels) in tlds:
-                    allowed = True
-                    break
-            if not allowed:
+            if not tlds.has_tld(zone_name):
                 raise exceptions.InvalidZoneName('Invalid TLD')
 
             # Now check that the zone name is not the same as a TLD
-            try:
-                stripped_zone_name = zone_name.rstrip('.').lower()
-                self.storage.find_tld(
-                    context,
-                    {'name': stripped_zone_name})
-            except exceptions.TldNotFound:
-                LOG.debug("%s has a valid TLD", zone_name)
-            else:
+            if tlds.is_tld(zone_name):
                 raise exceptions.InvalidZoneName(
                     'Zone name cannot be the same as a TLD')
+            LOG.debug("%s has a valid TLD", zone_name)
 
         # Check zone name blacklist
         if self._is_blacklisted_zone_name(context, zone_name):
@@ -394,42 +508,29 @@ class Service(service.RPCService):
                     'CNAME recordsets may not have more than 1 record'
                 )
 
-    def _is_blacklisted_zone_name(self, context, zone_name):
-        """
-        Ensures the provided zone_name is not blacklisted.
-        """
+    def _load_blacklists(self, context):
         blacklists = self.storage.find_blacklists(context)
+        return matchers.BlacklistMatcher(
+            [blacklist.pattern for blacklist in blacklists])
 
-        class Timeout(Exception):
-            pass
-
-        def _handle_timeout(signum, frame):
-            raise Timeout()
-
-        signal.signal(signal.SIGALRM, _handle_timeout)
+    def _load_tlds(self, context):
+        tlds = self.storage.find_tlds(context)
+        return matchers.TldMatcher([tld.name for tld in tlds])
 
+    def _check_blacklist_pattern(self, blacklist):
+        """
+        Ensures the pattern of a blacklist can be evaluated in bounded time.
+        """
         try:
-            for blacklist in blacklists:
-                signal.setitimer(signal.ITIMER_REAL, 0.02)
-
-                try:
-                    if bool(re.search(blacklist.pattern, zone_name)):
-                        return True
-                finally:
-                    signal.setitimer(signal.ITIMER_REAL, 0)
+            matchers.compile_pattern(blacklist.pattern)
+        except ValueError as e:
+            raise exceptions.InvalidBlacklistPattern(str(e))
 
-        except Timeout:
-            LOG.critical(
-                'Blacklist regex (%(pattern)s) took too long to evaluate '
-                'against zone name (%(zone_name)s',
-                {
-                    'pattern': blacklist.pattern,
-                    'zone_name': zone_name
-                })
-
-            return True
-
-        return False
+    def _is_blacklisted_zone_name(self, context, zone_name):
+        """
+        Ensures the provided zone_name is not blacklisted.
+        """
+        return self._blacklists.get(context).search(zone_name)
 
     def _is_subzone(self, context, zone_name, pool_id):
         """
@@ -441,22 +542,18 @@ class Service(service.RPCService):
         # Break the name up into it's component labels
         labels = zone_name.split(".")
 
-        criterion = {"pool_id": pool_id}
-
-        i = 1
+        # Starting with label #2, every zone the zone could be a subzone of
+        names = ['.'.join(labels[i:]) for i in range(1, len(labels) - 1)]
+        if not names:
+            return False
 
-        # Starting with label #2, search for matching zone's in the database
-        while (i < len(labels)):
-            name = '.'.join(labels[i:])
-            criterion["name"] = name
-            try:
-                zone = self.storage.find_zone(context, criterion)
-            except exceptions.ZoneNotFound:
-                i += 1
-            else:
-                return zone
+        zones = self.storage.find_zones(
+            context, {'name': names, 'pool_id': pool_id})
+        if not zones:
+            return False
 
-        return False
+        # The closest parent has the longest name
+        return max(zones, key=lambda zone: len(zone.name))
 
     def _is_superzone(self, context, zone_name, pool_id):
         """
@@ -465,10 +562,14 @@ class Service(service.RPCService):
         """
         context = context.elevated(all_tenants=True)
 
-        # Create wildcard term to catch all subzones
-        search_term = "%%.%(name)s" % {"name": zone_name}
-
-        criterion = {'name': search_term, "pool_id": pool_id}
+        # The reverse names of the subzones start with the reverse name of
+        # the zone and a dot, so sort between it and the same followed by the
+        # next character, a slash.
+        reverse_name = zone_name[::-1]
+        criterion = {
+            'reverse_name': 'BETWEEN %s.,%s/' % (reverse_name, reverse_name),
+            'pool_id': pool_id,
+        }
         subzones = self.storage.find_zones(context, criterion)
 
         return subzones
@@ -487,20 +588,115 @@ class Service(service.RPCService):
     def _increment_zone_serial(self, context, zone, set_delayed_notify=False):
         """Update the zone serial and the SOA record
         Optionally set delayed_notify to have PM issue delayed notify
+
+        The serial is incremented once per transaction, however many changes
+        it makes to the zone, and the SOA record is updated once, right
+        before the transaction is committed.
         """
 
         # Increment the serial number
-        zone.serial = utils.increment_serial(zone.serial)
+        serials = storage.transaction_state().setdefault('zone_serials', {})
+        if zone.id not in serials:
+            serials[zone.id] = utils.increment_serial(zone.serial)
+
+            # Update SOA record
+            storage.before_commit(functools.partial(
+                self._update_zone_soa, context, zone.id))
+
+        zone.serial = serials[zone.id]
         if set_delayed_notify:
             zone.delayed_notify = True
 
-        zone = self.storage.update_zone(context, zone)
+        zone = self._update_zone_row(context, zone)
 
-        # Update SOA record
-        self._update_soa(context, zone)
+        return zone
+
+    def _update_zone_row(self, context, zone):
+        """Update the zone in storage
+
+        When zone_concurrency is optimistic the update only happens while
+        the zone still has the version the change started from, and raises
+        ZoneVersionConflict otherwise.
+        """
+        versions = getattr(ZONE_LOCKS, 'versions', None)
+        if not versions:
+            return self.storage.update_zone(context, zone)
+
+        zone = self.storage.update_zone(
+            context, zone, expected_version=versions.get(zone.id))
+
+        if zone.id in versions:
+            versions[zone.id] = zone.version
 
         return zone
 
+    def _update_zone_soa(self, context, zone_id):
+        zone = self.storage.get_zone(context, zone_id)
+        self._update_soa(context, zone)
+
+    # Zone Journal Methods
+    @staticmethod
+    def _journal_rrs(zone, recordset):
+        if recordset is None or not recordset.obj_attr_is_set('records'):
+            return set()
+
+        ttl = recordset.ttl or zone.ttl
+
+        return set(
+            (recordset.name, recordset.type, ttl, record.data)
+            for record in recordset.records if record.action != 'DELETE')
+
+    @staticmethod
+    def _is_zone_journaled(zone):
+        return (cfg.CONF['service:central'].zone_journal and
+                zone.type == 'PRIMARY')
+
+    def _journal_recordset(self, context, zone, old_recordset, new_recordset,
+                           increment_serial=True):
+        """Record the differences between two versions of a recordset in
+        the zone journal, as part of the current zone serial.
+        """
+        if not self._is_zone_journaled(zone):
+            return
+
+        if not increment_serial:
+            # Nothing can have been transferred yet while the zone is being
+            # created.
+            if zone.action == 'CREATE':
+                return
+
+            # The SOA is only ever rewritten together with a new serial. Any
+            # other change made without one can't be served incrementally,
+            # so forget the history of the zone.
+            recordset = new_recordset or old_recordset
+            if recordset.type != 'SOA':
+                self.storage.delete_zone_journal(context, zone.id)
+                return
+
+        old_rrs = self._journal_rrs(zone, old_recordset)
+        new_rrs = self._journal_rrs(zone, new_recordset)
+
+        changes = [('DEL',) + rr for rr in sorted(old_rrs - new_rrs)]
+        changes.extend(('ADD',) + rr for rr in sorted(new_rrs - old_rrs))
+
+        self.storage.create_zone_journal(
+            context, zone.id, zone.serial, changes)
+
+    @contextlib.contextmanager
+    def _journal_recordset_changes(self, context, zone, recordset_id,
+                                   increment_serial=True):
+        """Journal the changes made to a recordset within the block."""
+        if not self._is_zone_journaled(zone):
+            yield
+            return
+
+        old_recordset = self.storage.get_recordset(context, recordset_id)
+        yield
+        new_recordset = self.storage.get_recordset(context, recordset_id)
+
+        self._journal_recordset(
+            context, zone, old_recordset, new_recordset, increment_serial)
+
     # SOA Recordset Methods
     def _build_soa_record(self, zone, ns_records):
         return "%s %s. %d %d %d %d %d" % (ns_records[0]['hostname'],
@@ -604,15 +800,13 @@ class Service(service.RPCService):
 
     # Quota Enforcement Methods
     def _enforce_zone_quota(self, context, tenant_id):
-        criterion = {'tenant_id': tenant_id}
-        count = self.storage.count_zones(context, criterion)
+        count = self.storage.get_usage(context, 'zones', tenant_id)
 
         self.quota.limit_check(context, tenant_id, zones=count)
 
     def _enforce_recordset_quota(self, context, zone):
         # Ensure the recordsets per zone quota is OK
-        criterion = {'zone_id': zone.id}
-        count = self.storage.count_recordsets(context, criterion)
+        count = self.storage.get_usage(context, 'zone_recordsets', zone.id)
 
         self.quota.limit_check(
             context, zone.tenant_id, zone_recordsets=count)
@@ -622,13 +816,10 @@ class Service(service.RPCService):
         if recordset.managed:
             return
 
-        # Ensure the records per zone quota is OK
-        zone_criterion = {
-            'zone_id': zone.id,
-            'managed': False,  # only include non-managed records
-        }
-
-        zone_records = self.storage.count_records(context, zone_criterion)
+        # Ensure the records per zone quota is OK, the zone's usage counter
+        # only includes non-managed records
+        zone_records = self.storage.get_usage(
+            context, 'zone_records', zone.id)
 
         recordset_criterion = {
             'recordset_id': recordset.id,
@@ -705,6 +896,7 @@ class Service(service.RPCService):
 
         # The TLD is only created on central's storage and not on the backend.
         created_tld = self.storage.create_tld(context, tld)
+        self._tlds.invalidate()
 
         return created_tld
 
@@ -732,6 +924,7 @@ class Service(service.RPCService):
         policy.check('update_tld', context, target)
 
         tld = self.storage.update_tld(context, tld)
+        self._tlds.invalidate()
 
         return tld
 
@@ -742,6 +935,7 @@ class Service(service.RPCService):
         policy.check('delete_tld', context, {'tld_id': tld_id})
 
         tld = self.storage.delete_tld(context, tld_id)
+        self._tlds.invalidate()
 
         return tld
 
@@ -1079,12 +1273,18 @@ class Service(service.RPCService):
         zone.action = 'UPDATE'
         zone.status = 'PENDING'
 
+        # Every record that relies on the zone TTL changes with it, which the
+        # journal does not track.
+        if (self._is_zone_journaled(zone) and
+                'ttl' in zone.obj_what_changed()):
+            self.storage.delete_zone_journal(context, zone.id)
+
         if increment_serial:
             # _increment_zone_serial increments and updates the zone
             zone = self._increment_zone_serial(
                 context, zone, set_delayed_notify=set_delayed_notify)
         else:
-            zone = self.storage.update_zone(context, zone)
+            zone = self._update_zone_row(context, zone)
 
         return zone
 
@@ -1139,7 +1339,7 @@ class Service(service.RPCService):
         zone.action = 'DELETE'
         zone.status = 'PENDING'
 
-        zone = self.storage.update_zone(context, zone)
+        zone = self._update_zone_row(context, zone)
 
         return zone
 
@@ -1156,6 +1356,20 @@ class Service(service.RPCService):
 
         return self.storage.purge_zones(context, criterion, limit)
 
+    @rpc.expected_exceptions()
+    def purge_zone_journal(self, context, criterion, max_serials):
+        """Trim the zone journals down to the newest serials.
+        :returns: number of purged journal entries
+        """
+
+        policy.check('purge_zone_journal', context, criterion)
+
+        LOG.debug("Performing zone journal purge keeping %r serials with "
+                  "criterion of %r", max_serials, criterion)
+
+        return self.storage.purge_zone_journal(
+            context, criterion, max_serials)
+
     @rpc.expected_exceptions()
     def xfr_zone(self, context, zone_id):
         zone = self.storage.get_zone(context, zone_id)
@@ -1343,6 +1557,9 @@ class Service(service.RPCService):
         recordset = self.storage.create_recordset(context, zone.id,
                                                   recordset)
 
+        self._journal_recordset(
+            context, zone, None, recordset, increment_serial)
+
         # Return the zone too in case it was updated
         return (recordset, zone)
 
@@ -1412,20 +1629,7 @@ class Service(service.RPCService):
         zone_id = recordset.obj_get_original_value('zone_id')
         zone = self.storage.get_zone(context, zone_id)
 
-        changes = recordset.obj_get_changes()
-
-        # Ensure immutable fields are not changed
-        if 'tenant_id' in changes:
-            raise exceptions.BadRequest('Moving a recordset between tenants '
-                                        'is not allowed')
-
-        if 'zone_id' in changes or 'zone_name' in changes:
-            raise exceptions.BadRequest('Moving a recordset between zones '
-                                        'is not allowed')
-
-        if 'type' in changes:
-            raise exceptions.BadRequest('Changing a recordsets type is not '
-                                        'allowed')
+        self._check_recordset_changes(recordset)
 
         # Don't allow updates to zones that are being deleted
         if zone.action == 'DELETE':
@@ -1451,6 +1655,23 @@ class Service(service.RPCService):
 
         return recordset
 
+    @staticmethod
+    def _check_recordset_changes(recordset):
+        changes = recordset.obj_get_changes()
+
+        # Ensure immutable fields are not changed
+        if 'tenant_id' in changes:
+            raise exceptions.BadRequest('Moving a recordset between tenants '
+                                        'is not allowed')
+
+        if 'zone_id' in changes or 'zone_name' in changes:
+            raise exceptions.BadRequest('Moving a recordset between zones '
+                                        'is not allowed')
+
+        if 'type' in changes:
+            raise exceptions.BadRequest('Changing a recordsets type is not '
+                                        'allowed')
+
     @transaction
     def _update_recordset_in_storage(self, context, zone, recordset,
             increment_serial=True, set_delayed_notify=False):
@@ -1475,7 +1696,9 @@ class Service(service.RPCService):
             self._enforce_record_quota(context, zone, recordset)
 
         # Update the recordset
-        recordset = self.storage.update_recordset(context, recordset)
+        with self._journal_recordset_changes(
+                context, zone, recordset.id, increment_serial):
+            recordset = self.storage.update_recordset(context, recordset)
 
         return (recordset, zone)
 
@@ -1527,6 +1750,9 @@ class Service(service.RPCService):
             zone = self._update_zone_in_storage(
                 context, zone, increment_serial)
 
+        self._journal_recordset(
+            context, zone, recordset, None, increment_serial)
+
         if recordset.records:
             for record in recordset.records:
                 record.action = 'DELETE'
@@ -1539,6 +1765,173 @@ class Service(service.RPCService):
 
         return (recordset, zone)
 
+    @rpc.expected_exceptions()
+    @notification(None)
+    @synchronized_zone()
+    def batch_recordsets(self, context, zone_id, create=None, update=None,
+                         delete=None):
+        """Create, update and delete many recordsets of a zone at once.
+
+        The changes are made in a single transaction, either all of them or
+        none, under a single new serial of the zone.
+
+        :param create: A RecordSetList of the recordsets to create.
+        :param update: A RecordSetList of the recordsets to update, with
+                       their IDs and the fields to change.
+        :param delete: A list of the IDs of the recordsets to delete.
+        :return: A RecordSetList of the created, updated and deleted
+                 recordsets, in that order.
+        """
+        create = create or objects.RecordSetList()
+        update = update or objects.RecordSetList()
+        delete = delete or []
+
+        zone = self.storage.get_zone(context, zone_id)
+
+        # Don't allow updates to zones that are being deleted
+        if zone.action == 'DELETE':
+            raise exceptions.BadRequest('Can not update a deleting zone')
+
+        target = {
+            'zone_id': zone.id,
+            'zone_name': zone.name,
+            'zone_type': zone.type,
+            'tenant_id': zone.tenant_id,
+        }
+
+        for recordset in create:
+            policy.check('create_recordset', context,
+                         dict(target, recordset_name=recordset.name))
+
+        # Fetch the recordsets to update and delete at once
+        recordset_ids = set(recordset.id for recordset in update)
+        recordset_ids.update(delete)
+        if len(recordset_ids) != len(update) + len(delete):
+            raise exceptions.BadRequest(
+                'A recordset may only be changed once per batch')
+
+        existing = {}
+        if recordset_ids:
+            for recordset in self.storage.find_recordsets(
+                    context, {'id': list(recordset_ids), 'zone_id': zone.id}):
+                recordset.obj_reset_changes(recursive=True)
+                existing[recordset.id] = recordset
+        if len(existing) != len(recordset_ids):
+            raise exceptions.RecordSetNotFound()
+
+        updated = objects.RecordSetList()
+        for changes in update:
+            recordset = existing[changes.id]
+
+            # SOA recordsets cannot be updated manually
+            if recordset.type == 'SOA':
+                raise exceptions.BadRequest(
+                    'Updating SOA recordsets is not allowed')
+
+            # NS recordsets at the zone root cannot be manually updated
+            if recordset.type == 'NS' and recordset.name == zone.name:
+                raise exceptions.BadRequest(
+                    'Updating a root zone NS record is not allowed')
+
+            self._merge_recordset_changes(recordset, changes)
+            recordset.validate()
+
+            self._check_recordset_changes(recordset)
+
+            policy.check('update_recordset', context,
+                         dict(target, recordset_id=recordset.id))
+
+            if recordset.managed and not context.edit_managed_records:
+                raise exceptions.BadRequest(
+                    'Managed records may not be updated')
+
+            updated.append(recordset)
+
+        deleted = objects.RecordSetList()
+        for recordset_id in delete:
+            recordset = existing[recordset_id]
+
+            policy.check('delete_recordset', context,
+                         dict(target, recordset_id=recordset.id))
+
+            if recordset.type == 'SOA':
+                raise exceptions.BadRequest(
+                    'Deleting a SOA recordset is not allowed')
+
+            if recordset.managed and not context.edit_managed_records:
+                raise exceptions.BadRequest(
+                    'Managed records may not be deleted')
+
+            deleted.append(recordset)
+
+        recordsets, zone = self._batch_recordsets_in_storage(
+            context, zone, create, updated, deleted)
+
+        self.zone_api.update_zone(context, zone)
+
+        notification_types = (
+            ['dns.recordset.create'] * len(create) +
+            ['dns.recordset.update'] * len(update) +
+            ['dns.recordset.delete'] * len(deleted))
+        # Sent by the notification decorator, once every change is made.
+        # The buffer is sent from its left, queue the last ones first.
+        for notification_type, recordset in reversed(list(zip(
+                notification_types, recordsets))):
+            recordset.zone_name = zone.name
+            recordset.obj_reset_changes(['zone_name'])
+            _queue_notification(notification_type, context, recordset,
+                                (context, zone.id, recordset), {})
+
+        return recordsets
+
+    @staticmethod
+    def _merge_recordset_changes(recordset, changes):
+        """Apply the fields changed in changes to the stored recordset.
+
+        The records are matched by their data, so the ones which remain are
+        kept as they are.
+        """
+        for field in changes.obj_what_changed():
+            value = getattr(changes, field)
+            if field == 'id' or getattr(recordset, field) == value:
+                continue
+
+            if field == 'name':
+                raise exceptions.BadRequest('Changing a recordsets name is '
+                                            'not allowed')
+
+            if field == 'records':
+                records = dict(
+                    (record.data, record) for record in recordset.records)
+                value = objects.RecordList(objects=[
+                    records.get(record.data, record) for record in value])
+
+            setattr(recordset, field, value)
+
+    @transaction
+    def _batch_recordsets_in_storage(self, context, zone, create, update,
+                                     delete):
+        # The changes share a single new serial, and SOA, as they are made
+        # in a single transaction.
+        recordsets = objects.RecordSetList()
+
+        for recordset in create:
+            recordset, zone = self._create_recordset_in_storage(
+                context, zone, recordset)
+            recordsets.append(recordset)
+
+        for recordset in update:
+            recordset, zone = self._update_recordset_in_storage(
+                context, zone, recordset)
+            recordsets.append(recordset)
+
+        for recordset in delete:
+            recordset, zone = self._delete_recordset_in_storage(
+                context, zone, recordset)
+            recordsets.append(recordset)
+
+        return (recordsets, zone)
+
     @rpc.expected_exceptions()
     def count_recordsets(self, context, criterion=None):
         if criterion is None:
@@ -1601,8 +1994,10 @@ class Service(service.RPCService):
         record.status = 'PENDING'
         record.serial = zone.serial
 
-        record = self.storage.create_record(context, zone.id, recordset.id,
-                                            record)
+        with self._journal_recordset_changes(
+                context, zone, recordset.id, increment_serial):
+            record = self.storage.create_record(
+                context, zone.id, recordset.id, record)
 
         return (record, zone)
 
@@ -1714,7 +2109,9 @@ class Service(service.RPCService):
         record.serial = zone.serial
 
         # Update the record
-        record = self.storage.update_record(context, record)
+        with self._journal_recordset_changes(
+                context, zone, record.recordset_id, increment_serial):
+            record = self.storage.update_record(context, record)
 
         return (record, zone)
 
@@ -1775,7 +2172,9 @@ class Service(service.RPCService):
         record.status = 'PENDING'
         record.serial = zone.serial
 
-        record = self.storage.update_record(context, record)
+        with self._journal_recordset_changes(
+                context, zone, record.recordset_id, increment_serial):
+            record = self.storage.update_record(context, record)
 
         return (record, zone)
 
@@ -2191,7 +2590,10 @@ class Service(service.RPCService):
     def create_blacklist(self, context, blacklist):
         policy.check('create_blacklist', context)
 
+        self._check_blacklist_pattern(blacklist)
+
         created_blacklist = self.storage.create_blacklist(context, blacklist)
+        self._blacklists.invalidate()
 
         return created_blacklist
 
@@ -2231,7 +2633,10 @@ class Service(service.RPCService):
         }
         policy.check('update_blacklist', context, target)
 
+        self._check_blacklist_pattern(blacklist)
+
         blacklist = self.storage.update_blacklist(context, blacklist)
+        self._blacklists.invalidate()
 
         return blacklist
 
@@ -2242,6 +2647,7 @@ class Service(service.RPCService):
         policy.check('delete_blacklist', context)
 
         blacklist = self.storage.delete_blacklist(context, blacklist_id)
+        self._blacklists.invalidate()
 
         return blacklist
 
@@ -2395,7 +2801,7 @@ class Service(service.RPCService):
         if zone.status != 'DELETED':
             LOG.debug('Setting zone %s, serial %s: action %s, status %s',
                       zone.id, zone.serial, zone.action, zone.status)
-            self.storage.update_zone(context, zone)
+            self._update_zone_row(context, zone)
 
         if deleted:
             LOG.debug('update_status: deleting %s', zone.name)
@@ -2641,7 +3047,7 @@ class Service(service.RPCService):
                                      zone_transfer_accept.tenant_id)
 
             zone.tenant_id = zone_transfer_accept.tenant_id
-            self.storage.update_zone(elevated_context, zone)
+            self._update_zone_row(elevated_context, zone)
 
         except Exception:
             created_zone_transfer_accept.status = 'ERROR'
@@ -121,6 +121,10 @@ rules = [
         name="purge_zones",
         check_str=base.RULE_ADMIN
     ),
+    policy.RuleDefault(
+        name="purge_zone_journal",
+        check_str=base.RULE_ADMIN
+    ),
     policy.RuleDefault(
         name="touch_zone",
         check_str=base.RULE_ADMIN_OR_OWNER
@@ -34,6 +34,27 @@ AGENT_OPTS = [
                help='The Agent TCP Backlog'),
     cfg.FloatOpt('tcp_recv_timeout', default=0.5,
                  help='Agent TCP Receive Timeout'),
+    cfg.IntOpt('tcp_pipeline_size', default=8, min=1,
+               help='Maximum number of queries pipelined on a TCP '
+                    'connection that are processed concurrently. Their '
+                    'responses are sent as soon as they are ready, in any '
+                    'order.'),
+    cfg.IntOpt('tcp_max_conns_per_client', default=0, min=0,
+               help='Maximum number of concurrent TCP connections from a '
+                    'single client address, further connections are closed '
+                    'straight away. Idle connections are closed after '
+                    'tcp_recv_timeout seconds. Set to 0 for no limit.'),
+    cfg.IntOpt('udp_recv_batch_size', default=32, min=1,
+               help='Maximum number of UDP queries Agent reads from a '
+                    'socket before letting the queries it read run'),
+    cfg.IntOpt('udp_queue_size', default=0, min=0,
+               help='Maximum number of UDP queries waiting to be handled by '
+                    'udp_queue_threads greenthreads, queries received while '
+                    'the queue is full are dropped. The default of 0 handles '
+                    'every query in a new greenthread instead.'),
+    cfg.IntOpt('udp_queue_threads', default=100, min=1,
+               help='Number of greenthreads handling the queued UDP '
+                    'queries'),
     cfg.ListOpt('allow_notify', default=[],
                 help='List of IP addresses allowed to NOTIFY The Agent'),
     cfg.ListOpt('masters', default=[],
@@ -62,6 +62,9 @@ APT_V2_OPTS = [
                     'means show all results by default'),
     cfg.IntOpt('max_limit_v2', default=1000,
                help='Max per-page limit for the V2 API'),
+    cfg.IntOpt('max_recordset_batch_size', default=1000, min=1,
+               help='Max number of recordsets a single batch request of the '
+                    'V2 API may create, update and delete'),
     cfg.BoolOpt('quotas_verify_project_id', default=False,
                 help='Verify that the requested Project ID for quota target '
                      'is a valid project in Keystone.'),
@@ -90,6 +90,10 @@ DESIGNATE_OPTS = [
                help='Number of records allowed per recordset'),
     cfg.IntOpt('quota_api_export_size', default=1000,
                help='Number of recordsets allowed in a zone export'),
+
+    # Zone exports
+    cfg.StrOpt('export_store_driver', default='file',
+               help='The driver to store synchronous zone exports with'),
 ]
 
 
@@ -50,6 +50,46 @@ CENTRAL_OPTS = [
         'scheduler_filters',
         default=['default_pool'],
         help='Enabled Pool Scheduling filters'),
+    cfg.BoolOpt('zone_journal', default=True,
+                help='Record the changes made to primary zones in a journal, '
+                     'so that MiniDNS can answer IXFR queries with only the '
+                     'differences between two serials'),
+    cfg.IntOpt('blacklist_cache_ttl', default=60, min=0,
+               help='The time the compiled blacklist patterns are cached '
+                    'for. They are also invalidated by the '
+                    'dns.blacklist.* notifications of every central '
+                    'process, so the TTL only bounds how stale they get '
+                    'when notifications are lost or disabled'),
+    cfg.IntOpt('tld_cache_ttl', default=60, min=0,
+               help='The time the TLDs are cached for. They are also '
+                    'invalidated by the dns.tld.* notifications of every '
+                    'central process, so the TTL only bounds how stale they '
+                    'get when notifications are lost or disabled'),
+    cfg.StrOpt('cache_listener_pool',
+               help='Prefix of the notification listener pools used to '
+                    'receive the notifications that invalidate the cached '
+                    'blacklists and TLDs. Each central process listens in '
+                    'its own pool named <prefix>-<n> so that it sees every '
+                    'notification, n numbering the processes of the host '
+                    'from 0. A restarted process reuses the pool of the one '
+                    'it replaces. The queues of the pools numbered from the '
+                    'number of workers up are left unused when the workers '
+                    'are reduced, and should then be deleted. Defaults to '
+                    'designate-central-<host>.'),
+    cfg.StrOpt('zone_concurrency', default='lock',
+               choices=['lock', 'optimistic'],
+               help='How concurrent changes to a zone are kept apart. '
+                    '"lock" takes a distributed lock on the zone, and on '
+                    'every new zone, for each change. "optimistic" makes '
+                    'each change update the zone only if its version is '
+                    'still the one it started from, retrying the change '
+                    'otherwise. New zones are then only created under a '
+                    'lock named after their last two labels, which they '
+                    'share with their subzones and superzones'),
+    cfg.IntOpt('zone_concurrency_retries', default=10, min=0,
+               help='The number of times a change to a zone is retried '
+                    'after a concurrent change when zone_concurrency is '
+                    '"optimistic"'),
 ]
 
 
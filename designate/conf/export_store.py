@@ -0,0 +1,41 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo_config import cfg
+
+EXPORT_STORE_FILE_GROUP = cfg.OptGroup(
+    name='export_store:file',
+    title="Configuration for the File Export Store"
+)
+
+EXPORT_STORE_FILE_OPTS = [
+    cfg.StrOpt('path', default='$state_path/exports',
+               help='The directory to store the zone exports in. It must be '
+                    'shared, for example over NFS, by every Worker, which '
+                    'writes the exports, and every API service, which sends '
+                    'them to the clients and removes them when they are '
+                    'deleted. An export the API service can\'t find there '
+                    'is rendered again by central, and a warning logged'),
+    cfg.IntOpt('chunk_size', default=65536, min=1,
+               help='The size of the chunks a zone export is sent to the '
+                    'client in'),
+]
+
+
+def register_opts(conf):
+    conf.register_group(EXPORT_STORE_FILE_GROUP)
+    conf.register_opts(EXPORT_STORE_FILE_OPTS, group=EXPORT_STORE_FILE_GROUP)
+
+
+def list_opts():
+    return {
+        EXPORT_STORE_FILE_GROUP: EXPORT_STORE_FILE_OPTS,
+    }
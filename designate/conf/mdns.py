@@ -33,6 +33,27 @@ MDNS_OPTS = [
                help='mDNS TCP Backlog'),
     cfg.FloatOpt('tcp_recv_timeout', default=0.5,
                  help='mDNS TCP Receive Timeout'),
+    cfg.IntOpt('tcp_pipeline_size', default=8, min=1,
+               help='Maximum number of queries pipelined on a TCP '
+                    'connection that are processed concurrently. Their '
+                    'responses are sent as soon as they are ready, in any '
+                    'order.'),
+    cfg.IntOpt('tcp_max_conns_per_client', default=0, min=0,
+               help='Maximum number of concurrent TCP connections from a '
+                    'single client address, further connections are closed '
+                    'straight away. Idle connections are closed after '
+                    'tcp_recv_timeout seconds. Set to 0 for no limit.'),
+    cfg.IntOpt('udp_recv_batch_size', default=32, min=1,
+               help='Maximum number of UDP queries mDNS reads from a '
+                    'socket before letting the queries it read run'),
+    cfg.IntOpt('udp_queue_size', default=0, min=0,
+               help='Maximum number of UDP queries waiting to be handled by '
+                    'udp_queue_threads greenthreads, queries received while '
+                    'the queue is full are dropped. The default of 0 handles '
+                    'every query in a new greenthread instead.'),
+    cfg.IntOpt('udp_queue_threads', default=100, min=1,
+               help='Number of greenthreads handling the queued UDP '
+                    'queries'),
     cfg.BoolOpt('all_tcp', default=False,
                 help='Send all traffic over TCP'),
     cfg.BoolOpt('query_enforce_tsig', default=False,
@@ -46,6 +67,34 @@ MDNS_OPTS = [
                help='RPC topic name for mdns'),
     cfg.IntOpt('xfr_timeout', help="Timeout in seconds for XFR's.",
                default=10),
+    cfg.IntOpt('axfr_cache_size', default=32 * 1024 * 1024, min=0,
+               help='Maximum number of bytes of rendered AXFR responses to '
+                    'keep in memory, per process. Zone transfers of a '
+                    'serial already in the cache are served without '
+                    'querying the database. Set to 0 to disable the cache.'),
+    cfg.IntOpt('tsigkey_cache_ttl', default=300, min=1,
+               help='Number of seconds TSIG keys are cached for. Cached keys '
+                    'are also invalidated by the dns.tsigkey.update and '
+                    'dns.tsigkey.delete notifications.'),
+    cfg.IntOpt('answer_cache_size', default=10000, min=0,
+               help='Maximum number of answers to record queries to keep in '
+                    'memory, per process. Set to 0 to disable the cache.'),
+    cfg.IntOpt('answer_cache_ttl', default=5, min=1,
+               help='Number of seconds answers to record queries are cached '
+                    'for. Cached answers are also invalidated by the '
+                    'notifications central sends when a zone or its records '
+                    'change.'),
+    cfg.StrOpt('cache_listener_pool',
+               help='Prefix of the notification listener pools used to '
+                    'receive the notifications that invalidate the TSIG key '
+                    'and answer caches. Each MiniDNS process, including each '
+                    'worker, listens in its own pool named <prefix>-<n> so '
+                    'that it sees every notification, n numbering the '
+                    'processes of the host from 0. A restarted process '
+                    'reuses the pool of the one it replaces. The queues of '
+                    'the pools numbered from the number of workers up are '
+                    'left unused when the workers are reduced, and should '
+                    'then be deleted. Defaults to designate-mdns-<host>.'),
 ]
 
 
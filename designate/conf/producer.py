@@ -45,6 +45,11 @@ PRODUCER_TASK_ZONE_PURGE_GROUP = cfg.OptGroup(
     title='Configuration for Producer Task: Zone Purge'
 )
 
+PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP = cfg.OptGroup(
+    name='producer_task:zone_journal_purge',
+    title='Configuration for Producer Task: Zone Journal Purge'
+)
+
 PRODUCER_OPTS = [
     cfg.IntOpt('workers',
                help='Number of Producer worker processes to spawn'),
@@ -88,8 +93,11 @@ PRODUCER_TASK_PERIODIC_SECONDARY_REFRESH_OPTS = [
 PRODUCER_TASK_WORKER_PERIODIC_RECOVERY_OPTS = [
     cfg.IntOpt('interval', default=120,
                help='Run interval in seconds'),
-    cfg.IntOpt('per_page', default=100,
+    cfg.IntOpt('per_page', default=100, min=1,
                help='Default amount of results returned per page'),
+    cfg.IntOpt('batch_size', default=1000, min=1,
+               help='How many zones to recover on each run, the next run '
+                    'resumes after them'),
 ]
 
 PRODUCER_TASK_ZONE_PURGE_OPTS = [
@@ -104,6 +112,13 @@ PRODUCER_TASK_ZONE_PURGE_OPTS = [
                help='How many zones to be purged on each run'),
 ]
 
+PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS = [
+    cfg.IntOpt('interval', default=3600,
+               help='Run interval in seconds'),
+    cfg.IntOpt('max_serials', default=100, min=1,
+               help='How many serials to keep in the journal of each zone'),
+]
+
 
 def register_opts(conf):
     conf.register_group(PRODUCER_GROUP)
@@ -123,6 +138,9 @@ def register_opts(conf):
     conf.register_group(PRODUCER_TASK_ZONE_PURGE_GROUP)
     conf.register_opts(PRODUCER_TASK_ZONE_PURGE_OPTS,
                        group=PRODUCER_TASK_ZONE_PURGE_GROUP)
+    conf.register_group(PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP)
+    conf.register_opts(PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS,
+                       group=PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP)
 
 
 def list_opts():
@@ -137,4 +155,6 @@ def list_opts():
         PRODUCER_TASK_WORKER_PERIODIC_RECOVERY_GROUP:
             PRODUCER_TASK_WORKER_PERIODIC_RECOVERY_OPTS,
         PRODUCER_TASK_ZONE_PURGE_GROUP: PRODUCER_TASK_ZONE_PURGE_OPTS,
+        PRODUCER_TASK_ZONE_JOURNAL_PURGE_GROUP:
+            PRODUCER_TASK_ZONE_JOURNAL_PURGE_OPTS,
     }
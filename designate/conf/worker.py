@@ -24,6 +24,28 @@ WORKER_OPTS = [
                help='Number of Worker worker processes to spawn'),
     cfg.IntOpt('threads', default=200,
                help='Number of Worker threads to spawn per process'),
+    cfg.IntOpt('queue_size', default=0, min=0,
+               help='The maximum number of tasks waiting for one of the '
+                    'Worker threads, further tasks are rejected. 0 means '
+                    'unlimited'),
+    cfg.IntOpt('poll_threads', default=100,
+               help='Number of Worker threads per process to poll '
+                    'nameservers and send NOTIFYs with'),
+    cfg.IntOpt('poll_queue_size', default=0, min=0,
+               help='The maximum number of polls and NOTIFYs waiting for '
+                    'one of the poll threads. 0 means unlimited'),
+    cfg.IntOpt('recovery_threads', default=20,
+               help='Number of Worker threads per process to recover the '
+                    'zones in ERROR or stuck in PENDING with'),
+    cfg.IntOpt('recovery_queue_size', default=1000, min=0,
+               help='The maximum number of recovery tasks waiting for one '
+                    'of the recovery threads. 0 means unlimited'),
+    cfg.IntOpt('export_threads', default=10,
+               help='Number of Worker threads per process to export zones '
+                    'with'),
+    cfg.IntOpt('export_queue_size', default=0, min=0,
+               help='The maximum number of zone exports waiting for one of '
+                    'the export threads. 0 means unlimited'),
     # cfg.ListOpt('enabled_tasks',
     #             help='Enabled tasks to run'),
     cfg.StrOpt('storage_driver', default='sqlalchemy',
@@ -42,6 +64,32 @@ WORKER_OPTS = [
     cfg.IntOpt('poll_delay', default=5,
                help='The time to wait before sending the first request '
                     'to a server'),
+    cfg.BoolOpt('poll_adaptive', default=True,
+                help='Whether to schedule the requests to a server from '
+                     'the time changes took to show up on it, rather than '
+                     'from poll_delay and poll_retry_interval'),
+    cfg.FloatOpt('poll_min_delay', default=0.5, min=0,
+                 help='The shortest time to wait before sending a request '
+                      'to a server when poll_adaptive is enabled'),
+    cfg.FloatOpt('poll_max_delay', min=0,
+                 help='The longest time to wait before sending a request '
+                      'to a server when poll_adaptive is enabled, defaults '
+                      'to poll_retry_interval'),
+    cfg.IntOpt('poll_latency_percentile', default=90, min=1, max=100,
+               help='The percentile of the time changes took to show up on '
+                    'a server after which a request is retried when '
+                    'poll_adaptive is enabled'),
+    cfg.IntOpt('circuit_breaker_failures', default=5, min=0,
+               help='The number of consecutive failures of a pool target '
+                    'or nameserver after which the Worker stops sending it '
+                    'requests for circuit_breaker_reset_time. 0 disables '
+                    'the circuit breaker'),
+    cfg.IntOpt('circuit_breaker_reset_time', default=30, min=0,
+               help='The time to stop sending requests to a failing pool '
+                    'target or nameserver for, before probing it again'),
+    cfg.IntOpt('target_max_concurrency', default=20, min=0,
+               help='The maximum number of concurrent requests to a pool '
+                    'target or nameserver per process. 0 means unlimited'),
     cfg.BoolOpt('notify', default=True,
                 deprecated_for_removal=True,
                 deprecated_reason='This option is being removed to reduce '
@@ -52,6 +100,11 @@ WORKER_OPTS = [
                 help='Whether to allow synchronous zone exports'),
     cfg.StrOpt('topic', default='worker',
                help='RPC topic name for worker'),
+    cfg.StrOpt('rpc_version_cap',
+               help='The newest worker RPC API version to send requests '
+                    'with. Set it to the version of the oldest workers '
+                    'while they are being upgraded. Defaults to the newest '
+                    'version'),
 ]
 
 
@@ -21,9 +21,14 @@ from threading import Lock
 import six
 import dns
 import dns.exception
+import dns.opcode
+import dns.rcode
+import dns.rdata
+import dns.rdataclass
 import dns.zone
 import eventlet
 from dns import rdatatype
+import oslo_messaging
 from oslo_serialization import base64
 from oslo_log import log as logging
 
@@ -31,10 +36,13 @@ import designate.conf
 from designate import context
 from designate import exceptions
 from designate import objects
+from designate.metrics import metrics
 
 CONF = designate.conf.CONF
 LOG = logging.getLogger(__name__)
 
+_NO_RESPONSE = object()
+
 
 class DNSMiddleware(object):
     """Base DNS Middleware class with some utility methods"""
@@ -78,6 +86,12 @@ class SerializationMiddleware(DNSMiddleware):
         self.application = application
         self.tsig_keyring = tsig_keyring
 
+        # Every request goes through here, only fetch the metrics once.
+        self._requests = metrics.counter('dns.requests')
+        self._response_messages = metrics.counter('dns.response_messages')
+        self._response_bytes = metrics.counter('dns.response_bytes')
+        self._timer = metrics.timer()
+
     def __call__(self, request):
         # Generate the initial context. This may be updated by other middleware
         # as we learn more information about the Request.
@@ -125,36 +139,90 @@ class SerializationMiddleware(DNSMiddleware):
 
         else:
             # Hand the Deserialized packet onto the Application
-            for response in self.application(message):
+            yield from self._serialize(message)
+            return
+
+        # The error response isn't sent back, but count the bad request.
+        self._requests.increment(dimensions={
+            'opcode': 'NONE',
+            'qtype': 'NONE',
+            'rcode': dns.rcode.to_text(response.rcode()),
+        })
+
+    def _serialize(self, message):
+        """Serialize the responses of the application to a message, and
+        record how long it took to produce them, excluding the time spent
+        sending them
+        """
+        dimensions = {
+            'opcode': dns.opcode.to_text(message.opcode()),
+            'qtype': (dns.rdatatype.to_text(message.question[0].rdtype)
+                      if message.question else 'NONE'),
+        }
+        rcode = None
+        handling_time = 0.0
+        message_count = 0
+        byte_count = 0
+
+        responses = iter(self.application(message))
+        try:
+            while True:
+                start_time = time.time()
+                response = next(responses, _NO_RESPONSE)
+                if response is _NO_RESPONSE:
+                    handling_time += time.time() - start_time
+                    break
+
                 # Serialize and return the response if present
                 if isinstance(response, dns.message.Message):
-                    yield response.to_wire(max_size=65535)
+                    wire = response.to_wire(max_size=65535)
+                    response_rcode = response.rcode()
 
                 elif isinstance(response, dns.renderer.Renderer):
-                    yield response.get_wire()
+                    wire = response.get_wire()
+                    response_rcode = dns.rcode.from_flags(response.flags, 0)
 
                 else:
+                    handling_time += time.time() - start_time
                     LOG.error("Unexpected response %r", response)
+                    continue
+
+                handling_time += time.time() - start_time
+                if rcode is None:
+                    rcode = response_rcode
+                message_count += 1
+                byte_count += len(wire)
+                yield wire
+
+        finally:
+            self._requests.increment(dimensions=dict(
+                dimensions,
+                rcode=dns.rcode.to_text(rcode) if rcode is not None else 'NONE'
+            ))
+            self._timer.timing('dns.request_time', handling_time,
+                               dimensions=dimensions)
+            if message_count:
+                self._response_messages.increment(
+                    message_count, dimensions=dimensions)
+                self._response_bytes.increment(
+                    byte_count, dimensions=dimensions)
 
 
 class TsigInfoMiddleware(DNSMiddleware):
     """Middleware which looks up the information available for a TsigKey"""
 
-    def __init__(self, application, storage):
+    def __init__(self, application, tsigkey_cache):
         super(TsigInfoMiddleware, self).__init__(application)
-        self.storage = storage
+        self.tsigkey_cache = tsigkey_cache
 
     def process_request(self, request):
         if not request.had_tsig:
             return None
 
         try:
-            name = request.keyname.to_text(True)
-            if six.PY3 and isinstance(name, bytes):
-                name = name.decode('utf-8')
-            criterion = {'name': name}
-            tsigkey = self.storage.find_tsigkey(
-                    context.get_current(), criterion)
+            # The key was just looked up by the TsigKeyring to validate the
+            # request, so this is answered from the cache.
+            tsigkey = self.tsigkey_cache.get(request.keyname)
 
             request.environ['tsigkey'] = tsigkey
             request.environ['context'].tsigkey_id = tsigkey.id
@@ -167,23 +235,80 @@ class TsigInfoMiddleware(DNSMiddleware):
         return None
 
 
+class TsigKeyCache(object):
+    """A cache of the TSIG keys in the Designate DB
+
+    Keys are kept for ``ttl`` seconds, or until they are invalidated after a
+    TSIG key has been updated or deleted.
+    """
+
+    def __init__(self, storage, ttl):
+        self.storage = storage
+        self.ttl = ttl
+        self.lock = Lock()
+        self.data = {}
+
+    def get(self, key):
+        """Return the TsigKey object for a dnspython key name
+
+        :raises: TsigKeyNotFound
+        """
+        name = key.to_text(True)
+        if six.PY3 and isinstance(name, bytes):
+            name = name.decode('utf-8')
+
+        now = time.time()
+        with self.lock:
+            entry = self.data.get(name)
+        if entry is not None and entry[0] > now:
+            metrics.counter('tsigkey_cache.hit').increment()
+            return entry[1]
+
+        metrics.counter('tsigkey_cache.miss').increment()
+        criterion = {'name': name}
+        tsigkey = self.storage.find_tsigkey(context.get_current(), criterion)
+
+        with self.lock:
+            self.data[name] = (now + self.ttl, tsigkey)
+
+        return tsigkey
+
+    def invalidate(self):
+        with self.lock:
+            self.data.clear()
+
+
+class TsigKeyCacheEndpoint(object):
+    """Notification endpoint which invalidates a TsigKeyCache whenever a
+    TSIG key is updated or deleted
+    """
+    filter_rule = oslo_messaging.NotificationFilter(
+        event_type=r'^dns\.tsigkey\.(update|delete)$')
+
+    def __init__(self, tsigkey_cache):
+        self.tsigkey_cache = tsigkey_cache
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        LOG.debug('Invalidating the TSIG key cache after %s', event_type)
+
+        # The payload depends on the notification plugin, and the name of an
+        # updated key may have changed, so drop every key. There are only a
+        # handful of them.
+        self.tsigkey_cache.invalidate()
+
+
 class TsigKeyring(object):
     """Implements the DNSPython KeyRing API, backed by the Designate DB"""
 
-    def __init__(self, storage):
-        self.storage = storage
+    def __init__(self, tsigkey_cache):
+        self.tsigkey_cache = tsigkey_cache
 
     def __getitem__(self, key):
         return self.get(key)
 
     def get(self, key, default=None):
         try:
-            name = key.to_text(True)
-            if six.PY3 and isinstance(name, bytes):
-                name = name.decode('utf-8')
-            criterion = {'name': name}
-            tsigkey = self.storage.find_tsigkey(
-                context.get_current(), criterion)
+            tsigkey = self.tsigkey_cache.get(key)
 
             return base64.decode_as_bytes(tsigkey.secret)
 
@@ -337,6 +462,39 @@ def dnspythonrecord_to_recordset(rname, rdataset):
     return rrset
 
 
+def rdata_to_wire(record_type, data):
+    """
+    Encodes the text rdata of a record into its uncompressed wire format.
+
+    :returns: The encoded rdata, or None if the data could not be parsed.
+    """
+    try:
+        rdata = dns.rdata.from_text(
+            dns.rdataclass.IN, rdatatype.from_text(record_type), data)
+        output = six.BytesIO()
+        rdata.to_wire(output)
+    except (dns.exception.DNSException, ValueError) as e:
+        LOG.debug('Unable to encode %(type)s rdata %(data)r: %(error)s',
+                  {'type': record_type, 'data': data, 'error': e})
+        return None
+    return output.getvalue()
+
+
+def rdata_from_wire(record_type, wire):
+    """Decodes rdata that was encoded by rdata_to_wire."""
+    return dns.rdata.from_wire(
+        dns.rdataclass.IN, rdatatype.from_text(record_type), wire, 0,
+        len(wire))
+
+
+def serial_gte(serial1, serial2):
+    """
+    Whether serial1 is equal to or greater than serial2, in the serial
+    number arithmetic of RFC 1982, where serials wrap around at 2 ** 32.
+    """
+    return (serial1 - serial2) % 2 ** 32 < 2 ** 31
+
+
 def do_axfr(zone_name, servers, timeout=None, source=None):
     """
     Requests an AXFR for a given zone name and process the response
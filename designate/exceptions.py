@@ -212,6 +212,12 @@ class InvalidZoneName(DesignateException):
     expected = True
 
 
+class InvalidBlacklistPattern(DesignateException):
+    error_code = 400
+    error_type = 'invalid_blacklist_pattern'
+    expected = True
+
+
 class InvalidRecordSetName(DesignateException):
     error_code = 400
     error_type = 'invalid_recordset_name'
@@ -239,6 +245,12 @@ class ZoneHasSubZone(DesignateException):
     error_type = 'zone_has_sub_zone'
 
 
+class ZoneVersionConflict(DesignateException):
+    expected = True
+    error_code = 409
+    error_type = 'zone_version_conflict'
+
+
 class Forbidden(DesignateException):
     error_code = 403
     error_type = 'forbidden'
@@ -0,0 +1,27 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from designate.export_store import base
+
+LOG = logging.getLogger(__name__)
+
+
+def get_export_store():
+    export_store_driver = cfg.CONF.export_store_driver
+
+    LOG.debug("Loading export store driver: %s", export_store_driver)
+
+    cls = base.ExportStore.get_driver(export_store_driver)
+
+    return cls()
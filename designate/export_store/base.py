@@ -0,0 +1,50 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import abc
+
+import six
+
+from designate.plugin import DriverPlugin
+
+
+@six.add_metaclass(abc.ABCMeta)
+class ExportStore(DriverPlugin):
+    """Base class for the stores of synchronous zone exports"""
+    __plugin_ns__ = 'designate.export_store'
+    __plugin_type__ = 'export_store'
+
+    @abc.abstractmethod
+    def write(self, export_id, chunks):
+        """
+        Store a zone export, replacing any previous one.
+
+        :param export_id: The ID of the ZoneExport.
+        :param chunks: An iterable over the text of the zone file.
+        """
+
+    @abc.abstractmethod
+    def read(self, export_id):
+        """
+        Read a zone export back.
+
+        :param export_id: The ID of the ZoneExport.
+        :return: An iterator over the zone file, in chunks of bytes.
+        :raises: ZoneExportNotFound if the zone export isn't stored.
+        """
+
+    @abc.abstractmethod
+    def delete(self, export_id):
+        """
+        Delete a zone export, if it is stored.
+
+        :param export_id: The ID of the ZoneExport.
+        """
@@ -0,0 +1,86 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import errno
+import os
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from designate import exceptions
+from designate.export_store import base
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+
+class FileExportStore(base.ExportStore):
+    """
+    Store the zone exports as files in a directory, which has to be shared
+    by the Workers writing them and the API services reading them.
+    """
+    __plugin_name__ = 'file'
+
+    def __init__(self):
+        super(FileExportStore, self).__init__()
+        self.path = CONF['export_store:file'].path
+        self.chunk_size = CONF['export_store:file'].chunk_size
+
+        if os.path.exists(self.path) and not os.path.isdir(self.path):
+            raise exceptions.ConfigurationError(
+                'The export store path %s is not a directory' % self.path)
+
+    def _filename(self, export_id):
+        return os.path.join(self.path, '%s.zone' % export_id)
+
+    def write(self, export_id, chunks):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+
+        # Write to a temporary file first, so the export is never read
+        # half written.
+        filename = self._filename(export_id)
+        temp_filename = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            with open(temp_filename, 'w') as output_fh:
+                for chunk in chunks:
+                    output_fh.write(chunk)
+            os.rename(temp_filename, filename)
+        except Exception:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            raise
+
+    def read(self, export_id):
+        try:
+            input_fh = open(self._filename(export_id), 'rb')
+        except IOError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            raise exceptions.ZoneExportNotFound(
+                'Zone export %s is not stored' % export_id)
+
+        return self._read_chunks(input_fh)
+
+    def _read_chunks(self, input_fh):
+        with input_fh:
+            while True:
+                chunk = input_fh.read(self.chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, export_id):
+        try:
+            os.remove(self._filename(export_id))
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
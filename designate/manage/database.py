@@ -19,6 +19,7 @@ from migrate.versioning import api as versioning_api
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from designate import storage
 from designate.manage import base
 from designate.sqlalchemy import utils
 
@@ -30,6 +31,8 @@ REPOSITORY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
                                           'migrate_repo'))
 cfg.CONF.import_opt('connection', 'designate.storage.impl_sqlalchemy',
                     group='storage:sqlalchemy')
+cfg.CONF.import_opt('storage_driver', 'designate.central',
+                    group='service:central')
 CONF = cfg.CONF
 INIT_VERSION = 69
 
@@ -51,3 +54,34 @@ class DatabaseCommands(base.Commands):
     @base.args('revision', nargs='?')
     def upgrade(self, revision):
         get_manager().upgrade(revision)
+
+    @base.name('backfill-record-wire')
+    @base.args('--batch-size', help='Number of records to read per query',
+               default=1000, type=int)
+    def backfill_record_wire(self, batch_size):
+        """
+        Store the wire format of records created before it was persisted,
+        so mdns does not need to parse their text rdata.
+        """
+        storage_api = storage.get_storage(
+            CONF['service:central'].storage_driver)
+        updated = storage_api.backfill_record_wire(
+            self.context, batch_size=batch_size)
+        print("Backfilled %d records" % updated)
+
+    @base.name('reconcile-usage')
+    def reconcile_usage(self):
+        """
+        Recount the zones, recordsets and records behind the usage counters
+        read by the quota checks, correcting any that drifted.
+        """
+        storage_api = storage.get_storage(
+            CONF['service:central'].storage_driver)
+        storage_api.begin()
+        try:
+            corrected = storage_api.reconcile_usage(self.context)
+        except Exception:
+            storage_api.rollback()
+            raise
+        storage_api.commit()
+        print("Corrected %d usage counters" % corrected)
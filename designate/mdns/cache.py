@@ -0,0 +1,248 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import threading
+import time
+
+from oslo_log import log as logging
+import oslo_messaging
+
+from designate.metrics import metrics
+
+LOG = logging.getLogger(__name__)
+
+
+class AXFRCache(object):
+    """A byte-budgeted LRU cache of rendered AXFR messages.
+
+    Entries are keyed by ``(zone_id, serial, max_message_size, tsig_scope)``
+    and hold a list of ``(answer_count, answer_wire)`` tuples, one per DNS
+    message of the transfer. Only the answer section is cached, the header,
+    question and TSIG signature are rebuilt for every request.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self.lock = threading.Lock()
+        self.data = collections.OrderedDict()
+        self.zones = collections.defaultdict(set)
+
+    @staticmethod
+    def _entry_size(messages):
+        return sum(len(wire) for _, wire in messages)
+
+    def _remove(self, key):
+        messages = self.data.pop(key)
+        self.size -= self._entry_size(messages)
+
+        zone_keys = self.zones[key[0]]
+        zone_keys.discard(key)
+        if not zone_keys:
+            del self.zones[key[0]]
+
+    def get(self, key):
+        with self.lock:
+            messages = self.data.get(key)
+            if messages is not None:
+                # Move the entry to the most recently used end.
+                del self.data[key]
+                self.data[key] = messages
+
+        if messages is None:
+            metrics.counter('mdns.axfr_cache.miss').increment()
+        else:
+            metrics.counter('mdns.axfr_cache.hit').increment()
+
+        return messages
+
+    def set(self, key, messages):
+        size = self._entry_size(messages)
+        if size > self.max_size:
+            LOG.debug('Not caching AXFR of %(zone_id)s, %(size)d bytes '
+                      'exceeds the cache size.',
+                      {'zone_id': key[0], 'size': size})
+            return
+
+        evicted = 0
+        with self.lock:
+            # Any entry for an older serial of this zone can never be served
+            # again, drop them now rather than waiting for them to age out.
+            for old_key in list(self.zones.get(key[0], ())):
+                if old_key[1] != key[1]:
+                    self._remove(old_key)
+
+            if key in self.data:
+                self._remove(key)
+
+            self.data[key] = messages
+            self.zones[key[0]].add(key)
+            self.size += size
+
+            while self.size > self.max_size:
+                self._remove(next(iter(self.data)))
+                evicted += 1
+
+        if evicted:
+            metrics.counter('mdns.axfr_cache.eviction').increment(evicted)
+        metrics.gauge().send('mdns.axfr_cache.bytes', self.size)
+
+    def invalidate(self, zone_id):
+        with self.lock:
+            for key in list(self.zones.get(zone_id, ())):
+                self._remove(key)
+
+
+def _ancestors(name):
+    """Returns a name and the names of its ancestors, without the root."""
+    labels = name.lower().split('.')
+    return ['.'.join(labels[i:]) for i in range(len(labels) - 1)]
+
+
+class AnswerCache(object):
+    """A TTL bounded LRU cache of the answers to record queries.
+
+    Entries are keyed by ``(qname, qtype, tsig_scope)`` and hold a
+    ``(zone_id, serial, rrset)`` tuple. Negative entries, for queries that
+    were refused, have neither a zone nor a rrset, and are indexed by every
+    name they fall under so those within a zone can be found.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = collections.OrderedDict()
+        self.zones = collections.defaultdict(set)
+        self.negative = set()
+        self.negative_names = collections.defaultdict(set)
+
+    def _remove(self, key):
+        _, zone_id, _, _ = self.data.pop(key)
+
+        if zone_id is None:
+            self.negative.discard(key)
+            for name in _ancestors(key[0]):
+                name_keys = self.negative_names[name]
+                name_keys.discard(key)
+                if not name_keys:
+                    del self.negative_names[name]
+            return
+
+        zone_keys = self.zones[zone_id]
+        zone_keys.discard(key)
+        if not zone_keys:
+            del self.zones[zone_id]
+
+    def get(self, key):
+        now = time.time()
+        answer = None
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None and entry[0] <= now:
+                self._remove(key)
+            elif entry is not None:
+                # Move the entry to the most recently used end.
+                del self.data[key]
+                self.data[key] = entry
+                answer = entry[1:]
+
+        if answer is None:
+            metrics.counter('mdns.answer_cache.miss').increment()
+        else:
+            metrics.counter('mdns.answer_cache.hit').increment()
+
+        return answer
+
+    def set(self, key, zone_id=None, serial=None, rrset=None):
+        evicted = 0
+        with self.lock:
+            if key in self.data:
+                self._remove(key)
+
+            self.data[key] = (time.time() + self.ttl, zone_id, serial, rrset)
+            if zone_id is None:
+                self.negative.add(key)
+                for name in _ancestors(key[0]):
+                    self.negative_names[name].add(key)
+            else:
+                self.zones[zone_id].add(key)
+
+            while len(self.data) > self.max_entries:
+                self._remove(next(iter(self.data)))
+                evicted += 1
+
+        if evicted:
+            metrics.counter('mdns.answer_cache.eviction').increment(evicted)
+        metrics.gauge().send('mdns.answer_cache.entries', len(self.data))
+
+    def invalidate(self, zone_id=None, serial=None, zone_name=None):
+        """Drop the answers of a zone, or of every zone if zone_id is None.
+
+        When a serial is given only the answers for older serials of the
+        zone are dropped. Unless the cached answers of the zone are all
+        current, the negative answers for names within the zone are dropped
+        along with them, as the change may have created the names they
+        refused. Every negative answer is dropped if the zone name is not
+        known.
+        """
+        with self.lock:
+            if zone_id is None:
+                keys = list(self.data)
+            else:
+                zone_keys = self.zones.get(zone_id, ())
+                keys = [
+                    key for key in zone_keys
+                    if serial is None or self.data[key][2] < serial
+                ]
+                if keys or serial is None or not zone_keys:
+                    if zone_name is None:
+                        keys.extend(self.negative)
+                    else:
+                        keys.extend(self.negative_names.get(
+                            zone_name.lower(), ()))
+
+            for key in keys:
+                self._remove(key)
+
+        if keys:
+            metrics.counter('mdns.answer_cache.invalidation').increment(
+                len(keys))
+
+
+class AnswerCacheEndpoint(object):
+    """Notification endpoint which invalidates an AnswerCache whenever a
+    zone, or the records within it, change
+    """
+    filter_rule = oslo_messaging.NotificationFilter(
+        event_type=r'^dns\.(zone\.(create|update|delete)|recordset\.\w+|'
+                   r'record\.\w+)$')
+
+    def __init__(self, answer_cache):
+        self.answer_cache = answer_cache
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        # The payload depends on the notification plugin, drop every answer
+        # if it doesn't tell us which zone changed.
+        payload = payload if isinstance(payload, dict) else {}
+        if event_type.startswith('dns.zone.'):
+            zone_id = payload.get('id')
+            zone_name = payload.get('name')
+        else:
+            zone_id = payload.get('zone_id')
+            zone_name = payload.get('zone_name')
+
+        LOG.debug('Invalidating the answer cache of zone %(zone_id)s after '
+                  '%(event_type)s',
+                  {'zone_id': zone_id, 'event_type': event_type})
+
+        self.answer_cache.invalidate(zone_id, zone_name=zone_name)
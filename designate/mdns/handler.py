@@ -13,20 +13,28 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import itertools
+import time
+
 import dns
+import dns.exception
 import dns.flags
 import dns.message
 import dns.opcode
 import dns.rcode
 import dns.rdataclass
 import dns.rdatatype
+import dns.resolver
 from oslo_config import cfg
 from oslo_log import log as logging
 import six
 
+from designate import dnsutils
 from designate import exceptions
 from designate.central import rpcapi as central_api
+from designate.mdns import cache
 from designate.mdns import xfr
+from designate.metrics import metrics
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -39,12 +47,38 @@ CONF.import_opt('default_pool_id', 'designate.central',
 TSIG_RRSIZE = 10 + 64 + 160 + 1
 
 
+def _timed(iterable, timings, key):
+    """Yield from iterable, adding the time spent producing each item, but
+    not the time spent by the consumer, to timings[key]
+    """
+    iterator = iter(iterable)
+    while True:
+        start_time = time.time()
+        try:
+            item = next(iterator)
+        except StopIteration as e:
+            timings[key] += time.time() - start_time
+            return e.value
+        timings[key] += time.time() - start_time
+        yield item
+
+
 class RequestHandler(xfr.XFRMixin):
-    def __init__(self, storage, tg):
+    def __init__(self, storage, tg, answer_cache=None):
         self._central_api = None
 
         self.storage = storage
         self.tg = tg
+        self.answer_cache = answer_cache
+
+        # The ids of the zones being checked after a NOTIFY, with the context
+        # and master of the NOTIFY received since the check started, if any.
+        self._notified_zones = {}
+
+        self.axfr_cache = None
+        if CONF['service:mdns'].axfr_cache_size:
+            self.axfr_cache = cache.AXFRCache(
+                CONF['service:mdns'].axfr_cache_size)
 
     @property
     def central_api(self):
@@ -67,14 +101,16 @@ class RequestHandler(xfr.XFRMixin):
                 return
 
             q_rrset = request.question[0]
-            # Handle AXFR and IXFR requests with an AXFR responses for now.
-            # It is permissible for a server to send an AXFR response when
-            # receiving an IXFR request.
-            if q_rrset.rdtype in (dns.rdatatype.AXFR, dns.rdatatype.IXFR):
+            if q_rrset.rdtype == dns.rdatatype.AXFR:
                 for response in self._handle_axfr(request):
                     yield response
                 return
 
+            elif q_rrset.rdtype == dns.rdatatype.IXFR:
+                for response in self._handle_ixfr(request):
+                    yield response
+                return
+
             else:
                 for response in self._handle_record_query(request):
                     yield response
@@ -146,11 +182,72 @@ class RequestHandler(xfr.XFRMixin):
             yield response
             return
 
+        # Acknowledge the NOTIFY straight away, the master doesn't need to
+        # wait for us to check its serial.
+        self._queue_notified_zone(context, zone, master_addr)
+
+        response.flags |= dns.flags.AA
+
+        yield response
+        return
+
+    def _queue_notified_zone(self, context, zone, master_addr):
+        """
+        Check the serial of a notified zone in the background, coalescing
+        the NOTIFYs received for a zone while its check is running into one
+        more check once it is done.
+        """
+        if zone.id in self._notified_zones:
+            # Only the latest master to notify us matters.
+            self._notified_zones[zone.id] = (context, master_addr)
+            return
+
+        self._notified_zones[zone.id] = None
+        self.tg.add_thread(
+            self._sync_notified_zone, context, zone, master_addr)
+
+    def _sync_notified_zone(self, context, zone, master_addr):
+        zone_id = zone.id
+        try:
+            while True:
+                self._check_notified_zone(context, zone, master_addr)
+
+                pending = self._notified_zones.get(zone_id)
+                if pending is None:
+                    return
+
+                self._notified_zones[zone_id] = None
+                context, master_addr = pending
+                # The zone may have been transferred since it was notified.
+                zone = self.storage.find_zone(context, {'id': zone_id})
+        except exceptions.ZoneNotFound:
+            LOG.info('Zone %(zone_id)s was deleted after being notified',
+                     {'zone_id': zone_id})
+        except Exception:
+            LOG.exception('Failed to sync %(zone_id)s after being notified',
+                          {'zone_id': zone_id})
+        finally:
+            self._notified_zones.pop(zone_id, None)
+
+    def _check_notified_zone(self, context, zone, master_addr):
         resolver = dns.resolver.Resolver()
         # According to RFC we should query the server that sent the NOTIFY
-        resolver.nameservers = [notify_addr]
+        resolver.nameservers = [master_addr.host]
+
+        try:
+            soa_answer = resolver.query(zone.name, 'SOA')
+        except dns.exception.DNSException as e:
+            LOG.warning(
+                'Failed to query the SOA of %(zone_id)s from %(master_addr)s: '
+                '%(error)s',
+                {
+                    'zone_id': zone.id,
+                    'master_addr': master_addr.to_data(),
+                    'error': e,
+                }
+            )
+            return
 
-        soa_answer = resolver.query(zone.name, 'SOA')
         soa_serial = soa_answer[0].serial
 
         if soa_serial == zone.serial:
@@ -164,19 +261,13 @@ class RequestHandler(xfr.XFRMixin):
             )
         else:
             LOG.info(
-                'Scheduling AXFR for %(zone_id)s from %(master_addr)s',
+                'Starting AXFR for %(zone_id)s from %(master_addr)s',
                 {
                     'zone_id': zone.id,
                     'master_addr': master_addr.to_data()
                 }
             )
-            self.tg.add_thread(self.zone_sync, context, zone,
-                               [master_addr])
-
-        response.flags |= dns.flags.AA
-
-        yield response
-        return
+            self.zone_sync(context, zone, [master_addr])
 
     def _zone_criterion_from_request(self, request, criterion=None):
         """Builds a bare criterion dict based on the request attributes"""
@@ -200,9 +291,10 @@ class RequestHandler(xfr.XFRMixin):
                                           'not implemented')
         return criterion
 
-    def _handle_axfr(self, request):
+    def _find_xfr_zone(self, request):
         context = request.environ['context']
         q_rrset = request.question[0]
+        xfr_type = dns.rdatatype.to_text(q_rrset.rdtype).lower()
 
         # First check if there is an existing zone
         # TODO(vinod) once validation is separated from the api,
@@ -215,57 +307,218 @@ class RequestHandler(xfr.XFRMixin):
                 request, {'name': name})
             zone = self.storage.find_zone(context, criterion)
         except exceptions.ZoneNotFound:
-            LOG.warning('ZoneNotFound while handling axfr request. '
-                        'Question was %(qr)s', {'qr': q_rrset})
+            LOG.warning('ZoneNotFound while handling %(xfr)s request. '
+                        'Question was %(qr)s',
+                        {'xfr': xfr_type, 'qr': q_rrset})
+        except exceptions.Forbidden:
+            LOG.warning('Forbidden while handling %(xfr)s request. '
+                        'Question was %(qr)s',
+                        {'xfr': xfr_type, 'qr': q_rrset})
+        else:
+            # A transfer of a newer serial than the cached answers were read
+            # at means they are stale, even if the notification of the
+            # change hasn't reached us yet.
+            if self.answer_cache is not None:
+                self.answer_cache.invalidate(
+                    zone.id, zone.serial, zone_name=zone.name)
+            return zone
+
+    def _handle_axfr(self, request, zone=None):
+        context = request.environ['context']
 
-            yield self._handle_query_error(request, dns.rcode.REFUSED)
+        if zone is None:
+            zone = self._find_xfr_zone(request)
+            if zone is None:
+                yield self._handle_query_error(request, dns.rcode.REFUSED)
+                return
+
+        cache_key = None
+        if self.axfr_cache is not None:
+            cache_key = self._axfr_cache_key(request, zone)
+            messages = self.axfr_cache.get(cache_key)
+            if messages is not None:
+                for answer_count, answer_wire in messages:
+                    yield self._finalize_packet(
+                        self._create_cached_axfr_renderer(
+                            request, answer_count, answer_wire),
+                        request)
+                return
+
+        # Stream the records from storage, the SOA is always the first row.
+        # The rows are read while rendering, tell the time spent on each.
+        timings = {'db': 0.0, 'total': 0.0}
+        criterion = {'zone_id': zone.id}
+        records = _timed(self.storage.find_recordsets_axfr(
+            context, criterion, stream=True), timings, 'db')
+
+        soa_record = next(records, None)
+        if soa_record is None or str(soa_record[1]) != 'SOA':
+            LOG.warning('Aborted AXFR of %(zone)s, no SOA record found.',
+                        {'zone': zone.name})
+            yield self._handle_query_error(request, dns.rcode.SERVFAIL)
             return
-        except exceptions.Forbidden:
-            LOG.warning('Forbidden while handling axfr request. '
-                        'Question was %(qr)s', {'qr': q_rrset})
 
+        # The AXFR response needs to have a SOA at the beginning and end.
+        records = itertools.chain([soa_record], records, [soa_record])
+        records = (
+            (record[3], record[2] if record[2] is not None else zone.ttl,
+             record[1], record[4], record[6])
+            for record in records
+        )
+
+        # Keep a copy of the answer section of every message, so that later
+        # transfers of the same serial can be served from the cache.
+        messages = []
+
+        completed = yield from _timed(
+            self._render_xfr(request, zone, records, messages),
+            timings, 'total')
+
+        metrics.timing('mdns.axfr.db_time', timings['db'])
+        metrics.timing('mdns.axfr.render_time',
+                       timings['total'] - timings['db'])
+
+        if completed and cache_key is not None:
+            self.axfr_cache.set(cache_key, messages)
+        return
+
+    def _handle_ixfr(self, request):
+        """
+        Answers an IXFR (RFC 1995) from the zone journal, falling back to an
+        AXFR whenever the journal does not cover the serial of the client.
+        """
+        context = request.environ['context']
+
+        zone = self._find_xfr_zone(request)
+        if zone is None:
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
-        # The AXFR response needs to have a SOA at the beginning and end.
-        criterion = {'zone_id': zone.id, 'type': 'SOA'}
-        soa_records = self.storage.find_recordsets_axfr(context, criterion)
+        # The client sends its current SOA in the authority section.
+        if (len(request.authority) != 1 or
+                request.authority[0].rdtype != dns.rdatatype.SOA):
+            LOG.debug('IXFR for %(zone)s without a SOA in the authority '
+                      'section', {'zone': zone.name})
+            yield self._handle_query_error(request, dns.rcode.FORMERR)
+            return
 
-        # Get all the records other than SOA
-        criterion = {'zone_id': zone.id, 'type': '!SOA'}
-        records = self.storage.find_recordsets_axfr(context, criterion)
+        client_serial = request.authority[0][0].serial
+
+        if dnsutils.serial_gte(client_serial, zone.serial):
+            # The client is up to date, answer with only the current SOA.
+            soa = self.storage.find_recordset(
+                context, {'zone_id': zone.id, 'type': 'SOA'})
+            records = [
+                (soa.name, soa.ttl or zone.ttl, soa.type, record.data, None)
+                for record in soa.records
+            ]
+            yield from self._render_xfr(request, zone, records)
+            return
 
-        # Place the SOA RRSet at the front and end of the RRSet list
-        records.insert(0, soa_records[0])
-        records.append(soa_records[0])
+        journal = self.storage.find_zone_journal(
+            context, zone.id, client_serial)
+        records = self._get_ixfr_records(zone, journal, client_serial)
 
-        # Render the results, yielding a packet after each TooBig exception.
-        renderer = None
-        while records:
-            record = records.pop(0)
+        if records is None:
+            LOG.debug('Journal of %(zone)s does not cover serial %(serial)d, '
+                      'falling back to AXFR',
+                      {'zone': zone.name, 'serial': client_serial})
+            metrics.counter('mdns.ixfr.fallback').increment()
+            yield from self._handle_axfr(request, zone)
+            return
 
-            rrname = str(record[3])
-            ttl = int(record[2]) if record[2] is not None else zone.ttl
-            rrtype = str(record[1])
-            rdata = [str(record[4])]
+        metrics.counter('mdns.ixfr.incremental').increment()
+        yield from self._render_xfr(request, zone, records)
 
-            rrset = dns.rrset.from_text_list(
-                rrname, ttl, dns.rdataclass.IN, rrtype, rdata,
-            )
+    @staticmethod
+    def _get_ixfr_records(zone, journal, client_serial):
+        """
+        Turns the journal entries into the answer records of an IXFR, or
+        returns None when they don't form an unbroken chain of differences
+        from the client serial to the current zone serial.
+
+        The answer starts and ends with the current SOA, in between every
+        serial contributes its old SOA, the deleted records, its new SOA and
+        the added records.
+        """
+        differences = []
+        for serial, rows in itertools.groupby(journal, lambda row: row[0]):
+            deleted = []
+            added = []
+            for _, action, name, rrtype, ttl, data in rows:
+                records = deleted if action == 'DEL' else added
+                # The journal only keeps the text rdata.
+                record = (name, ttl, rrtype, data, None)
+                if rrtype == 'SOA':
+                    records.insert(0, record)
+                else:
+                    records.append(record)
+            differences.append((serial, deleted, added))
+
+        current_serial = client_serial
+        for serial, deleted, added in differences:
+            if not (deleted and deleted[0][2] == 'SOA' and
+                    added and added[0][2] == 'SOA'):
+                return None
+            if int(deleted[0][3].split()[2]) != current_serial:
+                return None
+            if int(added[0][3].split()[2]) != serial:
+                return None
+            current_serial = serial
+
+        if current_serial != zone.serial:
+            return None
+
+        current_soa = differences[-1][2][0]
+        records = [current_soa]
+        for _, deleted, added in differences:
+            records.extend(deleted)
+            records.extend(added)
+        records.append(current_soa)
+
+        return records
+
+    def _render_xfr(self, request, zone, records, messages=None):
+        """
+        Render the (name, ttl, type, data, wire) records of a zone transfer,
+        yielding a packet after each TooBig exception. The rdata is decoded
+        from wire when it is set, and parsed from data otherwise.
+
+        The answer section of every packet is appended to messages, if given.
+
+        :return: True if the whole transfer was rendered, False if it had to
+                 be aborted.
+        """
+        renderer = None
+        answer_offset = None
+        for rrname, ttl, rrtype, rdata, wire in records:
+            rrname = str(rrname)
+            rrtype = str(rrtype)
+
+            if wire is not None:
+                rrset = dns.rrset.from_rdata(
+                    rrname, int(ttl),
+                    dnsutils.rdata_from_wire(rrtype, bytes(wire)),
+                )
+            else:
+                rrset = dns.rrset.from_text_list(
+                    rrname, int(ttl), dns.rdataclass.IN, rrtype, [str(rdata)],
+                )
 
             while True:
                 try:
                     if not renderer:
                         renderer = self._create_axfr_renderer(request)
+                        answer_offset = renderer.output.tell()
                     renderer.add_rrset(dns.renderer.ANSWER, rrset)
                     break
                 except dns.exception.TooBig:
                     if renderer.counts[dns.renderer.ANSWER] == 0:
                         # We've received a TooBig from the first attempted
                         # RRSet in this packet. Log a warning and abort the
-                        # AXFR.
+                        # transfer.
                         LOG.warning(
-                            'Aborted AXFR of %(zone)s, a single RR '
+                            'Aborted XFR of %(zone)s, a single RR '
                             '(%(rrset_type)s %(rrset_name)s) '
                             'exceeded the max message size.',
                             {
@@ -278,19 +531,37 @@ class RequestHandler(xfr.XFRMixin):
                         yield self._handle_query_error(
                             request, dns.rcode.SERVFAIL
                         )
-                        return
+                        return False
 
+                    if messages is not None:
+                        messages.append(
+                            self._get_answer_section(renderer, answer_offset))
                     yield self._finalize_packet(renderer, request)
                     renderer = None
 
         if renderer:
+            if messages is not None:
+                messages.append(
+                    self._get_answer_section(renderer, answer_offset))
             yield self._finalize_packet(renderer, request)
-        return
+
+        return True
 
     def _handle_record_query(self, request):
         """Handle a DNS QUERY request for a record"""
         context = request.environ['context']
-        response = dns.message.make_response(request)
+
+        cache_key = None
+        if self.answer_cache is not None:
+            cache_key = self._answer_cache_key(request)
+            answer = self.answer_cache.get(cache_key)
+            if answer is not None:
+                zone_id, _, r_rrset = answer
+                if zone_id is None:
+                    yield self._handle_query_error(request, dns.rcode.REFUSED)
+                else:
+                    yield self._make_record_response(request, r_rrset)
+                return
 
         try:
             q_rrset = request.question[0]
@@ -325,12 +596,14 @@ class RequestHandler(xfr.XFRMixin):
             # If zone transfers needs different errors, we could revisit this.
             LOG.info('NotFound, refusing. Question was %(qr)s',
                      {'qr': q_rrset})
+            self._cache_answer(cache_key)
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
         except exceptions.Forbidden:
             LOG.info('Forbidden, refusing. Question was %(qr)s',
                      {'qr': q_rrset})
+            self._cache_answer(cache_key)
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
@@ -342,21 +615,49 @@ class RequestHandler(xfr.XFRMixin):
         except exceptions.ZoneNotFound:
             LOG.warning('ZoneNotFound while handling query request. '
                         'Question was %(qr)s', {'qr': q_rrset})
+            self._cache_answer(cache_key)
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
         except exceptions.Forbidden:
             LOG.warning('Forbidden while handling query request. '
                         'Question was %(qr)s', {'qr': q_rrset})
+            self._cache_answer(cache_key)
             yield self._handle_query_error(request, dns.rcode.REFUSED)
             return
 
         r_rrset = self._convert_to_rrset(zone, recordset)
+        self._cache_answer(cache_key, zone, r_rrset)
+        yield self._make_record_response(request, r_rrset)
+
+    @staticmethod
+    def _make_record_response(request, r_rrset):
+        response = dns.message.make_response(request)
         response.answer = [r_rrset] if r_rrset else []
         response.set_rcode(dns.rcode.NOERROR)
         # For all the data stored in designate mdns is Authoritative
         response.flags |= dns.flags.AA
-        yield response
+        return response
+
+    def _answer_cache_key(self, request):
+        q_rrset = request.question[0]
+
+        return (
+            q_rrset.name.to_text(),
+            q_rrset.rdtype,
+            self._get_tsig_scope(request),
+        )
+
+    def _cache_answer(self, cache_key, zone=None, r_rrset=None):
+        """Caches an answer, or a refusal if no zone is given."""
+        if cache_key is None:
+            return
+        if zone is None:
+            self.answer_cache.set(cache_key)
+        else:
+            self.answer_cache.invalidate(
+                zone.id, zone.serial, zone_name=zone.name)
+            self.answer_cache.set(cache_key, zone.id, zone.serial, r_rrset)
 
     def _create_axfr_renderer(self, request):
         # Build up a dummy response, we're stealing it's logic for building
@@ -373,6 +674,36 @@ class RequestHandler(xfr.XFRMixin):
             renderer.add_question(q.name, q.rdtype, q.rdclass)
         return renderer
 
+    def _create_cached_axfr_renderer(self, request, answer_count,
+                                     answer_wire):
+        renderer = self._create_axfr_renderer(request)
+        renderer.section = dns.renderer.ANSWER
+        renderer.output.write(answer_wire)
+        renderer.counts[dns.renderer.ANSWER] = answer_count
+        return renderer
+
+    @staticmethod
+    def _get_tsig_scope(request):
+        tsigkey = request.environ.get('tsigkey')
+        if tsigkey is None:
+            return None
+        return (tsigkey.scope, tsigkey.resource_id)
+
+    def _axfr_cache_key(self, request, zone):
+        return (
+            zone.id,
+            zone.serial,
+            self._get_max_message_size(request.had_tsig),
+            self._get_tsig_scope(request),
+        )
+
+    @staticmethod
+    def _get_answer_section(renderer, answer_offset):
+        return (
+            renderer.counts[dns.renderer.ANSWER],
+            renderer.output.getvalue()[answer_offset:],
+        )
+
     @staticmethod
     def _convert_to_rrset(zone, recordset):
         # Fetch the zone or the config ttl if the recordset ttl is null
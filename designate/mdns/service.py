@@ -15,11 +15,14 @@
 # under the License.
 from oslo_config import cfg
 from oslo_log import log as logging
+import oslo_messaging as messaging
 
 from designate import dnsutils
+from designate import rpc
 from designate import service
 from designate import storage
 from designate import utils
+from designate.mdns import cache
 from designate.mdns import handler
 from designate.mdns import notify
 from designate.mdns import xfr
@@ -34,6 +37,7 @@ class Service(service.RPCService):
 
     def __init__(self):
         self._storage = None
+        self._cache_listener = None
 
         super(Service, self).__init__(
             self.service_name, cfg.CONF['service:mdns'].topic,
@@ -48,16 +52,58 @@ class Service(service.RPCService):
             cfg.CONF['service:mdns'].listen,
             cfg.CONF['service:mdns'].tcp_backlog,
             cfg.CONF['service:mdns'].tcp_recv_timeout,
+            udp_recv_batch_size=cfg.CONF['service:mdns'].udp_recv_batch_size,
+            udp_queue_size=cfg.CONF['service:mdns'].udp_queue_size,
+            udp_queue_threads=cfg.CONF['service:mdns'].udp_queue_threads,
+            tcp_pipeline_size=cfg.CONF['service:mdns'].tcp_pipeline_size,
+            tcp_max_conns_per_client=(
+                cfg.CONF['service:mdns'].tcp_max_conns_per_client),
         )
 
     def start(self):
         super(Service, self).start()
+        self._start_cache_listener()
         self.dns_service.start()
 
     def stop(self, graceful=True):
         self.dns_service.stop()
+
+        # Try to shut the connection down, but if we get any sort of
+        # errors, go ahead and ignore them.. as we're shutting down anyway
+        try:
+            if self._cache_listener:
+                self._cache_listener.stop()
+        except Exception as e:
+            LOG.warning(
+                'Unable to gracefully stop the notification listener: %s', e
+            )
+
         super(Service, self).stop(graceful)
 
+    def _start_cache_listener(self):
+        # Invalidate the cached TSIG keys and answers whenever central
+        # notifies us of a change to them.
+        targets = [
+            messaging.Target(topic=topic)
+            for topic in CONF.oslo_messaging_notifications.topics
+        ]
+        endpoints = [dnsutils.TsigKeyCacheEndpoint(self.tsigkey_cache)]
+        if self.answer_cache is not None:
+            endpoints.append(cache.AnswerCacheEndpoint(self.answer_cache))
+
+        # Each member of a listener pool only receives a share of the
+        # notifications, so every process, including the ones forked for
+        # the workers of a host, listens in a pool of its own. The pools
+        # are numbered by worker so that restarts reuse their queues.
+        prefix = (CONF['service:mdns'].cache_listener_pool or
+                  'designate-mdns-%s' % CONF.host)
+        pool = '%s-%d' % (prefix, utils.get_worker_slot(prefix))
+
+        self._cache_listener = rpc.get_notification_listener(
+            targets, endpoints, pool=pool
+        )
+        self._cache_listener.start()
+
     @property
     def storage(self):
         if not self._storage:
@@ -70,15 +116,36 @@ class Service(service.RPCService):
     def service_name(self):
         return 'mdns'
 
+    @property
+    @utils.cache_result
+    def tsigkey_cache(self):
+        return dnsutils.TsigKeyCache(
+            self.storage, CONF['service:mdns'].tsigkey_cache_ttl
+        )
+
+    @property
+    @utils.cache_result
+    def answer_cache(self):
+        if not CONF['service:mdns'].answer_cache_size:
+            return None
+        return cache.AnswerCache(
+            CONF['service:mdns'].answer_cache_size,
+            CONF['service:mdns'].answer_cache_ttl
+        )
+
     @property
     @utils.cache_result
     def dns_application(self):
         # Create an instance of the RequestHandler class and wrap with
         # necessary middleware.
-        application = handler.RequestHandler(self.storage, self.tg)
-        application = dnsutils.TsigInfoMiddleware(application, self.storage)
+        application = handler.RequestHandler(
+            self.storage, self.tg, answer_cache=self.answer_cache
+        )
+        application = dnsutils.TsigInfoMiddleware(
+            application, self.tsigkey_cache
+        )
         application = dnsutils.SerializationMiddleware(
-            application, dnsutils.TsigKeyring(self.storage)
+            application, dnsutils.TsigKeyring(self.tsigkey_cache)
         )
 
         return application
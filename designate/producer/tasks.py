@@ -23,6 +23,7 @@ from designate.worker import rpcapi as worker_rpcapi
 
 from oslo_config import cfg
 from oslo_log import log as logging
+import oslo_messaging as messaging
 from oslo_utils import timeutils
 
 LOG = logging.getLogger(__name__)
@@ -126,6 +127,40 @@ class DeletedZonePurgeTask(PeriodicTask):
         )
 
 
+class ZoneJournalPurgeTask(PeriodicTask):
+    """Purge the oldest entries from the zone journals.
+    Only the changes of the newest max_serials serials of each zone are kept,
+    older serials are transferred with AXFR instead of IXFR.
+    """
+    __plugin_name__ = 'zone_journal_purge'
+
+    def __init__(self):
+        super(ZoneJournalPurgeTask, self).__init__()
+
+    def __call__(self):
+        """Call the Central API to trim the zone journals in our sharding
+        range.
+        """
+        pstart, pend = self._my_range()
+        LOG.info(
+            "Performing zone journal purging for %(start)s to %(end)s",
+            {
+                "start": pstart,
+                "end": pend
+            })
+
+        criterion = self._filter_between('zone_shard')
+
+        ctxt = context.DesignateContext.get_admin_context()
+        ctxt.all_tenants = True
+
+        self.central_api.purge_zone_journal(
+            ctxt,
+            criterion,
+            CONF[self.name].max_serials,
+        )
+
+
 class PeriodicExistsTask(PeriodicTask):
     __plugin_name__ = 'periodic_exists'
 
@@ -265,18 +300,37 @@ class PeriodicGenerateDelayedNotifyTask(PeriodicTask):
 
 
 class WorkerPeriodicRecovery(PeriodicTask):
+    """Recover the zones in ERROR or stuck in PENDING, up to "batch_size"
+    zones per run, resuming after the zones the previous run recovered
+    """
     __plugin_name__ = 'worker_periodic_recovery'
 
+    def __init__(self):
+        super(WorkerPeriodicRecovery, self).__init__()
+        self.marker = None
+
+    def on_partition_change(self, my_partitions, members, event):
+        super(WorkerPeriodicRecovery, self).on_partition_change(
+            my_partitions, members, event)
+        self.marker = None
+
     def __call__(self):
         pstart, pend = self._my_range()
         LOG.info(
-            "Recovering zones for shards %(start)s to %(end)s",
+            "Recovering zones for shards %(start)s to %(end)s after "
+            "%(marker)s",
             {
                 "start": pstart,
-                "end": pend
+                "end": pend,
+                "marker": self.marker
             })
 
         ctxt = context.DesignateContext.get_admin_context()
         ctxt.all_tenants = True
 
-        self.worker_api.recover_shard(ctxt, pstart, pend)
+        try:
+            self.marker = self.worker_api.recover_shard(
+                ctxt, pstart, pend, marker=self.marker)
+        except messaging.MessagingException as e:
+            # Try again from the same zone on the next run.
+            LOG.warning('Failed to recover zones: %s', e)
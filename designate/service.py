@@ -17,12 +17,19 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import collections
 import errno
 import socket
 import struct
 import threading
 
+import eventlet
 import eventlet.debug
+import eventlet.event
+import eventlet.greenpool
+import eventlet.hubs
+import eventlet.queue
+import eventlet.semaphore
 from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_service import service
@@ -139,12 +146,20 @@ class WSGIService(Service):
 class DNSService(object):
     _TCP_RECV_MAX_SIZE = 65535
 
-    def __init__(self, app, tg, listen, tcp_backlog, tcp_recv_timeout):
+    def __init__(self, app, tg, listen, tcp_backlog, tcp_recv_timeout,
+                 udp_recv_batch_size=1, udp_queue_size=0,
+                 udp_queue_threads=1, tcp_pipeline_size=1,
+                 tcp_max_conns_per_client=0):
         self._running = threading.Event()
         self.app = app
         self.tg = tg
         self.tcp_backlog = tcp_backlog
         self.tcp_recv_timeout = tcp_recv_timeout
+        self.tcp_pipeline_size = tcp_pipeline_size
+        self.tcp_max_conns_per_client = tcp_max_conns_per_client
+        self.udp_recv_batch_size = udp_recv_batch_size
+        self.udp_queue_size = udp_queue_size
+        self.udp_queue_threads = udp_queue_threads
         self.listen = listen
         metrics.init()
 
@@ -154,10 +169,17 @@ class DNSService(object):
 
         self._dns_socks_tcp = []
         self._dns_socks_udp = []
+        self._udp_queue = None
+        self._tcp_conns = collections.Counter()
 
     def start(self):
         self._running.set()
 
+        if self.udp_queue_size:
+            self._udp_queue = eventlet.queue.LightQueue(self.udp_queue_size)
+            for i in range(self.udp_queue_threads):
+                self.tg.add_thread(self._dns_handle_udp_queue)
+
         addresses = map(
             netutils.parse_host_port,
             set(self.listen)
@@ -167,6 +189,10 @@ class DNSService(object):
             self._start(address[0], address[1])
 
     def _start(self, host, port):
+        # NOTE: The sockets are bound by every worker process after it has
+        #       been forked, with SO_REUSEPORT set, so the kernel balances
+        #       the queries across the workers rather than having them all
+        #       wait on the same socket.
         sock_tcp = utils.bind_tcp(
             host, port, self.tcp_backlog)
 
@@ -188,6 +214,14 @@ class DNSService(object):
         for sock_udp in self._dns_socks_udp:
             sock_udp.close()
 
+        if self._udp_queue is not None:
+            # Wake up the queue threads, so they notice we're stopping.
+            for i in range(self.udp_queue_threads):
+                try:
+                    self._udp_queue.put_nowait(None)
+                except eventlet.queue.Full:
+                    break
+
     def _dns_handle_tcp(self, sock_tcp):
         LOG.info('_handle_tcp thread started')
 
@@ -206,6 +240,18 @@ class DNSService(object):
                     LOG.debug('Flow info: %(host)s scope: %(port)d',
                               {'host': addr[2], 'port': addr[3]})
 
+                if (self.tcp_max_conns_per_client and
+                        self._tcp_conns[addr[0]] >=
+                        self.tcp_max_conns_per_client):
+                    LOG.warning('Too many TCP connections from: %(host)s, '
+                                'closing the connection',
+                                {'host': addr[0]})
+                    metrics.counter('dns.tcp.refused').increment()
+                    client.close()
+                    client = None
+                    continue
+                self._tcp_conns[addr[0]] += 1
+
                 # Dispatch a thread to handle the connection
                 self.tg.add_thread(self._dns_handle_tcp_conn, addr, client)
 
@@ -230,9 +276,9 @@ class DNSService(object):
     def _dns_handle_tcp_conn(self, addr, client):
         """
         Handle a DNS Query over TCP. Multiple queries can be pipelined
-        through the same TCP connection but they will be processed
-        sequentially.
-        See https://tools.ietf.org/html/draft-ietf-dnsop-5966bis-03
+        through the same TCP connection, up to tcp_pipeline_size of them are
+        processed concurrently and their responses are sent as soon as they
+        are ready, in any order (RFC 7766, section 6.2.1.1).
         Raises no exception: it's to be run in an eventlet green thread
 
         :param addr: Tuple of the client's (IPv4 addr, Port) or
@@ -243,42 +289,42 @@ class DNSService(object):
         :raises: None
         """
         host, port = addr[:2]
+        pool = eventlet.greenpool.GreenPool(self.tcp_pipeline_size)
+        send_lock = eventlet.semaphore.Semaphore()
+        # The queries in flight on this connection, by message ID.
+        in_flight = {}
+
+        buf = bytearray(self._TCP_RECV_MAX_SIZE)
+        view = memoryview(buf)
         try:
             # The whole loop lives in a try/except block. On exceptions, the
             # connection is closed: there would be little chance to save
             # the connection after a struct error, a socket error.
             while True:
                 # Decode the first 2 bytes containing the query length
-                expected_length_raw = client.recv(2)
-                if len(expected_length_raw) == 0:
+                if not self._recv_into(client, view[:2]):
                     break
-                (expected_length,) = struct.unpack('!H', expected_length_raw)
+                (expected_length,) = struct.unpack_from('!H', buf)
 
                 # Keep receiving data until we've got all the data we expect
                 # The buffer contains only one query at a time
-                buf = b''
-                while len(buf) < expected_length:
-                    recv_size = min(expected_length - len(buf),
-                                    self._TCP_RECV_MAX_SIZE)
-                    data = client.recv(recv_size)
-                    if not data:
-                        break
-                    buf += data
-
-                query = buf
-
-                # Call into the DNS Application itself with payload and addr
-                for response in self.app(
-                        {'payload': query, 'addr': addr}):
-
-                    # Send back a response only if present
-                    if response is None:
-                        continue
-
-                    # Handle TCP Responses
-                    msg_length = len(response)
-                    tcp_response = struct.pack("!H", msg_length) + response
-                    client.sendall(tcp_response)
+                if not self._recv_into(client, view[:expected_length]):
+                    break
+
+                query = bytes(view[:expected_length])
+
+                # A client may reuse the message ID of a query still in
+                # flight, wait for that one to be answered first so the
+                # responses can't be mixed up.
+                message_id = query[:2]
+                if message_id in in_flight:
+                    in_flight[message_id].wait()
+                in_flight[message_id] = eventlet.event.Event()
+
+                # Waits for a free slot when tcp_pipeline_size queries are
+                # already being processed.
+                pool.spawn_n(self._dns_handle_tcp_query, addr, client,
+                             query, send_lock, in_flight, message_id)
 
         except socket.timeout:
             LOG.info('TCP Timeout from: %(host)s:%(port)d',
@@ -296,8 +342,95 @@ class DNSService(object):
             LOG.exception('Unknown exception handling TCP request from: '
                           "%(host)s:%(port)d", {'host': host, 'port': port})
         finally:
+            # Let the queries we've read finish before closing the
+            # connection, the client is still waiting for their responses.
+            pool.waitall()
             if client:
                 client.close()
+            self._tcp_conns[host] -= 1
+            if self._tcp_conns[host] <= 0:
+                del self._tcp_conns[host]
+
+    def _dns_handle_tcp_query(self, addr, client, query, send_lock,
+                              in_flight, message_id):
+        """
+        Handle a single DNS Query read from a TCP connection
+        Raises no exception: it's to be run in an eventlet green thread
+        """
+        host, port = addr[:2]
+        try:
+            # Call into the DNS Application itself with payload and addr
+            for response in self.app(
+                    {'payload': query, 'addr': addr}):
+
+                # Send back a response only if present
+                if response is None:
+                    continue
+
+                # Other queries may be answered between the messages of a
+                # zone transfer, but never within one.
+                with send_lock:
+                    self._tcp_send(client, response)
+
+        except socket.timeout:
+            LOG.info('TCP Timeout from: %(host)s:%(port)d',
+                     {'host': host, 'port': port})
+        except socket.error as e:
+            errname = errno.errorcode.get(e.args[0], e.args[0])
+            LOG.warning('Socket error %(err)s from: %(host)s:%(port)d',
+                        {'host': host, 'port': port, 'err': errname})
+        except Exception:
+            LOG.exception('Unknown exception handling TCP request from: '
+                          "%(host)s:%(port)d", {'host': host, 'port': port})
+        finally:
+            in_flight.pop(message_id).send()
+
+    @staticmethod
+    def _recv_into(client, view):
+        """
+        Fill a memoryview from a socket
+
+        :returns: False if the connection was closed before it was filled
+        """
+        received = 0
+        while received < len(view):
+            size = client.recv_into(view[received:])
+            if not size:
+                return False
+            received += size
+        return True
+
+    def _tcp_send(self, client, response):
+        """
+        Send a response prefixed with its length, as a single vectored send
+        rather than copying the response to prepend the length.
+        """
+        buffers = [struct.pack('!H', len(response)), memoryview(response)]
+
+        if not hasattr(client, 'sendmsg'):
+            client.sendall(b''.join(buffers))
+            return
+
+        while buffers:
+            try:
+                sent = client.sendmsg(buffers)
+            except BlockingIOError:
+                # The green socket doesn't wrap sendmsg, wait for the send
+                # buffer to drain ourselves.
+                eventlet.hubs.trampoline(
+                    client.fileno(), write=True,
+                    timeout=self.tcp_recv_timeout or None,
+                    timeout_exc=socket.timeout)
+                continue
+
+            # Drop whatever was sent, which may be part of a buffer.
+            while sent:
+                if sent >= len(buffers[0]):
+                    sent -= len(buffers[0])
+                    buffers.pop(0)
+                else:
+                    buffers[0] = buffers[0][sent:]
+                    sent = 0
 
     def _dns_handle_udp(self, sock_udp):
         """Handle a DNS Query over UDP in a dedicated thread
@@ -308,18 +441,27 @@ class DNSService(object):
         """
         LOG.info('_handle_udp thread started')
 
+        # The green socket waits on the hub whenever it has nothing to read,
+        # the socket it wraps doesn't, which is what we need to drain the
+        # queries that are already waiting without going back to the hub.
+        raw_sock_udp = getattr(sock_udp, 'fd', sock_udp)
+
         while self._running.is_set():
             try:
                 # TODO(kiall): Determine the appropriate default value for
                 #              UDP recvfrom.
                 payload, addr = sock_udp.recvfrom(8192)
-
-                LOG.debug('Handling UDP Request from: %(host)s:%(port)d',
-                          {'host': addr[0], 'port': addr[1]})
-
-                # Dispatch a thread to handle the query
-                self.tg.add_thread(self._dns_handle_udp_query, sock_udp, addr,
-                                   payload)
+                self._dispatch_udp_query(sock_udp, addr, payload)
+
+                # Drain the queries already waiting on the socket, up to the
+                # batch size, then let the ones we've read run.
+                for i in range(self.udp_recv_batch_size - 1):
+                    payload, addr = raw_sock_udp.recvfrom(
+                        8192, socket.MSG_DONTWAIT)
+                    self._dispatch_udp_query(sock_udp, addr, payload)
+                eventlet.sleep()
+            except BlockingIOError:
+                pass
             except socket.timeout:
                 pass
             except socket.error as e:
@@ -331,6 +473,37 @@ class DNSService(object):
                               '%(host)s:%(port)d',
                               {'host': addr[0], 'port': addr[1]})
 
+    def _dispatch_udp_query(self, sock, addr, payload):
+        LOG.debug('Handling UDP Request from: %(host)s:%(port)d',
+                  {'host': addr[0], 'port': addr[1]})
+
+        if self._udp_queue is None:
+            # Dispatch a thread to handle the query
+            self.tg.add_thread(self._dns_handle_udp_query, sock, addr,
+                               payload)
+            return
+
+        try:
+            self._udp_queue.put_nowait((sock, addr, payload))
+        except eventlet.queue.Full:
+            # The client will retry, which is cheaper for everyone than
+            # queueing up queries that we're too busy to answer in time.
+            LOG.debug('UDP queue full, dropping request from: '
+                      '%(host)s:%(port)d',
+                      {'host': addr[0], 'port': addr[1]})
+            metrics.counter('dns.udp.dropped').increment()
+
+    def _dns_handle_udp_queue(self):
+        """Handle the queued DNS Queries over UDP in a dedicated thread
+
+        :raises: None
+        """
+        while self._running.is_set():
+            item = self._udp_queue.get()
+            if item is None:
+                continue
+            self._dns_handle_udp_query(*item)
+
     def _dns_handle_udp_query(self, sock, addr, payload):
         """
         Handle a DNS Query over UDP
@@ -524,7 +524,8 @@ class SQLAlchemy(object):
         return total_count, rrsets
 
     def _update(self, context, table, obj, exc_dup, exc_notfound,
-                skip_values=None):
+                skip_values=None, extra_values=None, expected_version=None,
+                exc_conflict=None):
         # TODO(graham): Re Enable this
 
         # This was disabled as all the tests generate invalid Objects
@@ -538,6 +539,10 @@ class SQLAlchemy(object):
             for skip_value in skip_values:
                 values.pop(skip_value, None)
 
+        if extra_values is not None:
+            for key in extra_values:
+                values[key] = extra_values[key]
+
         query = table.update()\
                      .where(table.c.id == obj.id)\
                      .values(**values)
@@ -546,6 +551,11 @@ class SQLAlchemy(object):
         query = self._apply_deleted_criteria(context, table, query)
         query = self._apply_version_increment(context, table, query)
 
+        if expected_version is not None:
+            # NOTE: A conditional UPDATE, which only matches while nobody
+            #       else has updated the row since expected_version was read.
+            query = query.where(table.c.version == expected_version)
+
         try:
             resultproxy = self.session.execute(query)
         except oslo_db_exception.DBDuplicateEntry:
@@ -553,6 +563,10 @@ class SQLAlchemy(object):
             raise exc_dup(msg)
 
         if resultproxy.rowcount != 1:
+            if expected_version is not None and self._exists(
+                    context, table, obj.id):
+                msg = "%s was updated concurrently" % obj.obj_name()
+                raise exc_conflict(msg)
             msg = "Could not find %s" % obj.obj_name()
             raise exc_notfound(msg)
 
@@ -562,6 +576,13 @@ class SQLAlchemy(object):
 
         return _set_object_from_model(obj, resultproxy.fetchone())
 
+    def _exists(self, context, table, id_):
+        query = select([table.c.id]).where(table.c.id == id_)
+        query = self._apply_tenant_criteria(context, table, query)
+        query = self._apply_deleted_criteria(context, table, query)
+
+        return self.session.execute(query).first() is not None
+
     def _delete(self, context, table, obj, exc_notfound, hard_delete=False):
         """Perform item deletion or soft-delete.
         """
@@ -622,3 +643,32 @@ class SQLAlchemy(object):
         # show up as ValueError
         except ValueError as value_error:
             raise exceptions.ValueError(six.text_type(value_error))
+
+    def _select_raw_iter(self, context, table, criterion, query=None,
+                         batch_size=1000):
+        """Like _select_raw, but yields the rows as they are read from a
+        server side cursor, rather than loading the full result set into
+        memory.
+        """
+        # Build the query
+        if query is None:
+            query = select([table])
+
+        query = self._apply_criterion(table, query, criterion)
+        query = self._apply_deleted_criteria(context, table, query)
+        query = query.execution_options(stream_results=True)
+
+        try:
+            resultproxy = self.session.execute(query)
+        except ValueError as value_error:
+            raise exceptions.ValueError(six.text_type(value_error))
+
+        try:
+            while True:
+                rows = resultproxy.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            resultproxy.close()
@@ -27,6 +27,7 @@ from designate.storage import base
 
 LOG = logging.getLogger(__name__)
 RETRY_STATE = threading.local()
+TRANSACTION_STATE = threading.local()
 
 
 def get_storage(storage_driver):
@@ -104,6 +105,58 @@ def retry(cb=None, retries=150, delay=50, deep_copy=True):
     return outer
 
 
+def in_transaction():
+    """Whether the thread is within a transaction"""
+    return bool(getattr(TRANSACTION_STATE, 'depth', 0))
+
+
+def transaction_state():
+    """Return a dict which lasts as long as the outermost transaction of the
+    thread, whether it is committed or rolled back. Outside of a transaction
+    a new, empty, dict is returned.
+    """
+    if not in_transaction():
+        return {}
+    return TRANSACTION_STATE.values
+
+
+def before_commit(callback):
+    """Call callback right before the outermost transaction of the thread is
+    committed, within it. Outside of a transaction callback is called right
+    away.
+    """
+    if not in_transaction():
+        callback()
+        return
+    TRANSACTION_STATE.callbacks.append(callback)
+
+
+def _begin_transaction(storage):
+    storage.begin()
+
+    if not in_transaction():
+        TRANSACTION_STATE.depth = 0
+        TRANSACTION_STATE.values = {}
+        TRANSACTION_STATE.callbacks = []
+    TRANSACTION_STATE.depth += 1
+
+
+def _commit_transaction(storage):
+    if TRANSACTION_STATE.depth == 1:
+        # The callbacks may register further callbacks
+        while TRANSACTION_STATE.callbacks:
+            TRANSACTION_STATE.callbacks.pop(0)()
+
+    storage.commit()
+
+
+def _end_transaction():
+    TRANSACTION_STATE.depth -= 1
+    if not TRANSACTION_STATE.depth:
+        TRANSACTION_STATE.values = {}
+        TRANSACTION_STATE.callbacks = []
+
+
 def transaction(f):
     """Transaction decorator, to be used on class instances with a
     self.storage attribute
@@ -111,14 +164,16 @@ def transaction(f):
     @retry(cb=_retry_on_deadlock)
     @functools.wraps(f)
     def transaction_wrapper(self, *args, **kwargs):
-        self.storage.begin()
+        _begin_transaction(self.storage)
         try:
             result = f(self, *args, **kwargs)
-            self.storage.commit()
+            _commit_transaction(self.storage)
             return result
         except Exception:
             with excutils.save_and_reraise_exception():
                 self.storage.rollback()
+        finally:
+            _end_transaction()
 
     transaction_wrapper.__wrapped_function = f
     transaction_wrapper.__wrapper_name = 'transaction'
@@ -132,14 +187,16 @@ def transaction_shallow_copy(f):
     @retry(cb=_retry_on_deadlock, deep_copy=False)
     @functools.wraps(f)
     def transaction_wrapper(self, *args, **kwargs):
-        self.storage.begin()
+        _begin_transaction(self.storage)
         try:
             result = f(self, *args, **kwargs)
-            self.storage.commit()
+            _commit_transaction(self.storage)
             return result
         except Exception:
             with excutils.save_and_reraise_exception():
                 self.storage.rollback()
+        finally:
+            _end_transaction()
 
     transaction_wrapper.__wrapped_function = f
     transaction_wrapper.__wrapper_name = 'transaction_shallow_copy'
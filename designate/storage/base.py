@@ -270,12 +270,42 @@ class Storage(DriverPlugin):
         """
 
     @abc.abstractmethod
-    def update_zone(self, context, zone):
+    def find_recovery_zones(self, context, begin_shard, end_shard,
+                            max_serial, marker=None, limit=None):
+        """
+        Find the zones of a range of shards which are in ERROR, or still
+        PENDING with a serial older than max_serial, ordered by ID. Only the
+        columns needed to recover the zones are loaded.
+
+        :param context: RPC Context.
+        :param begin_shard: The first shard of the range.
+        :param end_shard: The last shard of the range.
+        :param max_serial: The serial of the oldest PENDING zones to skip.
+        :param marker: Zone ID from which after the requested page will
+                       start after
+        :param limit: Integer limit of objects of the page size after the
+                      marker
+        """
+
+    @abc.abstractmethod
+    def get_zone_version(self, context, zone_id):
+        """
+        Get the version of a Zone via its ID.
+
+        :param context: RPC Context.
+        :param zone_id: ID of the Zone.
+        """
+
+    @abc.abstractmethod
+    def update_zone(self, context, zone, expected_version=None):
         """
         Update a Zone
 
         :param context: RPC Context.
         :param zone: Zone object.
+        :param expected_version: Only update the Zone if its version is
+                                 still this one, raising ZoneVersionConflict
+                                 otherwise.
         """
 
     @abc.abstractmethod
@@ -341,12 +371,14 @@ class Storage(DriverPlugin):
         """
 
     @abc.abstractmethod
-    def find_recordsets_axfr(self, context, criterion=None):
+    def find_recordsets_axfr(self, context, criterion=None, stream=False):
         """
         Find RecordSets.
 
         :param context: RPC Context.
         :param criterion: Criteria to filter by.
+        :param stream: Return an iterator over the rows, with the SOA first,
+                       instead of loading all of them into memory.
         """
 
     @abc.abstractmethod
@@ -385,6 +417,49 @@ class Storage(DriverPlugin):
         :param criterion: Criteria to filter by.
         """
 
+    @abc.abstractmethod
+    def create_zone_journal(self, context, zone_id, serial, changes):
+        """
+        Record the changes that were made to a zone in a new serial.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID the changes were made to.
+        :param serial: The zone serial the changes are part of.
+        :param changes: List of (action, name, type, ttl, data) tuples, where
+                        action is either ADD or DEL.
+        """
+
+    @abc.abstractmethod
+    def find_zone_journal(self, context, zone_id, serial):
+        """
+        Find the journal entries of a zone that are newer than a serial,
+        ordered by serial.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to find the journal for.
+        :param serial: Only return the entries of later serials.
+        """
+
+    @abc.abstractmethod
+    def delete_zone_journal(self, context, zone_id):
+        """
+        Delete the whole journal of a zone.
+
+        :param context: RPC Context.
+        :param zone_id: Zone ID to delete the journal for.
+        """
+
+    @abc.abstractmethod
+    def purge_zone_journal(self, context, criterion, max_serials):
+        """
+        Trim the journal of each zone down to the newest serials.
+
+        :param context: RPC Context.
+        :param criterion: Criteria to filter the journal entries by.
+        :param max_serials: The number of serials to keep for each zone.
+        :returns: number of purged journal entries
+        """
+
     @abc.abstractmethod
     def create_record(self, context, zone_id, recordset_id, record):
         """
@@ -457,6 +532,37 @@ class Storage(DriverPlugin):
         :param criterion: Criteria to filter by.
         """
 
+    @abc.abstractmethod
+    def backfill_record_wire(self, context, batch_size=1000):
+        """
+        Fill in the wire format of records that were written without one.
+
+        :param context: RPC Context.
+        :param batch_size: Number of records to read per query.
+        :returns: The number of records updated.
+        """
+
+    @abc.abstractmethod
+    def get_usage(self, context, resource, scope_id):
+        """
+        Get the usage counted against a quota, without counting the rows.
+
+        :param context: RPC Context.
+        :param resource: One of 'zones' (scoped by tenant ID),
+                         'zone_recordsets' or 'zone_records' (scoped by
+                         zone ID).
+        :param scope_id: Tenant or Zone ID the usage is counted for.
+        """
+
+    @abc.abstractmethod
+    def reconcile_usage(self, context):
+        """
+        Recount all usage counters from the rows they stand for.
+
+        :param context: RPC Context.
+        :returns: The number of counters corrected.
+        """
+
     @abc.abstractmethod
     def create_blacklist(self, context, blacklist):
         """
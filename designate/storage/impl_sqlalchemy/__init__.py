@@ -16,10 +16,13 @@
 import time
 import hashlib
 
+import six
+from oslo_db import exception as oslo_db_exception
 from oslo_log import log as logging
-from sqlalchemy import select, distinct, func
-from sqlalchemy.sql.expression import or_
+from sqlalchemy import case, select, distinct, func
+from sqlalchemy.sql.expression import and_, or_
 
+from designate import dnsutils
 from designate import exceptions
 from designate import objects
 from designate.sqlalchemy import base as sqlalchemy_base
@@ -31,6 +34,17 @@ LOG = logging.getLogger(__name__)
 
 MAXIMUM_SUBZONE_DEPTH = 128
 
+# The rows behind each usage counter: the table, the column holding the id
+# of the counter's scope and the rows that count towards the quota.
+USAGE_COUNTERS = {
+    'zones': (tables.zones, tables.zones.c.tenant_id,
+              tables.zones.c.deleted == '0'),
+    'zone_recordsets': (tables.recordsets, tables.recordsets.c.zone_id,
+                        None),
+    'zone_records': (tables.records, tables.records.c.zone_id,
+                     tables.records.c.managed == False),  # noqa
+}
+
 
 class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     """SQLAlchemy connection"""
@@ -262,6 +276,8 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             ['attributes', 'recordsets', 'masters'],
             extra_values=extra_values)
 
+        self._update_usage('zones', zone.tenant_id, 1)
+
         if zone.obj_attr_is_set('attributes'):
             for attrib in zone.attributes:
                 self.create_zone_attribute(context, zone.id, attrib)
@@ -291,17 +307,57 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         zone = self._find_zones(context, criterion, one=True)
         return zone
 
-    def update_zone(self, context, zone):
+    def find_recovery_zones(self, context, begin_shard, end_shard,
+                            max_serial, marker=None, limit=None):
+        zones = tables.zones
+
+        query = select([zones.c.id, zones.c.version, zones.c.shard,
+                        zones.c.tenant_id, zones.c.name, zones.c.type,
+                        zones.c.serial, zones.c.status, zones.c.action,
+                        zones.c.pool_id]).\
+            where(zones.c.shard.between(begin_shard, end_shard)).\
+            where(or_(zones.c.status == 'ERROR',
+                      and_(zones.c.status == 'PENDING',
+                           zones.c.serial < max_serial)))
+        query = self._apply_tenant_criteria(context, zones, query)
+        query = self._apply_deleted_criteria(context, zones, query)
+
+        # Page on the ID alone, the marker zone may since have been deleted.
+        if marker is not None:
+            query = query.where(zones.c.id > marker)
+        query = query.order_by(zones.c.id)
+        if limit is not None:
+            query = query.limit(limit)
+
+        resultproxy = self.session.execute(query)
+        return sqlalchemy_base._set_listobject_from_models(
+            objects.ZoneList(), resultproxy.fetchall())
+
+    def get_zone_version(self, context, zone_id):
+        query = select([tables.zones.c.version]).where(
+            tables.zones.c.id == zone_id)
+        query = self._apply_tenant_criteria(context, tables.zones, query)
+        query = self._apply_deleted_criteria(context, tables.zones, query)
+
+        version = self.session.execute(query).scalar()
+        if version is None:
+            raise exceptions.ZoneNotFound("Could not find Zone")
+        return version
+
+    def update_zone(self, context, zone, expected_version=None):
         tenant_id_changed = False
         if 'tenant_id' in zone.obj_what_changed():
             tenant_id_changed = True
+            original_tenant_id = zone.obj_get_original_value('tenant_id')
 
         # Don't handle recordsets for now
         LOG.debug("Updating zone %s", zone)
         updated_zone = self._update(
             context, tables.zones, zone, exceptions.DuplicateZone,
             exceptions.ZoneNotFound,
-            ['attributes', 'recordsets', 'masters'])
+            ['attributes', 'recordsets', 'masters'],
+            expected_version=expected_version,
+            exc_conflict=exceptions.ZoneVersionConflict)
 
         if zone.obj_attr_is_set('attributes'):
             # Gather the Attribute ID's we have
@@ -420,6 +476,10 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             self.session.execute(records_query)
             self.session.execute(recordsets_query)
 
+            if updated_zone.deleted == '0':
+                self._update_usage('zones', original_tenant_id, -1)
+                self._update_usage('zones', updated_zone.tenant_id, 1)
+
         return updated_zone
 
     def delete_zone(self, context, zone_id):
@@ -427,15 +487,29 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         """
         # Fetch the existing zone, we'll need to return it.
         zone = self._find_zones(context, {'id': zone_id}, one=True)
-        return self._delete(context, tables.zones, zone,
+        was_deleted = zone.deleted != '0'
+
+        zone = self._delete(context, tables.zones, zone,
                             exceptions.ZoneNotFound)
 
+        if not was_deleted:
+            self._update_usage('zones', zone.tenant_id, -1)
+
+        return zone
+
     def purge_zone(self, context, zone):
         """Effectively remove a zone database record.
         """
-        return self._delete(context, tables.zones, zone,
+        zone = self._delete(context, tables.zones, zone,
                             exceptions.ZoneNotFound, hard_delete=True)
 
+        # The recordsets and records of the zone went with it.
+        if zone.deleted == '0':
+            self._update_usage('zones', zone.tenant_id, -1)
+        self._delete_usage(zone.id)
+
+        return zone
+
     def _walk_up_zones(self, current, zones_by_id):
         """Walk upwards in a zone hierarchy until we find a parent zone
         that does not belong to "zones_by_id"
@@ -632,7 +706,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return recordsets
 
-    def find_recordsets_axfr(self, context, criterion=None):
+    def find_recordsets_axfr(self, context, criterion=None, stream=False):
         query = None
 
         # Check to see if the criterion can use the reverse_name column
@@ -644,9 +718,20 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         query = select([tables.recordsets.c.id, tables.recordsets.c.type,
                         tables.recordsets.c.ttl, tables.recordsets.c.name,
-                        tables.records.c.data, tables.records.c.action]).\
+                        tables.records.c.data, tables.records.c.action,
+                        tables.records.c.wire]).\
             select_from(rjoin).where(tables.records.c.action != 'DELETE')
 
+        if stream:
+            # Sort the SOA first, so a zone transfer can be rendered in a
+            # single pass over the rows.
+            query = query.order_by(
+                case([(tables.recordsets.c.type == 'SOA', 0)], else_=1),
+                tables.recordsets.c.id)
+
+            return self._select_raw_iter(
+                context, tables.recordsets, criterion, query)
+
         query = query.order_by(tables.recordsets.c.id)
 
         raw_rows = self._select_raw(
@@ -668,12 +753,15 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
             tables.recordsets, recordset, exceptions.DuplicateRecordSet,
             ['records'], extra_values=extra_values)
 
+        self._update_usage('zone_recordsets', zone_id, 1)
+
         if recordset.obj_attr_is_set('records'):
             for record in recordset.records:
                 # NOTE: Since we're dealing with a mutable object, the return
                 #       value is not needed. The original item will be mutated
                 #       in place on the input "recordset.records" list.
-                self.create_record(context, zone_id, recordset.id, record)
+                self._create_record(
+                    zone, recordset.id, recordset.type, record)
         else:
             recordset.records = objects.RecordList()
 
@@ -681,7 +769,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return recordset
 
-    def find_recordsets_export(self, context, criterion=None):
+    def find_recordsets_export(self, context, criterion=None, stream=False):
         query = None
 
         rjoin = tables.records.join(
@@ -694,6 +782,10 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         query = query.order_by(tables.recordsets.c.created_at)
 
+        if stream:
+            return self._select_raw_iter(
+                context, tables.recordsets, criterion, query)
+
         raw_rows = self._select_raw(
             context, tables.recordsets, criterion, query)
 
@@ -748,12 +840,15 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
             # Update Records
             for record in update_records:
-                self.update_record(context, record)
+                self._update_record(context, record, recordset.type)
 
             # Create Records
+            if create_records:
+                zone = self._find_zones(
+                    context, {'id': recordset.zone_id}, one=True)
             for record in create_records:
-                self.create_record(
-                    context, recordset.zone_id, recordset.id, record)
+                self._create_record(
+                    zone, recordset.id, recordset.type, record)
 
         return recordset
 
@@ -762,8 +857,16 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         recordset = self._find_recordsets(
             context, {'id': recordset_id}, one=True)
 
-        return self._delete(context, tables.recordsets, recordset,
-                            exceptions.RecordSetNotFound)
+        recordset = self._delete(context, tables.recordsets, recordset,
+                                 exceptions.RecordSetNotFound)
+
+        # The records are removed by the foreign key cascade.
+        self._update_usage('zone_recordsets', recordset.zone_id, -1)
+        unmanaged = len([r for r in recordset.records if not r.managed])
+        if unmanaged:
+            self._update_usage('zone_records', recordset.zone_id, -unmanaged)
+
+        return recordset
 
     def count_recordsets(self, context, criterion=None):
         # Ensure that we return only active recordsets
@@ -787,6 +890,72 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return result[0]
 
+    # Zone Journal Methods
+    def create_zone_journal(self, context, zone_id, serial, changes):
+        if not changes:
+            return
+
+        values = [
+            {
+                'zone_id': zone_id,
+                'serial': serial,
+                'action': action,
+                'name': name,
+                'type': rrtype,
+                'ttl': ttl,
+                'data': data,
+            }
+            for action, name, rrtype, ttl, data in changes
+        ]
+
+        self.session.execute(tables.zone_journal.insert(), values)
+
+    def find_zone_journal(self, context, zone_id, serial):
+        zone_journal = tables.zone_journal
+
+        query = select([zone_journal.c.serial, zone_journal.c.action,
+                        zone_journal.c.name, zone_journal.c.type,
+                        zone_journal.c.ttl, zone_journal.c.data]).\
+            where(zone_journal.c.zone_id == zone_id).\
+            where(zone_journal.c.serial > serial).\
+            order_by(zone_journal.c.serial)
+
+        resultproxy = self.session.execute(query)
+        return resultproxy.fetchall()
+
+    def delete_zone_journal(self, context, zone_id):
+        query = tables.zone_journal.delete().\
+            where(tables.zone_journal.c.zone_id == zone_id)
+
+        self.session.execute(query)
+
+    def purge_zone_journal(self, context, criterion, max_serials):
+        zone_journal = tables.zone_journal
+
+        # Find the zones that have more serials journaled than we keep.
+        query = select([zone_journal.c.zone_id]).\
+            group_by(zone_journal.c.zone_id).\
+            having(func.count(distinct(zone_journal.c.serial)) > max_serials)
+        query = self._apply_criterion(zone_journal, query, criterion)
+
+        purged = 0
+        for zone_id, in self.session.execute(query).fetchall():
+            # The oldest serial that is still kept for this zone.
+            query = select([distinct(zone_journal.c.serial)]).\
+                where(zone_journal.c.zone_id == zone_id).\
+                order_by(zone_journal.c.serial.desc()).\
+                offset(max_serials - 1).limit(1)
+            oldest_serial = self.session.execute(query).scalar()
+
+            query = zone_journal.delete().\
+                where(zone_journal.c.zone_id == zone_id).\
+                where(zone_journal.c.serial < oldest_serial)
+
+            purged += self.session.execute(query).rowcount
+
+        LOG.info("Purged %d zone journal entries", purged)
+        return purged
+
     # Record Methods
     def _find_records(self, context, criterion, one=False, marker=None,
                       limit=None, sort_key=None, sort_dir=None):
@@ -805,17 +974,40 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return md5.hexdigest()
 
+    def _get_recordset_type(self, recordset_id):
+        query = select([tables.recordsets.c.type]).\
+            where(tables.recordsets.c.id == recordset_id)
+
+        return self.session.execute(query).scalar()
+
     def create_record(self, context, zone_id, recordset_id, record):
         # Fetch the zone as we need the tenant_id
         zone = self._find_zones(context, {'id': zone_id}, one=True)
 
+        return self._create_record(
+            zone, recordset_id, self._get_recordset_type(recordset_id),
+            record)
+
+    def _create_record(self, zone, recordset_id, recordset_type, record):
         record.tenant_id = zone.tenant_id
-        record.zone_id = zone_id
+        record.zone_id = zone.id
         record.recordset_id = recordset_id
         record.hash = self._recalculate_record_hash(record)
 
-        return self._create(
-            tables.records, record, exceptions.DuplicateRecord)
+        # Patch in the wire format of the rdata, used by mdns to build
+        # responses without parsing the text again.
+        extra_values = {
+            'wire': dnsutils.rdata_to_wire(recordset_type, record.data)
+        }
+
+        record = self._create(
+            tables.records, record, exceptions.DuplicateRecord,
+            extra_values=extra_values)
+
+        if not record.managed:
+            self._update_usage('zone_records', zone.id, 1)
+
+        return record
 
     def get_record(self, context, record_id):
         return self._find_records(context, {'id': record_id}, one=True)
@@ -830,18 +1022,83 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
         return self._find_records(context, criterion, one=True)
 
     def update_record(self, context, record):
+        return self._update_record(context, record)
+
+    def _update_record(self, context, record, recordset_type=None):
+        extra_values = None
+
         if record.obj_what_changed():
             record.hash = self._recalculate_record_hash(record)
 
-        return self._update(
+        if 'data' in record.obj_what_changed():
+            if recordset_type is None:
+                recordset_type = self._get_recordset_type(record.recordset_id)
+            extra_values = {
+                'wire': dnsutils.rdata_to_wire(recordset_type, record.data)
+            }
+
+        managed_changed = 'managed' in record.obj_what_changed()
+
+        record = self._update(
             context, tables.records, record, exceptions.DuplicateRecord,
-            exceptions.RecordNotFound)
+            exceptions.RecordNotFound, extra_values=extra_values)
+
+        if managed_changed:
+            self._update_usage(
+                'zone_records', record.zone_id, -1 if record.managed else 1)
+
+        return record
+
+    def backfill_record_wire(self, context, batch_size=1000):
+        # Join the recordsets to find the record type, and walk the records
+        # in id order, so rdata that can't be encoded is only visited once.
+        rjoin = tables.records.join(
+            tables.recordsets,
+            tables.records.c.recordset_id == tables.recordsets.c.id)
+
+        query = select([tables.records.c.id, tables.recordsets.c.type,
+                        tables.records.c.data]).\
+            select_from(rjoin).\
+            where(tables.records.c.wire.is_(None)).\
+            order_by(tables.records.c.id).\
+            limit(batch_size)
+
+        updated = 0
+        marker = None
+        while True:
+            batch_query = query
+            if marker is not None:
+                batch_query = query.where(tables.records.c.id > marker)
+
+            rows = self.session.execute(batch_query).fetchall()
+            if not rows:
+                break
+
+            for record_id, recordset_type, data in rows:
+                wire = dnsutils.rdata_to_wire(recordset_type, data)
+                if wire is None:
+                    continue
+
+                update = tables.records.update().\
+                    where(tables.records.c.id == record_id).\
+                    values(wire=wire)
+                updated += self.session.execute(update).rowcount
+
+            marker = rows[-1][0]
+
+        LOG.info("Backfilled the wire format of %d records", updated)
+        return updated
 
     def delete_record(self, context, record_id):
         # Fetch the existing record, we'll need to return it.
         record = self._find_records(context, {'id': record_id}, one=True)
-        return self._delete(context, tables.records, record,
-                            exceptions.RecordNotFound)
+        record = self._delete(context, tables.records, record,
+                              exceptions.RecordNotFound)
+
+        if not record.managed:
+            self._update_usage('zone_records', record.zone_id, -1)
+
+        return record
 
     def count_records(self, context, criterion=None):
         # Ensure that we return only active records
@@ -865,6 +1122,119 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
 
         return result[0]
 
+    # Usage Counter Methods
+    def _count_usage(self, resource, scope_id=None, all_scopes=False):
+        table, scope_column, where = USAGE_COUNTERS[resource]
+
+        query = select([scope_column, func.count(table.c.id)])
+        if where is not None:
+            query = query.where(where)
+        if not all_scopes:
+            query = query.where(scope_column == scope_id)
+        query = query.group_by(scope_column)
+
+        return dict(self.session.execute(query).fetchall())
+
+    def _seed_usage(self, resource, scope_id):
+        """Create a missing counter from the rows it stands for, including
+        the ones written by the current transaction.
+
+        :returns: The count, or None if the counter was created concurrently.
+        """
+        count = self._count_usage(resource, scope_id).get(scope_id, 0)
+
+        query = tables.usage_counters.insert()
+        try:
+            self.session.execute(query, [{
+                'resource': resource,
+                'scope_id': scope_id,
+                'count': count,
+            }])
+        except oslo_db_exception.DBDuplicateEntry:
+            return None
+
+        return count
+
+    def _update_usage(self, resource, scope_id, delta):
+        query = tables.usage_counters.update().\
+            where(tables.usage_counters.c.resource == resource).\
+            where(tables.usage_counters.c.scope_id == scope_id).\
+            values(count=tables.usage_counters.c.count + delta)
+
+        if scope_id is None or self.session.execute(query).rowcount != 0:
+            return
+
+        # Counters are seeded after the write, so the delta is already in
+        # the count unless another transaction seeded it first.
+        if self._seed_usage(resource, scope_id) is None:
+            self.session.execute(query)
+
+    def _delete_usage(self, scope_id):
+        query = tables.usage_counters.delete().\
+            where(tables.usage_counters.c.scope_id == scope_id)
+
+        self.session.execute(query)
+
+    def get_usage(self, context, resource, scope_id):
+        if scope_id is None:
+            # Zones without a tenant have no counter, count them instead.
+            return self._count_usage(resource).get(None, 0)
+
+        query = select([tables.usage_counters.c.count]).\
+            where(tables.usage_counters.c.resource == resource).\
+            where(tables.usage_counters.c.scope_id == scope_id)
+
+        result = self.session.execute(query).fetchone()
+        if result is not None:
+            return result[0]
+
+        count = self._seed_usage(resource, scope_id)
+        if count is None:
+            return self.session.execute(query).fetchone()[0]
+
+        return count
+
+    def reconcile_usage(self, context):
+        query = select([tables.usage_counters.c.resource,
+                        tables.usage_counters.c.scope_id,
+                        tables.usage_counters.c.count])
+
+        existing = {}
+        for resource, scope_id, count in self.session.execute(query):
+            existing.setdefault(resource, {})[scope_id] = count
+
+        corrected = 0
+        for resource in sorted(USAGE_COUNTERS):
+            counts = self._count_usage(resource, all_scopes=True)
+            counters = existing.get(resource, {})
+
+            # Counters of scopes without any rows left are set to zero.
+            for scope_id in set(counts) | set(counters):
+                if scope_id is None:
+                    continue
+
+                count = counts.get(scope_id, 0)
+                if counters.get(scope_id) == count:
+                    continue
+
+                if scope_id in counters:
+                    query = tables.usage_counters.update().\
+                        where(tables.usage_counters.c.resource == resource).\
+                        where(tables.usage_counters.c.scope_id == scope_id).\
+                        values(count=count)
+                    self.session.execute(query)
+                else:
+                    self.session.execute(tables.usage_counters.insert(), [{
+                        'resource': resource,
+                        'scope_id': scope_id,
+                        'count': count,
+                    }])
+
+                corrected += 1
+
+        LOG.info("Corrected %d usage counters", corrected)
+        return corrected
+
     # Blacklist Methods
     def _find_blacklists(self, context, criterion, one=False, marker=None,
                          limit=None, sort_key=None, sort_dir=None):
@@ -1797,6 +2167,7 @@ class SQLAlchemyStorage(sqlalchemy_base.SQLAlchemy, storage_base.Storage):
     # Reverse Name utils
     def _rname_check(self, criterion):
         # If the criterion has 'name' in it, switch it out for reverse_name
-        if criterion is not None and criterion.get('name', "").startswith('*'):
+        name = criterion.get('name') if criterion is not None else None
+        if isinstance(name, six.string_types) and name.startswith('*'):
             criterion['reverse_name'] = criterion.pop('name')[::-1]
         return criterion
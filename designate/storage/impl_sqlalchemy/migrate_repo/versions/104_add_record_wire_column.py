@@ -0,0 +1,32 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the wire column holding the encoded rdata of a record"""
+
+
+from oslo_log import log as logging
+from sqlalchemy import LargeBinary
+from sqlalchemy.schema import Column, MetaData, Table
+
+LOG = logging.getLogger(__name__)
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    LOG.info("Adding binary column wire to table 'records'")
+    meta.bind = migrate_engine
+    records_table = Table('records', meta, autoload=True)
+
+    # Existing rows are left NULL, they are filled in by
+    # "designate-manage database backfill-record-wire".
+    col = Column('wire', LargeBinary(), nullable=True)
+    col.create(records_table)
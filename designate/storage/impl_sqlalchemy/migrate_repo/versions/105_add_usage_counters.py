@@ -0,0 +1,83 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add the usage_counters table read by the quota checks"""
+
+
+from oslo_log import log as logging
+from oslo_utils import timeutils
+from sqlalchemy import Integer, String, DateTime, func, select
+from sqlalchemy.schema import Table, Column, MetaData, UniqueConstraint
+
+from designate import utils
+from designate.sqlalchemy.types import UUID
+
+LOG = logging.getLogger(__name__)
+
+meta = MetaData()
+
+
+def upgrade(migrate_engine):
+    meta.bind = migrate_engine
+
+    zones_table = Table('zones', meta, autoload=True)
+    recordsets_table = Table('recordsets', meta, autoload=True)
+    records_table = Table('records', meta, autoload=True)
+
+    usage_counters_table = Table('usage_counters', meta,
+        Column('id', UUID(), default=utils.generate_uuid, primary_key=True),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime),
+
+        Column('resource', String(32), nullable=False),
+        Column('scope_id', String(36), nullable=False),
+        Column('count', Integer, nullable=False),
+
+        UniqueConstraint('resource', 'scope_id', name='unique_usage_counter'),
+
+        mysql_engine='InnoDB',
+        mysql_charset='utf8',
+    )
+    usage_counters_table.create(checkfirst=True)
+
+    # Seed the counters from the existing rows, the same way
+    # "designate-manage database reconcile-usage" rebuilds them.
+    queries = {
+        'zones': select([zones_table.c.tenant_id,
+                         func.count(zones_table.c.id)]).
+        where(zones_table.c.deleted == '0').
+        group_by(zones_table.c.tenant_id),
+
+        'zone_recordsets': select([recordsets_table.c.zone_id,
+                                   func.count(recordsets_table.c.id)]).
+        group_by(recordsets_table.c.zone_id),
+
+        'zone_records': select([records_table.c.zone_id,
+                                func.count(records_table.c.id)]).
+        where(records_table.c.managed == False).  # noqa
+        group_by(records_table.c.zone_id),
+    }
+
+    now = timeutils.utcnow()
+    for resource, query in queries.items():
+        rows = [{
+            'id': utils.generate_uuid(),
+            'created_at': now,
+            'resource': resource,
+            'scope_id': scope_id,
+            'count': count,
+        } for scope_id, count in migrate_engine.execute(query)
+            if scope_id is not None]
+
+        LOG.info("Adding %d '%s' usage counters", len(rows), resource)
+        if rows:
+            migrate_engine.execute(usage_counters_table.insert(), rows)
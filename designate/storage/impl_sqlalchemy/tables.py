@@ -15,7 +15,7 @@
 # under the License.
 from sqlalchemy import (Table, MetaData, Column, String, Text, Integer,
                         SmallInteger, CHAR, DateTime, Enum, Boolean, Unicode,
-                        UniqueConstraint, ForeignKeyConstraint)
+                        LargeBinary, UniqueConstraint, ForeignKeyConstraint)
 
 from oslo_config import cfg
 from oslo_db.sqlalchemy import types
@@ -37,6 +37,7 @@ TSIG_ALGORITHMS = ['hmac-md5', 'hmac-sha1', 'hmac-sha224', 'hmac-sha256',
 TSIG_SCOPES = ['POOL', 'ZONE']
 POOL_PROVISIONERS = ['UNMANAGED']
 ACTIONS = ['CREATE', 'DELETE', 'UPDATE', 'NONE']
+JOURNAL_ACTIONS = ['ADD', 'DEL']
 
 ZONE_TYPES = ('PRIMARY', 'SECONDARY',)
 ZONE_TASK_TYPES = ['IMPORT', 'EXPORT']
@@ -218,6 +219,7 @@ records = Table('records', metadata,
     Column('zone_id', UUID, nullable=False),
     Column('recordset_id', UUID, nullable=False),
     Column('data', Text, nullable=False),
+    Column('wire', LargeBinary, nullable=True),
     Column('description', Unicode(160), nullable=True),
     Column('hash', String(32), nullable=False, unique=True),
     Column('managed', Boolean, default=False),
@@ -477,3 +479,39 @@ zone_tasks = Table('zone_tasks', metadata,
 
     mysql_engine='InnoDB',
     mysql_charset='utf8')
+
+zone_journal = Table('zone_journal', metadata,
+    Column('id', UUID, default=utils.generate_uuid, primary_key=True),
+    Column('created_at', DateTime, default=lambda: timeutils.utcnow()),
+    Column('zone_shard', SmallInteger, nullable=False,
+           default=lambda ctxt: default_shard(ctxt, 'zone_id')),
+
+    Column('zone_id', UUID, nullable=False),
+    Column('serial', Integer, nullable=False),
+    Column('action', Enum(name='zone_journal_actions', *JOURNAL_ACTIONS),
+           nullable=False),
+    Column('name', String(255), nullable=False),
+    Column('type', Enum(name='record_types', *RECORD_TYPES), nullable=False),
+    Column('ttl', Integer, nullable=False),
+    Column('data', Text, nullable=False),
+
+    ForeignKeyConstraint(['zone_id'], ['zones.id'], ondelete='CASCADE'),
+
+    mysql_engine='InnoDB',
+    mysql_charset='utf8',
+)
+
+usage_counters = Table('usage_counters', metadata,
+    Column('id', UUID, default=utils.generate_uuid, primary_key=True),
+    Column('created_at', DateTime, default=lambda: timeutils.utcnow()),
+    Column('updated_at', DateTime, onupdate=lambda: timeutils.utcnow()),
+
+    Column('resource', String(32), nullable=False),
+    Column('scope_id', String(36), nullable=False),
+    Column('count', Integer, default=0, nullable=False),
+
+    UniqueConstraint('resource', 'scope_id', name='unique_usage_counter'),
+
+    mysql_engine='InnoDB',
+    mysql_charset='utf8',
+)
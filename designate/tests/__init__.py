@@ -18,6 +18,8 @@ import copy
 import functools
 import inspect
 import os
+import shutil
+import tempfile
 import time
 
 import eventlet
@@ -374,6 +376,14 @@ class TestCase(base.BaseTestCase):
 
         self.config(network_api='fake')
 
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path, ignore_errors=True)
+        self.config(path=export_path, group='export_store:file')
+
+        lock_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, lock_path, ignore_errors=True)
+        self.config(lock_path=lock_path, group='oslo_concurrency')
+
         self.config(
             scheduler_filters=['pool_id_attribute', 'random'],
             group='service:central')
@@ -13,13 +13,17 @@
 # under the License.
 import unittest
 
+import mock
 import six
 from dns import zone as dnszone
 from webtest import TestApp
 from oslo_config import cfg
 
+from designate import exceptions
+from designate import export_store
 from designate.api import admin as admin_api
 from designate.api import middleware
+from designate.export_store import impl_file
 from designate.tests.test_api.test_v2 import ApiV2TestCase
 
 
@@ -172,3 +176,71 @@ class APIV2ZoneImportExportTest(ApiV2TestCase):
 
         # There are no exported zones by default
         self.assertEqual(0, response.json['metadata']['total_count'])
+
+    def _create_stored_export(self):
+        zone = self.create_zone()
+        zone_export = self.create_zone_export(
+            zone_id=zone.id, status='COMPLETE')
+        zone_export.location = (
+            'designate://v2/zones/tasks/exports/%s/export' % zone_export.id)
+        self.storage.update_zone_export(self.admin_context, zone_export)
+        return zone, zone_export
+
+    def test_get_stored_export(self):
+        self.config(chunk_size=8, group='export_store:file')
+        zone, zone_export = self._create_stored_export()
+        zonefile = '$ORIGIN %s\n$TTL %d\n' % (zone.name, zone.ttl)
+        export_store.get_export_store().write(zone_export.id, [zonefile])
+
+        response = self.client.get(
+            '/zones/tasks/exports/%s/export' % zone_export.id,
+            headers={'Accept': 'text/dns'})
+
+        self.assertEqual(200, response.status_int)
+        self.assertEqual('text/dns', response.content_type)
+        self.assertEqual(zonefile, response.body.decode('utf-8'))
+
+    def test_get_stored_export_zone_forbidden(self):
+        zone, zone_export = self._create_stored_export()
+        export_store.get_export_store().write(
+            zone_export.id, ['$ORIGIN %s\n' % zone.name])
+        self.policy({'get_zone': 'deny'})
+
+        # The stored export is only sent to those who may see the zone
+        self.client.get(
+            '/zones/tasks/exports/%s/export' % zone_export.id,
+            headers={'Accept': 'text/dns'}, status=403)
+
+    def test_get_unstored_export(self):
+        zone, zone_export = self._create_stored_export()
+
+        response = self.client.get(
+            '/zones/tasks/exports/%s/export' % zone_export.id,
+            headers={'Accept': 'text/dns'})
+
+        self.assertEqual(200, response.status_int)
+        self.assertIn('$ORIGIN %s' % zone.name,
+                      response.body.decode('utf-8'))
+
+    def test_delete_stored_export(self):
+        zone, zone_export = self._create_stored_export()
+        store = export_store.get_export_store()
+        store.write(zone_export.id, ['$ORIGIN %s\n' % zone.name])
+
+        self.client.delete('/zones/tasks/exports/%s' % zone_export.id,
+                           status=204)
+
+        self.assertRaises(exceptions.ZoneExportNotFound,
+                          store.read, zone_export.id)
+
+    def test_delete_stored_export_store_fails(self):
+        zone, zone_export = self._create_stored_export()
+
+        with mock.patch.object(impl_file.FileExportStore, 'delete',
+                               side_effect=OSError()):
+            self.client.delete('/zones/tasks/exports/%s' % zone_export.id,
+                               status=204)
+
+        self.assertRaises(exceptions.ZoneExportNotFound,
+                          self.storage.get_zone_export, self.admin_context,
+                          zone_export.id)
@@ -705,6 +705,98 @@ class ApiV2RecordSetsTest(ApiV2TestCase):
         self._assert_exception('invalid_object', 400,
                                self.client.put_json, url, body)
 
+    def test_batch_recordsets(self):
+        updated = self.create_recordset(
+            self.zone, records=[{'data': '192.0.2.1'}])
+        deleted = self.create_recordset(
+            self.zone, fixture=1, records=[{'data': '192.0.2.2'}])
+
+        body = {
+            'create': [{
+                'name': 'new.%s' % self.zone['name'],
+                'type': 'A',
+                'records': ['192.0.2.3'],
+            }],
+            'update': [{'id': updated['id'], 'ttl': 1800}],
+            'delete': [deleted['id']],
+        }
+        response = self.client.post_json(
+            '/zones/%s/recordsets/batch' % self.zone['id'], body)
+
+        self.assertEqual(202, response.status_int)
+        self.assertEqual('application/json', response.content_type)
+
+        # The results are in the order of the changes
+        recordsets = response.json['recordsets']
+        self.assertEqual(
+            ['new.%s' % self.zone['name'], updated['name'], deleted['name']],
+            [recordset['name'] for recordset in recordsets])
+        self.assertEqual(
+            ['CREATE', 'UPDATE', 'DELETE'],
+            [recordset['action'] for recordset in recordsets])
+        self.assertEqual(1800, recordsets[1]['ttl'])
+
+        self.client.get('/zones/%s/recordsets/%s' % (
+            self.zone['id'], deleted['id']), status=404)
+
+    def test_batch_recordsets_update_records(self):
+        recordset = self.create_recordset(
+            self.zone, records=[{'data': '192.0.2.1'}])
+
+        # The API leaves fetching the recordsets to central
+        with patch.object(self.central_service,
+                          'get_recordset') as mock_get_recordset:
+            response = self.client.post_json(
+                '/zones/%s/recordsets/batch' % self.zone['id'],
+                {'update': [{'id': recordset['id'],
+                             'records': ['192.0.2.1', '192.0.2.2']}]})
+
+        mock_get_recordset.assert_not_called()
+
+        self.assertEqual(202, response.status_int)
+        self.assertEqual(
+            ['192.0.2.1', '192.0.2.2'],
+            sorted(response.json['recordsets'][0]['records']))
+        self.assertEqual(recordset['ttl'],
+                         response.json['recordsets'][0]['ttl'])
+
+    def test_batch_recordsets_too_large(self):
+        self.config(max_recordset_batch_size=2, group='service:api')
+        recordset = self.create_recordset(self.zone)
+
+        self._assert_exception(
+            'bad_request', 400, self.client.post_json,
+            '/zones/%s/recordsets/batch' % self.zone['id'],
+            {'update': [{'id': recordset['id'], 'ttl': 1800}],
+             'delete': [recordset['id'], recordset['id']]})
+
+    def test_batch_recordsets_missing(self):
+        self._assert_exception(
+            'recordset_not_found', 404, self.client.post_json,
+            '/zones/%s/recordsets/batch' % self.zone['id'],
+            {'update': [{'id': '2fdadfb1-cf96-4259-ac6b-bb7b6d2ff980',
+                         'ttl': 1800}]})
+
+    def test_batch_recordsets_invalid_key(self):
+        self._assert_exception(
+            'bad_request', 400, self.client.post_json,
+            '/zones/%s/recordsets/batch' % self.zone['id'], {'replace': []})
+
+    def test_batch_recordsets_soa(self):
+        soa = self.central_service.find_recordset(
+            self.admin_context, {'zone_id': self.zone['id'], 'type': 'SOA'})
+
+        self._assert_exception(
+            'bad_request', 400, self.client.post_json,
+            '/zones/%s/recordsets/batch' % self.zone['id'],
+            {'update': [{'id': soa['id'], 'ttl': 1800}]})
+
+    def test_batch_recordsets_invalid_id(self):
+        self._assert_exception(
+            'invalid_uuid', 400, self.client.post_json,
+            '/zones/%s/recordsets/batch' % self.zone['id'],
+            {'delete': ['invalid']})
+
     def test_delete_recordset(self):
         recordset = self.create_recordset(self.zone)
 
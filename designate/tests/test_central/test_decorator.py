@@ -72,3 +72,79 @@ class CentralDecoratorTests(CentralTestCase):
             'synchronized operation',
             mock_not_creating_new_zone, self.get_context(), None
         )
+
+    def test_synchronized_zone_optimistic(self):
+        self.config(zone_concurrency='optimistic', group='service:central')
+
+        @service.synchronized_zone()
+        def mock_update_zone(cls, context, zone):
+            self.assertEqual(service.ZONE_LOCKS.held, {zone.id})
+            self.assertEqual(service.ZONE_LOCKS.versions, {zone.id: 3})
+            return zone.id
+
+        mock_service = mock.Mock()
+        mock_service.storage.get_zone_version.return_value = 3
+        zone_id = utils.generate_uuid()
+
+        self.assertEqual(zone_id, mock_update_zone(
+            mock_service, self.get_context(), zone.Zone(id=zone_id)))
+
+        mock_service.coordination.get_lock.assert_not_called()
+        self.assertEqual(set(), service.ZONE_LOCKS.held)
+        self.assertEqual({}, service.ZONE_LOCKS.versions)
+
+    def test_synchronized_zone_optimistic_retries(self):
+        self.config(zone_concurrency='optimistic', group='service:central')
+        mock_service = mock.Mock()
+        mock_service.storage.get_zone_version.side_effect = [1, 2, 3]
+        calls = []
+
+        @service.synchronized_zone()
+        def mock_update_zone(cls, context, zone):
+            calls.append(service.ZONE_LOCKS.versions[zone.id])
+            if len(calls) < 3:
+                raise exceptions.ZoneVersionConflict()
+
+        mock_update_zone(mock_service, self.get_context(),
+                         zone.Zone(id=utils.generate_uuid()))
+
+        self.assertEqual([1, 2, 3], calls)
+
+    def test_synchronized_zone_optimistic_retries_original_args(self):
+        self.config(zone_concurrency='optimistic',
+                    zone_concurrency_retries=2, group='service:central')
+        mock_service = mock.Mock()
+        zone_arg = zone.Zone(id=utils.generate_uuid(), ttl=300)
+        zones = []
+
+        @service.synchronized_zone()
+        def mock_update_zone(cls, context, zone):
+            zones.append((zone, zone.ttl))
+            zone.ttl = 600
+            raise exceptions.ZoneVersionConflict()
+
+        self.assertRaises(
+            exceptions.ZoneVersionConflict, mock_update_zone, mock_service,
+            self.get_context(), zone_arg)
+
+        # Every attempt starts from the zone it was called with, the first
+        # one is given the zone itself
+        self.assertEqual([300, 300, 300], [ttl for z, ttl in zones])
+        self.assertIs(zone_arg, zones[0][0])
+        self.assertEqual(3, len(set(id(z) for z, ttl in zones)))
+
+    def test_synchronized_zone_optimistic_retries_exceeded(self):
+        self.config(zone_concurrency='optimistic',
+                    zone_concurrency_retries=2, group='service:central')
+        mock_service = mock.Mock()
+        calls = []
+
+        @service.synchronized_zone()
+        def mock_update_zone(cls, context, zone):
+            calls.append(zone.id)
+            raise exceptions.ZoneVersionConflict()
+
+        self.assertRaises(
+            exceptions.ZoneVersionConflict, mock_update_zone, mock_service,
+            self.get_context(), zone.Zone(id=utils.generate_uuid()))
+        self.assertEqual(3, len(calls))
@@ -32,6 +32,11 @@ from oslo_messaging.rpc import dispatcher as rpc_dispatcher
 
 from designate import exceptions
 from designate import objects
+from designate import rpc
+from designate import storage
+from designate import utils
+from designate.central import matchers
+from designate.central import service as central_service
 from designate.mdns import rpcapi as mdns_api
 from designate.tests import fixtures
 from designate.tests.test_central import CentralTestCase
@@ -167,9 +172,83 @@ class CentralServiceTest(CentralTestCase):
                                'find_blacklists',
                                return_value=blacklists):
 
+            # Patterns re could backtrack over for long are ignored
             result = self.central_service._is_blacklisted_zone_name(
                 context, evil_zone_name)
-            self.assertTrue(result)
+            self.assertFalse(result)
+
+    def test_is_blacklisted_zone_name_cached(self):
+        self.create_blacklist(pattern=r'^([A-Za-z0-9_\-]+\.)*example\.org\.$')
+        context = self.get_context()
+
+        with mock.patch.object(self.central_service.storage,
+                               'find_blacklists',
+                               wraps=self.central_service.storage.
+                               find_blacklists) as find_blacklists:
+            self.assertTrue(self.central_service._is_blacklisted_zone_name(
+                context, 'www.example.org.'))
+            self.assertFalse(self.central_service._is_blacklisted_zone_name(
+                context, 'example.net.'))
+            self.assertEqual(1, find_blacklists.call_count)
+
+            # Changing the blacklists recompiles them
+            self.create_blacklist(pattern=r'^example\.net\.$')
+            self.assertTrue(self.central_service._is_blacklisted_zone_name(
+                context, 'example.net.'))
+            self.assertEqual(2, find_blacklists.call_count)
+
+    def test_is_blacklisted_zone_name_cache_expired(self):
+        self.config(blacklist_cache_ttl=0, group='service:central')
+        context = self.get_context()
+
+        with mock.patch.object(self.central_service.storage,
+                               'find_blacklists',
+                               wraps=self.central_service.storage.
+                               find_blacklists) as find_blacklists:
+            self.central_service._is_blacklisted_zone_name(
+                context, 'example.org.')
+            self.central_service._is_blacklisted_zone_name(
+                context, 'example.org.')
+
+        self.assertEqual(2, find_blacklists.call_count)
+
+    @mock.patch.object(utils, 'get_worker_slot', mock.Mock(return_value=2))
+    @mock.patch.object(rpc, 'get_notification_listener')
+    def test_start_cache_listener(self, mock_get_listener):
+        self.config(host='central-host')
+
+        self.central_service._start_cache_listener()
+
+        targets, endpoints = mock_get_listener.call_args[0]
+        self.assertEqual(['notifications'], [t.topic for t in targets])
+        self.assertIs(self.central_service._blacklists,
+                      endpoints[0].matcher_cache)
+        self.assertIs(self.central_service._tlds, endpoints[1].matcher_cache)
+        self.assertTrue(endpoints[1].filter_rule.match(
+            {}, 'central', 'dns.tld.delete', {}, {}))
+        self.assertEqual('designate-central-central-host-2',
+                         mock_get_listener.call_args[1]['pool'])
+        utils.get_worker_slot.assert_called_once_with(
+            'designate-central-central-host')
+        self.assertTrue(mock_get_listener.return_value.start.called)
+
+    def test_is_blacklisted_zone_name_notified(self):
+        self.create_blacklist(pattern=r'^example\.org\.$')
+        context = self.get_context()
+        self.assertFalse(self.central_service._is_blacklisted_zone_name(
+            context, 'example.net.'))
+
+        # A blacklist created through another central process
+        blacklist = objects.Blacklist(pattern=r'^example\.net\.$')
+        self.central_service.storage.create_blacklist(context, blacklist)
+        self.assertFalse(self.central_service._is_blacklisted_zone_name(
+            context, 'example.net.'))
+
+        endpoint = matchers.MatcherCacheEndpoint(
+            self.central_service._blacklists, r'^dns\.blacklist\.')
+        endpoint.info(context, 'central', 'dns.blacklist.create', {}, {})
+        self.assertTrue(self.central_service._is_blacklisted_zone_name(
+            context, 'example.net.'))
 
     def test_is_subzone(self):
         context = self.get_context()
@@ -193,6 +272,22 @@ class CentralServiceTest(CentralTestCase):
             context, 'www.example.org.', zone.pool_id)
         self.assertTrue(result)
 
+    def test_is_subzone_closest_parent(self):
+        context = self.get_context()
+        self.create_zone(name='example.org.')
+        parent = self.create_zone(name='b.example.org.')
+
+        with mock.patch.object(self.central_service.storage, 'find_zones',
+                               wraps=self.central_service.storage.find_zones
+                               ) as find_zones:
+            result = self.central_service._is_subzone(
+                context, 'a.b.c.d.e.f.b.example.org.', parent.pool_id)
+
+        self.assertEqual(parent.id, result.id)
+
+        # All of the candidate parents are looked up at once
+        self.assertEqual(1, find_zones.call_count)
+
     def test_is_superzone(self):
         context = self.get_context()
 
@@ -214,6 +309,57 @@ class CentralServiceTest(CentralTestCase):
             context, 'www.example.org.', zone.pool_id)
         self.assertFalse(result)
 
+    def test_is_superzone_lookalikes(self):
+        context = self.get_context()
+        zone = self.create_zone(name='www.example.org.')
+        self.create_zone(name='wwwexample.org.')
+        self.create_zone(name='example-org.com.')
+
+        result = self.central_service._is_superzone(
+            context, 'example.org.', zone.pool_id)
+        self.assertEqual([zone.id], [subzone.id for subzone in result])
+
+    def test_is_valid_zone_name_tlds_cached(self):
+        self.create_tld(fixture=0)
+        context = self.get_context()
+
+        with mock.patch.object(self.central_service.storage, 'find_tlds',
+                               wraps=self.central_service.storage.find_tlds
+                               ) as find_tlds:
+            self.central_service._is_valid_zone_name(context, 'example.com.')
+            self.central_service._is_valid_zone_name(context, 'example.com.')
+            self.assertEqual(1, find_tlds.call_count)
+
+            with testtools.ExpectedException(exceptions.InvalidZoneName):
+                self.central_service._is_valid_zone_name(
+                    context, 'example.co.uk.')
+
+            # Changing the TLDs loads them again
+            self.create_tld(fixture=1)
+            self.central_service._is_valid_zone_name(
+                context, 'example.co.uk.')
+            self.assertEqual(2, find_tlds.call_count)
+
+            with testtools.ExpectedException(exceptions.InvalidZoneName):
+                self.central_service._is_valid_zone_name(context, 'co.UK.')
+
+    def test_is_valid_zone_name_tlds_notified(self):
+        self.create_tld(fixture=0)
+        context = self.get_context()
+        self.central_service._is_valid_zone_name(context, 'example.com.')
+
+        # A TLD created through another central process
+        tld = objects.Tld.from_dict(self.get_tld_fixture(fixture=1))
+        self.central_service.storage.create_tld(context, tld)
+        with testtools.ExpectedException(exceptions.InvalidZoneName):
+            self.central_service._is_valid_zone_name(
+                context, 'example.co.uk.')
+
+        endpoint = matchers.MatcherCacheEndpoint(
+            self.central_service._tlds, r'^dns\.tld\.')
+        endpoint.info(context, 'central', 'dns.tld.create', {}, {})
+        self.central_service._is_valid_zone_name(context, 'example.co.uk.')
+
     def test_is_valid_recordset_placement_subzone(self):
         context = self.get_context()
 
@@ -488,6 +634,30 @@ class CentralServiceTest(CentralTestCase):
 
         self.create_zone(**fixture)
 
+    def test_create_zone_optimistic_locked(self):
+        self.config(zone_concurrency='optimistic', group='service:central')
+        fixture = self.get_zone_fixture()
+
+        with mock.patch.object(self.central_service.coordination,
+                               'get_lock') as get_lock:
+            self.create_zone(**fixture)
+
+            exc = self.assertRaises(rpc_dispatcher.ExpectedException,
+                                    self.create_zone, **fixture)
+
+            self.create_zone(name='www.Example.com.',
+                             email='info@example.com')
+            self.create_zone(name='example.net.', email='info@example.net')
+
+        self.assertEqual(exceptions.DuplicateZone, exc.exc_info[0])
+        # New zones are created under a lock shared with their subzones and
+        # superzones, so that they are checked against the ones created
+        # concurrently
+        self.assertEqual(
+            [mock.call('create-zone-example.com.')] * 3 +
+            [mock.call('create-zone-example.net.')],
+            get_lock.call_args_list)
+
     def test_create_zone_over_tld(self):
         values = dict(
             name='example.com.',
@@ -886,6 +1056,33 @@ class CentralServiceTest(CentralTestCase):
         self.assertIsInstance(notified_zone, objects.Zone)
         self.assertEqual(zone.id, notified_zone.id)
 
+    def test_update_zone_optimistic_concurrent_change(self):
+        self.config(zone_concurrency='optimistic', group='service:central')
+        zone = self.create_zone(email='info@example.org')
+        get_zone_version = self.storage.get_zone_version
+
+        def concurrent_change(context, zone_id):
+            # Another central changes the zone once this one has started
+            version = get_zone_version(context, zone_id)
+            if version == 1:
+                other = self.storage.get_zone(context, zone_id)
+                other.ttl = 1800
+                self.storage.update_zone(context, other)
+            return version
+
+        zone.email = 'info@example.net'
+        with mock.patch.object(self.central_service.storage,
+                               'get_zone_version',
+                               side_effect=concurrent_change) as versions:
+            self.central_service.update_zone(self.admin_context, zone)
+
+        # The change conflicted and was retried from the new version
+        self.assertEqual(2, versions.call_count)
+
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+        self.assertEqual('info@example.net', zone.email)
+        self.assertEqual(1800, zone.ttl)
+
     def test_update_zone_without_id(self):
         # Create a zone
         zone = self.create_zone(email='info@example.org')
@@ -1084,6 +1281,25 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(1, pxy.rowcount)
         return zone
 
+    def test_purge_zone_journal(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}])
+
+        for data in ('192.0.2.2', '192.0.2.3'):
+            recordset.records[0].data = data
+            recordset = self.central_service.update_recordset(
+                self.admin_context, recordset)
+
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+
+        self.central_service.purge_zone_journal(
+            self.admin_context, {'zone_shard': 'BETWEEN 0,4095'}, 1)
+
+        journal = self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, 0)
+        self.assertEqual({zone.serial}, set(r[0] for r in journal))
+
     @mock.patch.object(notifier.Notifier, "info")
     def test_purge_zones_nothing_to_purge(self, mock_notifier):
         # Create a zone
@@ -1686,6 +1902,64 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(1800, recordset.ttl)
         self.assertThat(new_serial, GreaterThan(original_serial))
 
+    def test_update_recordset_zone_journal(self):
+        zone = self.create_zone()
+
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}, {'data': '192.0.2.2'}])
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+        first_serial = zone.serial
+
+        # Replace one of the records
+        recordset.records[1].data = '192.0.2.3'
+        self.central_service.update_recordset(self.admin_context, recordset)
+
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+
+        journal = self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, first_serial)
+
+        changes = sorted(
+            (r[1], r[3], r[5]) for r in journal if r[3] != 'SOA')
+        self.assertEqual([
+            ('ADD', 'A', '192.0.2.3'),
+            ('DEL', 'A', '192.0.2.2'),
+        ], changes)
+
+        # The SOA of both serials is journaled along with the records
+        soa_changes = sorted(
+            (r[1], int(r[5].split()[2])) for r in journal if r[3] == 'SOA')
+        self.assertEqual([
+            ('ADD', zone.serial),
+            ('DEL', first_serial),
+        ], soa_changes)
+        self.assertEqual({zone.serial}, set(r[0] for r in journal))
+
+    def test_update_recordset_zone_journal_without_serial(self):
+        zone = self.create_zone()
+
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}])
+        self.assertNotEqual([], self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, 0))
+
+        # Changes that are not part of a new serial reset the journal
+        recordset.records[0].data = '192.0.2.2'
+        self.central_service.update_recordset(
+            self.admin_context, recordset, increment_serial=False)
+
+        self.assertEqual([], self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, 0))
+
+    def test_update_recordset_zone_journal_disabled(self):
+        self.config(zone_journal=False, group='service:central')
+
+        zone = self.create_zone()
+        self.create_recordset(zone, records=[{'data': '192.0.2.1'}])
+
+        self.assertEqual([], self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, 0))
+
     def test_update_recordset_deadlock_retry(self):
         # Create a zone
         zone = self.create_zone()
@@ -1896,6 +2170,227 @@ class CentralServiceTest(CentralTestCase):
         new_serial = updated_zone.serial
         self.assertThat(new_serial, GreaterThan(original_serial))
 
+    def _batch_recordset(self, zone, name, data):
+        return objects.RecordSet(
+            name='%s.%s' % (name, zone.name), type='A',
+            records=objects.RecordList(objects=[objects.Record(data=data)]))
+
+    def test_batch_recordsets(self):
+        zone = self.create_zone()
+        updated = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}])
+        deleted = self.create_recordset(
+            zone, fixture=1, records=[{'data': '192.0.2.2'}])
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+
+        updated.ttl = 1800
+
+        with mock.patch.object(self.central_service, '_update_soa',
+                               wraps=self.central_service._update_soa) as \
+                mock_update_soa, \
+                mock.patch.object(self.central_service.zone_api,
+                                  'update_zone') as mock_update_zone:
+            recordsets = self.central_service.batch_recordsets(
+                self.admin_context, zone.id,
+                create=objects.RecordSetList(objects=[
+                    self._batch_recordset(zone, 'new', '192.0.2.3')]),
+                update=objects.RecordSetList(objects=[updated]),
+                delete=[deleted.id])
+
+        # One new serial and SOA, and one update of the nameservers
+        self.assertEqual(1, mock_update_soa.call_count)
+        self.assertEqual(1, mock_update_zone.call_count)
+
+        self.assertEqual(
+            ['new.%s' % zone.name, updated.name, deleted.name],
+            [recordset.name for recordset in recordsets])
+        self.assertEqual(
+            ['CREATE', 'UPDATE', 'DELETE'],
+            [recordset.records[0].action for recordset in recordsets])
+
+        new_zone = self.central_service.get_zone(
+            self.admin_context, zone.id)
+        self.assertThat(new_zone.serial, GreaterThan(zone.serial))
+        self.assertEqual(
+            set([new_zone.serial]),
+            set(recordset.records[0].serial for recordset in recordsets))
+
+        recordset = self.central_service.get_recordset(
+            self.admin_context, zone.id, updated.id)
+        self.assertEqual(1800, recordset.ttl)
+        self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.get_recordset,
+            self.admin_context, zone.id, deleted.id)
+
+        # All of the changes are journaled under the new serial
+        journal = self.central_service.storage.find_zone_journal(
+            self.admin_context, zone.id, zone.serial)
+        self.assertEqual({new_zone.serial}, set(r[0] for r in journal))
+        self.assertEqual([
+            ('ADD', '192.0.2.1', 1800),
+            ('ADD', '192.0.2.3', zone.ttl),
+            ('DEL', '192.0.2.1', zone.ttl),
+            ('DEL', '192.0.2.2', zone.ttl),
+        ], sorted((r[1], r[5], r[4]) for r in journal if r[3] == 'A'))
+
+    def test_batch_recordsets_notifications(self):
+        zone = self.create_zone()
+        updated = self.create_recordset(zone)
+        deleted = self.create_recordset(zone, fixture=1)
+        updated.ttl = 1800
+
+        with mock.patch.object(self.central_service.notifier,
+                               'info') as mock_info:
+            @central_service.notification('dns.zone.update')
+            def outer(service, context):
+                service.batch_recordsets(
+                    context, zone.id,
+                    create=objects.RecordSetList(objects=[
+                        self._batch_recordset(zone, 'new', '192.0.2.3')]),
+                    update=objects.RecordSetList(objects=[updated]),
+                    delete=[deleted.id])
+
+                # Buffered until the outermost call returns
+                mock_info.assert_not_called()
+                return zone
+
+            outer(self.central_service, self.admin_context)
+
+        self.assertEqual(
+            [('dns.zone.update', zone.name),
+             ('dns.recordset.create', 'new.%s' % zone.name),
+             ('dns.recordset.update', updated.name),
+             ('dns.recordset.delete', deleted.name)],
+            [(call[0][1], call[0][2]['name'])
+             for call in mock_info.call_args_list])
+
+    def test_batch_recordsets_rollback(self):
+        zone = self.create_zone()
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+
+        # The second recordset conflicts with the first one
+        with mock.patch.object(self.central_service.notifier,
+                               'info') as mock_info:
+            exc = self.assertRaises(
+                rpc_dispatcher.ExpectedException,
+                self.central_service.batch_recordsets,
+                self.admin_context, zone.id,
+                create=objects.RecordSetList(objects=[
+                    self._batch_recordset(zone, 'www', '192.0.2.1'),
+                    self._batch_recordset(zone, 'www', '192.0.2.2')]))
+
+        self.assertEqual(exceptions.DuplicateRecordSet, exc.exc_info[0])
+        mock_info.assert_not_called()
+
+        # None of the changes were made
+        recordsets = self.central_service.find_recordsets(
+            self.admin_context, {'zone_id': zone.id, 'type': 'A'})
+        self.assertEqual(0, len(recordsets))
+        self.assertEqual(zone.serial, self.central_service.get_zone(
+            self.admin_context, zone.id).serial)
+
+    def test_batch_recordsets_changes_recordset_twice(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone)
+        recordset.ttl = 1800
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.batch_recordsets,
+            self.admin_context, zone.id,
+            update=objects.RecordSetList(objects=[recordset]),
+            delete=[recordset.id])
+
+        self.assertEqual(exceptions.BadRequest, exc.exc_info[0])
+
+    def test_batch_recordsets_partial_update(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}, {'data': '192.0.2.2'}])
+        kept = [record for record in recordset.records
+                if record.data == '192.0.2.1'][0]
+
+        # Only the changed fields are sent, the recordsets are fetched at once
+        changes = objects.RecordSet(
+            id=recordset.id, ttl=1800,
+            records=objects.RecordList(objects=[
+                objects.Record(data='192.0.2.1'),
+                objects.Record(data='192.0.2.3')]))
+
+        storage = self.central_service.storage
+        with mock.patch.object(storage, 'find_recordsets',
+                               wraps=storage.find_recordsets) as \
+                mock_find_recordsets:
+            self.central_service.batch_recordsets(
+                self.admin_context, zone.id,
+                update=objects.RecordSetList(objects=[changes]))
+
+        mock_find_recordsets.assert_any_call(
+            self.admin_context, {'id': [recordset.id], 'zone_id': zone.id})
+
+        recordset = self.central_service.get_recordset(
+            self.admin_context, zone.id, recordset.id)
+        self.assertEqual(1800, recordset.ttl)
+        self.assertEqual(
+            ['192.0.2.1', '192.0.2.3'],
+            sorted(record.data for record in recordset.records))
+        # The remaining record is kept as it is
+        self.assertIn(kept.id, [record.id for record in recordset.records])
+
+    def test_batch_recordsets_update_name(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone)
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.batch_recordsets,
+            self.admin_context, zone.id,
+            update=objects.RecordSetList(objects=[
+                objects.RecordSet(id=recordset.id,
+                                  name='other.%s' % zone.name)]))
+
+        self.assertEqual(exceptions.BadRequest, exc.exc_info[0])
+
+    def test_batch_recordsets_update_root_ns(self):
+        zone = self.create_zone()
+        ns = self.central_service.find_recordset(
+            self.admin_context, {'zone_id': zone.id, 'type': 'NS',
+                                 'name': zone.name})
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.batch_recordsets,
+            self.admin_context, zone.id,
+            update=objects.RecordSetList(objects=[
+                objects.RecordSet(id=ns.id, ttl=1800)]))
+
+        self.assertEqual(exceptions.BadRequest, exc.exc_info[0])
+
+    def test_batch_recordsets_delete_soa(self):
+        zone = self.create_zone()
+        soa = self.central_service.find_recordset(
+            self.admin_context, {'zone_id': zone.id, 'type': 'SOA'})
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.batch_recordsets,
+            self.admin_context, zone.id, delete=[soa.id])
+
+        self.assertEqual(exceptions.BadRequest, exc.exc_info[0])
+
+    def test_batch_recordsets_other_zone(self):
+        zone = self.create_zone()
+        other_zone = self.create_zone(fixture=1)
+        recordset = self.create_recordset(other_zone)
+
+        exc = self.assertRaises(
+            rpc_dispatcher.ExpectedException,
+            self.central_service.batch_recordsets,
+            self.admin_context, zone.id, delete=[recordset.id])
+
+        self.assertEqual(exceptions.RecordSetNotFound, exc.exc_info[0])
+
     def test_delete_recordset_without_incrementing_serial(self):
         zone = self.create_zone()
 
@@ -2022,6 +2517,31 @@ class CentralServiceTest(CentralTestCase):
 
         self.assertEqual(exceptions.OverQuota, exc.exc_info[0])
 
+    def test_delete_recordset_frees_zone_record_quota(self):
+        self.config(quota_zone_records=2)
+
+        zone = self.create_zone()
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}])
+
+        exc = self.assertRaises(rpc_dispatcher.ExpectedException,
+                                self.create_recordset, zone, fixture=1,
+                                records=[{'data': '192.0.2.2'}])
+        self.assertEqual(exceptions.OverQuota, exc.exc_info[0])
+
+        self.central_service.delete_recordset(
+            self.admin_context, zone.id, recordset.id)
+
+        storage_api = self.central_service.storage
+        count_records = mock.Mock(wraps=storage_api.count_records)
+        with mock.patch.object(storage_api, 'count_records', count_records):
+            self.create_recordset(
+                zone, fixture=1, records=[{'data': '192.0.2.2'}])
+
+        # The zone's usage counter was read rather than its records counted
+        self.assertFalse(
+            [c for c in count_records.call_args_list if 'zone_id' in c[0][1]])
+
     def test_create_record_over_recordset_quota(self):
         self.config(quota_recordset_records=1)
 
@@ -2738,6 +3258,14 @@ class CentralServiceTest(CentralTestCase):
         self.assertEqual(values['pattern'], blacklist['pattern'])
         self.assertEqual(values['description'], blacklist['description'])
 
+    def test_create_blacklist_unsafe_pattern(self):
+        exc = self.assertRaises(rpc_dispatcher.ExpectedException,
+                                self.create_blacklist,
+                                pattern=r'^(([a-z])+.)+[A-Z]([a-z])+$')
+
+        self.assertEqual(exceptions.InvalidBlacklistPattern,
+                         exc.exc_info[0])
+
     def test_get_blacklist(self):
         # Create a blacklisted zone
         expected = self.create_blacklist(fixture=0)
@@ -2809,6 +3337,17 @@ class CentralServiceTest(CentralTestCase):
         # Verify that the record was updated correctly
         self.assertEqual(u"New Comment", blacklist.description)
 
+    def test_update_blacklist_unsafe_pattern(self):
+        blacklist = self.create_blacklist(fixture=0)
+        blacklist.pattern = r'^(\w+)\.\1\.$'
+
+        exc = self.assertRaises(rpc_dispatcher.ExpectedException,
+                                self.central_service.update_blacklist,
+                                self.admin_context, blacklist)
+
+        self.assertEqual(exceptions.InvalidBlacklistPattern,
+                         exc.exc_info[0])
+
     def test_delete_blacklist(self):
         # Create a blacklisted zone
         blacklist = self.create_blacklist()
@@ -2882,6 +3421,41 @@ class CentralServiceTest(CentralTestCase):
 
         self.assertEqual(updated_zone['serial'], int(soa_record_values[2]))
 
+    def test_increment_zone_serial_once_per_transaction(self):
+        zone = self.create_zone()
+        original_serial = zone.serial
+
+        @storage.transaction
+        def create_recordsets(service):
+            for name in ('www.%s' % zone.name, 'mail.%s' % zone.name):
+                recordset = objects.RecordSet(
+                    name=name, type='A',
+                    records=objects.RecordList(objects=[
+                        objects.Record(data='192.0.2.1')]))
+                service._create_recordset_in_storage(
+                    self.admin_context, zone, recordset)
+
+        with mock.patch.object(self.central_service, '_update_soa',
+                               wraps=self.central_service._update_soa) as soa:
+            create_recordsets(self.central_service)
+
+        # The SOA is rewritten once, with the serial of the transaction
+        self.assertEqual(1, soa.call_count)
+
+        zone = self.central_service.get_zone(self.admin_context, zone.id)
+        self.assertThat(zone.serial, GreaterThan(original_serial))
+
+        criterion = {'zone_id': zone.id, 'type': 'SOA'}
+        soa = self.central_service.find_recordset(self.admin_context,
+                                                  criterion)
+        self.assertEqual(zone.serial, int(soa.records[0].data.split()[2]))
+
+        recordsets = self.central_service.find_recordsets(
+            self.admin_context, {'zone_id': zone.id, 'type': 'A'})
+        self.assertEqual(
+            [zone.serial, zone.serial],
+            [rs.records[0].serial for rs in recordsets])
+
     # Pool Tests
     def test_create_pool(self):
         # Get the values
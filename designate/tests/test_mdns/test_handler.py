@@ -16,6 +16,7 @@
 import binascii
 
 import dns
+import dns.exception
 import dns.rdataclass
 import dns.rdatatype
 import dns.resolver
@@ -25,12 +26,15 @@ import testtools
 from oslo_config import cfg
 
 from designate import context
+from designate import dnsutils
 from designate import objects
 from designate.tests.test_mdns import MdnsTestCase
+from designate.mdns import cache
 from designate.mdns import handler
 
 CONF = cfg.CONF
 default_pool_id = CONF['service:central'].default_pool_id
+ZONE_ID = '9f5d9a3a-2a7e-4c13-9a4b-6b9c3f1e0d27'
 
 ANSWER = [
     "id 1234",
@@ -176,11 +180,22 @@ class MdnsRequestHandlerTest(MdnsTestCase):
                                return_value=zone):
             response = next(self.handler(request)).to_wire()
 
-        self.mock_tg.add_thread.assert_called_with(
-            self.handler.zone_sync, self.context, zone,
-            [zone.masters[0]])
+        # The NOTIFY is answered before the SOA of the master is queried.
+        self.assertFalse(func.called)
+        self.mock_tg.add_thread.assert_called_once_with(
+            self.handler._sync_notified_zone, self.context, zone,
+            zone.masters[0])
         self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+        with mock.patch.object(self.handler, 'zone_sync') as mock_zone_sync:
+            self.handler._sync_notified_zone(
+                self.context, zone, zone.masters[0])
+
+        func.assert_called_once_with(zone.name, 'SOA')
+        mock_zone_sync.assert_called_once_with(
+            self.context, zone, [zone.masters[0]])
+        self.assertEqual({}, self.handler._notified_zones)
+
     @mock.patch.object(dns.resolver.Resolver, 'query')
     def test_dispatch_opcode_notify_same_serial(self, func):
         # DNS packet with NOTIFY opcode
@@ -216,9 +231,62 @@ class MdnsRequestHandlerTest(MdnsTestCase):
                                return_value=zone):
             response = next(self.handler(request)).to_wire()
 
-        assert not self.mock_tg.add_thread.called
         self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+        with mock.patch.object(self.handler, 'zone_sync') as mock_zone_sync:
+            self.handler._sync_notified_zone(self.context, zone,
+                                             zone.masters[0])
+
+        func.assert_called_once_with(zone.name, 'SOA')
+        self.assertFalse(mock_zone_sync.called)
+
+    def test_queue_notified_zone_coalesces(self):
+        zone = self._get_secondary_zone({'id': ZONE_ID, 'serial': 123})
+        other_master = objects.ZoneMaster(host='10.0.0.2', port=53)
+
+        # A burst of NOTIFYs only starts one check of the zone.
+        self.handler._queue_notified_zone(
+            self.context, zone, zone.masters[0])
+        self.handler._queue_notified_zone(
+            self.context, zone, zone.masters[0])
+        self.handler._queue_notified_zone(self.context, zone, other_master)
+
+        self.mock_tg.add_thread.assert_called_once_with(
+            self.handler._sync_notified_zone, self.context, zone,
+            zone.masters[0])
+
+        # The NOTIFYs received during the check run it once more, with the
+        # latest master and the current zone.
+        transferred_zone = self._get_secondary_zone(
+            {'id': ZONE_ID, 'serial': 456})
+        with mock.patch.object(self.handler, '_check_notified_zone') as check:
+            with mock.patch.object(self.handler.storage, 'find_zone',
+                                   return_value=transferred_zone):
+                self.handler._sync_notified_zone(
+                    self.context, zone, zone.masters[0])
+
+        check.assert_has_calls([
+            mock.call(self.context, zone, zone.masters[0]),
+            mock.call(self.context, transferred_zone, other_master),
+        ])
+        self.assertEqual({}, self.handler._notified_zones)
+
+        # Once done, the next NOTIFY starts a new check.
+        self.handler._queue_notified_zone(
+            self.context, zone, zone.masters[0])
+        self.assertEqual(2, self.mock_tg.add_thread.call_count)
+
+    @mock.patch.object(dns.resolver.Resolver, 'query')
+    def test_check_notified_zone_query_failure(self, func):
+        zone = self._get_secondary_zone({'serial': 123})
+        func.side_effect = dns.exception.Timeout()
+
+        with mock.patch.object(self.handler, 'zone_sync') as mock_zone_sync:
+            self.handler._check_notified_zone(
+                self.context, zone, zone.masters[0])
+
+        self.assertFalse(mock_zone_sync.called)
+
     def test_dispatch_opcode_notify_invalid_master(self):
         # DNS packet with NOTIFY opcode
         payload = "c38021000001000000000000076578616d706c6503636f6d0000060001"
@@ -411,6 +479,64 @@ class MdnsRequestHandlerTest(MdnsTestCase):
 
         self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+    def test_dispatch_opcode_query_A_answer_cache(self):
+        # query is for mail.example.com. IN A
+        payload = ("271601000001000000000000046d61696c076578616d706c6503636f6d"
+                   "0000010001")
+
+        expected_response = (b"271685000001000100000000046d61696c076578616d70"
+                             b"6c6503636f6d0000010001c00c0001000100000e100004"
+                             b"c0000201")
+
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone, 'A')
+        self.create_record(zone, recordset)
+
+        self.handler.answer_cache = cache.AnswerCache(100, 60)
+
+        with mock.patch.object(self.storage, 'find_recordset',
+                               wraps=self.storage.find_recordset) as m:
+            for _ in range(3):
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+                response = next(self.handler(request)).to_wire()
+
+                self.assertEqual(
+                    expected_response, binascii.b2a_hex(response))
+
+            # Only the first query reached the database
+            self.assertEqual(1, m.call_count)
+
+            # A newer serial of the zone invalidates the cached answer
+            zone = self.storage.get_zone(self.admin_context, zone.id)
+            self.handler.answer_cache.invalidate(zone.id, zone.serial)
+            self.assertEqual(1, m.call_count)
+            self.handler.answer_cache.invalidate(zone.id, zone.serial + 1)
+
+            request = dns.message.from_wire(binascii.a2b_hex(payload))
+            request.environ = {'addr': self.addr, 'context': self.context}
+            next(self.handler(request))
+
+            self.assertEqual(2, m.call_count)
+
+    def test_dispatch_opcode_query_refused_answer_cache(self):
+        # query is for mail.example.com. IN CNAME
+        payload = ("271801000001000000000000046d61696c076578616d706c6503636f6d"
+                   "0000050001")
+
+        self.handler.answer_cache = cache.AnswerCache(100, 60)
+
+        with mock.patch.object(self.storage, 'find_recordset',
+                               wraps=self.storage.find_recordset) as m:
+            for _ in range(2):
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+                response = next(self.handler(request))
+
+                self.assertEqual(dns.rcode.REFUSED, response.rcode())
+
+            self.assertEqual(1, m.call_count)
+
     def test_dispatch_opcode_query_TXT(self):
         # query is for text.example.com. IN TXT
         payload = "d2f5012000010000000000010474657874076578616d706c6503636f6d00001000010000291000000000000000"  # noqa
@@ -547,19 +673,16 @@ class MdnsRequestHandlerTest(MdnsTestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
-                     'ACTION'],
-                    ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
-                     'ACTION'],
-                ]
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION', None],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION', None],
+            ])
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
@@ -572,6 +695,113 @@ class MdnsRequestHandlerTest(MdnsTestCase):
 
                 self.assertEqual(expected_response, binascii.b2a_hex(response))
 
+    def test_dispatch_opcode_query_AXFR_wire(self):
+        # Same query and response as test_dispatch_opcode_query_AXFR, but
+        # rendered from the stored wire format of the rdata.
+        payload = ("49c300200001000000000001076578616d706c6503636f6d0000fc0001"
+                   "0000291000000000000000")
+
+        expected_response = \
+            (b"49c384000001000400000000076578616d706c6503636f6d0000fc0001c0"
+             b"0c0006000100000e10002f036e7331076578616d706c65036f7267000765786"
+             b"16d706c65c00c551c063900000e10000002580001518000000e10c00c000200"
+             b"0100000e100002c029046d61696cc00c0001000100000e100004c0000201c00"
+             b"c0006000100000e100018c029c03a551c063900000e10000002580001518000"
+             b"000e10")
+
+        zone = objects.Zone.from_dict({
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 1427899961,
+            'email': 'example@example.com',
+        })
+
+        soa = ('ns1.example.org. example.example.com. 1427899961 3600 600 '
+               '86400 3600')
+
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.', soa, 'ACTION',
+                 dnsutils.rdata_to_wire('SOA', soa)],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION', dnsutils.rdata_to_wire('NS', 'ns1.example.org.')],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION', dnsutils.rdata_to_wire('A', '192.0.2.1')],
+            ])
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordsets_axfr',
+                                   side_effect=_find_recordsets_axfr):
+                with mock.patch.object(dns.rrset, 'from_text_list') as m:
+                    request = dns.message.from_wire(
+                        binascii.a2b_hex(payload))
+                    request.environ = {
+                        'addr': self.addr, 'context': self.context}
+
+                    response = next(self.handler(request)).get_wire()
+
+                    self.assertEqual(
+                        expected_response, binascii.b2a_hex(response))
+                    self.assertFalse(m.called)
+
+    @mock.patch.object(handler, 'metrics')
+    def test_dispatch_opcode_query_AXFR_metrics(self, mock_metrics):
+        payload = ("49c300200001000000000001076578616d706c6503636f6d0000fc0001"
+                   "0000291000000000000000")
+
+        zone = objects.Zone.from_dict({
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 1427899961,
+            'email': 'example@example.com',
+        })
+
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 3600 600 '
+                 '86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION', None],
+            ])
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordsets_axfr',
+                                   side_effect=_find_recordsets_axfr):
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+
+                self.assertEqual(1, len(list(self.handler(request))))
+
+        mock_metrics.timing.assert_has_calls([
+            mock.call('mdns.axfr.db_time', mock.ANY),
+            mock.call('mdns.axfr.render_time', mock.ANY),
+        ])
+
+    def test_dispatch_opcode_query_AXFR_no_soa(self):
+        payload = ("49c300200001000000000001076578616d706c6503636f6d0000fc0001"
+                   "0000291000000000000000")
+
+        zone = objects.Zone.from_dict({
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 1427899961,
+            'email': 'example@example.com',
+        })
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordsets_axfr',
+                                   return_value=iter([])):
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+
+                response = next(self.handler(request))
+
+                self.assertEqual(dns.rcode.SERVFAIL, response.rcode())
+
     def test_dispatch_opcode_query_AXFR_multiple_messages(self):
         # Query is for example.com. IN AXFR
         # id 18883
@@ -609,19 +839,16 @@ class MdnsRequestHandlerTest(MdnsTestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
-                     'ACTION'],
-                    ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
-                     'ACTION'],
-                ]
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION', None],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION', None],
+            ])
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
@@ -642,6 +869,75 @@ class MdnsRequestHandlerTest(MdnsTestCase):
                 self.assertEqual(
                     expected_response[1], binascii.b2a_hex(response_two))
 
+    def test_dispatch_opcode_query_AXFR_cached(self):
+        # Query is for example.com. IN AXFR, see
+        # test_dispatch_opcode_query_AXFR_multiple_messages
+        payload = ("49c300200001000000000001076578616d706c6503636f6d0000fc0001"
+                   "0000291000000000000000")
+
+        # Set the max-message-size to 128
+        self.config(max_message_size=128, group='service:mdns')
+
+        zone = objects.Zone.from_dict({
+            'id': 'e2bed4dc-9d01-11e4-89d3-123b93f75cba',
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 1427899961,
+            'email': 'example@example.com',
+        })
+
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'ns1.example.org.',
+                 'ACTION', None],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.1',
+                 'ACTION', None],
+            ])
+
+        handler_ = handler.RequestHandler(self.storage, self.mock_tg)
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordsets_axfr',
+                                   side_effect=_find_recordsets_axfr) as m:
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+                uncached = [r.get_wire() for r in handler_(request)]
+
+                self.assertEqual(1, m.call_count)
+
+                # A second transfer of the same serial, with another message
+                # id, is served from the cache.
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.id = 1234
+                request.environ = {'addr': self.addr, 'context': self.context}
+                cached = [r.get_wire() for r in handler_(request)]
+
+                self.assertEqual(1, m.call_count)
+                self.assertEqual(2, len(cached))
+                for uncached_wire, cached_wire in zip(uncached, cached):
+                    self.assertEqual(b'\x04\xd2', cached_wire[:2])
+                    self.assertEqual(uncached_wire[2:], cached_wire[2:])
+
+                # Once the serial moves on, the zone is transferred from
+                # storage again.
+                zone.serial += 1
+                request = dns.message.from_wire(binascii.a2b_hex(payload))
+                request.environ = {'addr': self.addr, 'context': self.context}
+                list(handler_(request))
+
+                self.assertEqual(2, m.call_count)
+
+    def test_dispatch_opcode_query_AXFR_cache_disabled(self):
+        self.config(axfr_cache_size=0, group='service:mdns')
+
+        handler_ = handler.RequestHandler(self.storage, self.mock_tg)
+
+        self.assertIsNone(handler_.axfr_cache)
+
     def test_dispatch_opcode_query_AXFR_rrset_over_max_size(self):
         # Query is for example.com. IN AXFR
         # id 18883
@@ -687,19 +983,16 @@ class MdnsRequestHandlerTest(MdnsTestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.', 'a' * 63 + '.',
-                     'ACTION'],
-                    ['UUID2', 'NS', '3600', 'example.com.', 'b' * 10 + '.',
-                     'ACTION'],
-                ]
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'a' * 63 + '.',
+                 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.', 'b' * 10 + '.',
+                 'ACTION', None],
+            ])
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
@@ -765,17 +1058,14 @@ class MdnsRequestHandlerTest(MdnsTestCase):
             'email': 'example@example.com',
         })
 
-        def _find_recordsets_axfr(context, criterion):
-            if criterion['type'] == 'SOA':
-                return [['UUID1', 'SOA', '3600', 'example.com.',
-                         'ns1.example.org. example.example.com. 1427899961 '
-                         '3600 600 86400 3600', 'ACTION']]
-
-            elif criterion['type'] == '!SOA':
-                return [
-                    ['UUID2', 'NS', '3600', 'example.com.',
-                    'a' * 63 + '.' + 'a' * 63 + '.', 'ACTION'],
-                ]
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.',
+                 'ns1.example.org. example.example.com. 1427899961 '
+                 '3600 600 86400 3600', 'ACTION', None],
+                ['UUID2', 'NS', '3600', 'example.com.',
+                 'a' * 63 + '.' + 'a' * 63 + '.', 'ACTION', None],
+            ])
 
         with mock.patch.object(self.storage, 'find_zone',
                                return_value=zone):
@@ -800,6 +1090,194 @@ class MdnsRequestHandlerTest(MdnsTestCase):
                 with testtools.ExpectedException(StopIteration):
                     next(response_generator)
 
+    def _make_ixfr_request(self, serial):
+        request = dns.message.make_query('example.com.', dns.rdatatype.IXFR)
+        request.authority.append(dns.rrset.from_text(
+            'example.com.', 3600, dns.rdataclass.IN, dns.rdatatype.SOA,
+            'ns1.example.org. example.example.com. %d '
+            '3600 600 86400 3600' % serial))
+
+        request = dns.message.from_wire(request.to_wire())
+        request.environ = {'addr': self.addr, 'context': self.context}
+        return request
+
+    @staticmethod
+    def _get_answer(response):
+        response = dns.message.from_wire(
+            response.get_wire(), one_rr_per_rrset=True)
+        return [
+            (rrset.name.to_text(), dns.rdatatype.to_text(rrset.rdtype),
+             rrset[0].to_text())
+            for rrset in response.answer
+        ]
+
+    def test_dispatch_opcode_query_IXFR(self):
+        zone = objects.Zone.from_dict({
+            'id': 'cca7908b-dad4-4c50-adba-fb67d4c556e8',
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 3,
+            'email': 'example@example.com',
+        })
+
+        soa = ('ns1.example.org. example.example.com. %d '
+               '3600 600 86400 3600')
+        journal = [
+            (2, 'DEL', 'example.com.', 'SOA', 3600, soa % 1),
+            (2, 'ADD', 'mail.example.com.', 'A', 3600, '192.0.2.1'),
+            (2, 'ADD', 'example.com.', 'SOA', 3600, soa % 2),
+            (3, 'DEL', 'example.com.', 'SOA', 3600, soa % 2),
+            (3, 'DEL', 'mail.example.com.', 'A', 3600, '192.0.2.1'),
+            (3, 'ADD', 'example.com.', 'SOA', 3600, soa % 3),
+            (3, 'ADD', 'mail.example.com.', 'A', 3600, '192.0.2.2'),
+        ]
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_zone_journal',
+                                   return_value=journal) as find_journal:
+                with mock.patch.object(self.storage,
+                                       'find_recordsets_axfr') as find_axfr:
+                    responses = list(
+                        self.handler(self._make_ixfr_request(1)))
+
+        find_journal.assert_called_once_with(self.context, zone.id, 1)
+        self.assertFalse(find_axfr.called)
+        self.assertEqual(1, len(responses))
+        self.assertEqual([
+            ('example.com.', 'SOA', soa % 3),
+            ('example.com.', 'SOA', soa % 1),
+            ('example.com.', 'SOA', soa % 2),
+            ('mail.example.com.', 'A', '192.0.2.1'),
+            ('example.com.', 'SOA', soa % 2),
+            ('mail.example.com.', 'A', '192.0.2.1'),
+            ('example.com.', 'SOA', soa % 3),
+            ('mail.example.com.', 'A', '192.0.2.2'),
+            ('example.com.', 'SOA', soa % 3),
+        ], self._get_answer(responses[0]))
+
+    def test_dispatch_opcode_query_IXFR_up_to_date(self):
+        zone = objects.Zone.from_dict({
+            'id': 'cca7908b-dad4-4c50-adba-fb67d4c556e8',
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 3,
+            'email': 'example@example.com',
+        })
+        soa = objects.RecordSet(
+            name='example.com.', type='SOA', ttl=None,
+            records=objects.RecordList(objects=[
+                objects.Record(data='ns1.example.org. example.example.com. '
+                                    '3 3600 600 86400 3600'),
+            ])
+        )
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordset',
+                                   return_value=soa):
+                with mock.patch.object(self.storage,
+                                       'find_zone_journal') as find_journal:
+                    responses = list(
+                        self.handler(self._make_ixfr_request(3)))
+
+        self.assertFalse(find_journal.called)
+        self.assertEqual(1, len(responses))
+        self.assertEqual([
+            ('example.com.', 'SOA', 'ns1.example.org. example.example.com. '
+                                    '3 3600 600 86400 3600'),
+        ], self._get_answer(responses[0]))
+
+    def test_dispatch_opcode_query_IXFR_serial_wrapped(self):
+        zone = objects.Zone.from_dict({
+            'id': 'cca7908b-dad4-4c50-adba-fb67d4c556e8',
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 2 ** 32 - 1,
+            'email': 'example@example.com',
+        })
+        soa = objects.RecordSet(
+            name='example.com.', type='SOA', ttl=None,
+            records=objects.RecordList(objects=[
+                objects.Record(data='ns1.example.org. example.example.com. '
+                                    '1 3600 600 86400 3600'),
+            ])
+        )
+
+        # The serial of the client has wrapped around past the one of the
+        # zone, it is newer
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_recordset',
+                                   return_value=soa):
+                with mock.patch.object(self.storage,
+                                       'find_zone_journal') as find_journal:
+                    responses = list(
+                        self.handler(self._make_ixfr_request(1)))
+
+        self.assertFalse(find_journal.called)
+        self.assertEqual(1, len(responses))
+
+    def test_dispatch_opcode_query_IXFR_journal_incomplete(self):
+        zone = objects.Zone.from_dict({
+            'id': 'cca7908b-dad4-4c50-adba-fb67d4c556e8',
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 3,
+            'email': 'example@example.com',
+        })
+
+        soa = ('ns1.example.org. example.example.com. %d '
+               '3600 600 86400 3600')
+
+        # The changes of serial 2 have been purged from the journal.
+        journal = [
+            (3, 'DEL', 'example.com.', 'SOA', 3600, soa % 2),
+            (3, 'ADD', 'example.com.', 'SOA', 3600, soa % 3),
+        ]
+
+        def _find_recordsets_axfr(context, criterion, stream=False):
+            return iter([
+                ['UUID1', 'SOA', '3600', 'example.com.', soa % 3, 'ACTION',
+                 None],
+                ['UUID3', 'A', '3600', 'mail.example.com.', '192.0.2.2',
+                 'ACTION', None],
+            ])
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            with mock.patch.object(self.storage, 'find_zone_journal',
+                                   return_value=journal):
+                with mock.patch.object(self.storage, 'find_recordsets_axfr',
+                                       side_effect=_find_recordsets_axfr):
+                    responses = list(
+                        self.handler(self._make_ixfr_request(1)))
+
+        self.assertEqual(1, len(responses))
+        self.assertEqual([
+            ('example.com.', 'SOA', soa % 3),
+            ('mail.example.com.', 'A', '192.0.2.2'),
+            ('example.com.', 'SOA', soa % 3),
+        ], self._get_answer(responses[0]))
+
+    def test_dispatch_opcode_query_IXFR_no_soa_formerr(self):
+        zone = objects.Zone.from_dict({
+            'name': 'example.com.',
+            'ttl': 3600,
+            'serial': 3,
+            'email': 'example@example.com',
+        })
+
+        request = dns.message.make_query('example.com.', dns.rdatatype.IXFR)
+        request.environ = {'addr': self.addr, 'context': self.context}
+
+        with mock.patch.object(self.storage, 'find_zone',
+                               return_value=zone):
+            responses = list(self.handler(request))
+
+        self.assertEqual(1, len(responses))
+        self.assertEqual(dns.rcode.FORMERR, responses[0].rcode())
+
     def test_dispatch_opcode_query_nonexistent_recordtype(self):
         # query is for mail.example.com. IN CNAME
         payload = ("271801000001000000000000046d61696c076578616d706c6503636f6d"
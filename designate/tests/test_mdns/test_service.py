@@ -21,6 +21,8 @@ import struct
 
 import dns
 import dns.message
+import eventlet.event
+import eventlet.queue
 import mock
 from oslo_log import log as logging
 
@@ -33,6 +35,36 @@ def hex_wire(response):
     return binascii.b2a_hex(response.to_wire())
 
 
+def tcp_socket(chunks):
+    """A mock TCP client socket receiving the given chunks.
+
+    The chunks are bytes, or exceptions to raise. The responses sent are
+    collected in the sent attribute of the mock.
+    """
+    chunks = list(chunks)
+    mock_socket = mock.Mock()
+    mock_socket.sent = []
+
+    def recv_into(view):
+        chunk = chunks.pop(0)
+        if isinstance(chunk, Exception):
+            raise chunk
+        size = min(len(view), len(chunk))
+        view[:size] = chunk[:size]
+        if chunk[size:]:
+            chunks.insert(0, chunk[size:])
+        return size
+
+    def sendmsg(buffers):
+        data = b''.join(bytes(buf) for buf in buffers)
+        mock_socket.sent.append(data)
+        return len(data)
+
+    mock_socket.recv_into.side_effect = recv_into
+    mock_socket.sendmsg.side_effect = sendmsg
+    return mock_socket
+
+
 class MdnsServiceTest(MdnsTestCase):
     # DNS packet with IQUERY opcode
     query_payload = binascii.a2b_hex(
@@ -88,61 +120,137 @@ class MdnsServiceTest(MdnsTestCase):
         mock_socket.sendto.assert_called_once_with(self.expected_response,
                                                    self.addr)
 
-    def test__dns_handle_tcp_conn_fail_unpack(self):
-        # will call recv() only once
+    def test_handle_udp_batch(self):
+        mock_socket = mock.Mock()
+        mock_socket.recvfrom.side_effect = [
+            (self.query_payload, self.addr), socket.timeout()]
+        mock_socket.fd.recvfrom.side_effect = [
+            (self.query_payload, self.addr), BlockingIOError()]
+
+        self.dns_service._running = mock.Mock()
+        self.dns_service._running.is_set.side_effect = [True, True, False]
+
+        with mock.patch.object(self.dns_service,
+                               '_dispatch_udp_query') as dispatch:
+            self.dns_service._dns_handle_udp(mock_socket)
+
+        # The second query was read without waiting on the socket
+        self.assertEqual(2, dispatch.call_count)
+        self.assertEqual(2, mock_socket.recvfrom.call_count)
+        mock_socket.fd.recvfrom.assert_called_with(8192, socket.MSG_DONTWAIT)
+
+    def test_dispatch_udp_query_without_queue(self):
+        mock_socket = mock.Mock()
+
+        # The queue is opt-in, each query gets a greenthread by default
+        self.assertIsNone(self.dns_service._udp_queue)
+        with mock.patch.object(self.dns_service.tg,
+                               'add_thread') as add_thread:
+            self.dns_service._dispatch_udp_query(
+                mock_socket, self.addr, self.query_payload)
+
+        add_thread.assert_called_once_with(
+            self.dns_service._dns_handle_udp_query, mock_socket, self.addr,
+            self.query_payload)
+
+    def test_dispatch_udp_query(self):
         mock_socket = mock.Mock()
-        mock_socket.recv.side_effect = ['X', 'boo']  # X will fail unpack
+        self.dns_service._udp_queue = eventlet.queue.LightQueue(1)
+
+        self.dns_service._dispatch_udp_query(
+            mock_socket, self.addr, self.query_payload)
+
+        self.assertEqual(
+            (mock_socket, self.addr, self.query_payload),
+            self.dns_service._udp_queue.get_nowait())
+
+    @mock.patch('designate.service.metrics')
+    def test_dispatch_udp_query_queue_full(self, mock_metrics):
+        mock_socket = mock.Mock()
+        self.dns_service._udp_queue = mock.Mock()
+        self.dns_service._udp_queue.put_nowait.side_effect = (
+            eventlet.queue.Full())
+
+        self.dns_service._dispatch_udp_query(
+            mock_socket, self.addr, self.query_payload)
+
+        mock_metrics.counter.assert_called_once_with('dns.udp.dropped')
+
+    def test_handle_udp_queue(self):
+        mock_socket = mock.Mock()
+        self.dns_service._udp_queue = mock.Mock()
+        self.dns_service._udp_queue.get.side_effect = [
+            (mock_socket, self.addr, self.query_payload), None]
+        self.dns_service._running = mock.Mock()
+        self.dns_service._running.is_set.side_effect = [True, True, False]
+
+        self.dns_service._dns_handle_udp_queue()
+
+        mock_socket.sendto.assert_called_once_with(self.expected_response,
+                                                   self.addr)
+
+    def test__dns_handle_tcp_conn_fail_unpack(self):
+        # The connection closes half way through the length prefix
+        mock_socket = tcp_socket([b'X', b''])
 
         self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
-        self.assertEqual(1, mock_socket.recv.call_count)
+
+        self.assertEqual([], mock_socket.sent)
         self.assertEqual(1, mock_socket.close.call_count)
 
     def test__dns_handle_tcp_conn_one_query(self):
         payload = self.query_payload
-        mock_socket = mock.Mock()
         pay_len = struct.pack("!H", len(payload))
-        mock_socket.recv.side_effect = [pay_len, payload, socket.timeout]
+        mock_socket = tcp_socket([pay_len, payload, socket.timeout()])
 
         self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
 
-        self.assertEqual(3, mock_socket.recv.call_count)
-        self.assertEqual(1, mock_socket.sendall.call_count)
+        self.assertEqual(1, len(mock_socket.sent))
         self.assertEqual(1, mock_socket.close.call_count)
-        wire = mock_socket.sendall.call_args[0][0]
+        wire = mock_socket.sent[0]
         expected_length_raw = wire[:2]
         (expected_length,) = struct.unpack('!H', expected_length_raw)
         self.assertEqual(len(wire), expected_length + 2)
         self.assertEqual(self.expected_response, wire[2:])
 
+    def test__dns_handle_tcp_conn_partial_reads(self):
+        payload = self.query_payload
+        pay_len = struct.pack("!H", len(payload))
+        mock_socket = tcp_socket([
+            pay_len[:1], pay_len[1:], payload[:5], payload[5:], b''])
+
+        self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
+
+        self.assertEqual(
+            [struct.pack('!H', len(self.expected_response)) +
+             self.expected_response],
+            mock_socket.sent)
+
     def test__dns_handle_tcp_conn_multiple_queries(self):
         payload = self.query_payload
-        mock_socket = mock.Mock()
         pay_len = struct.pack("!H", len(payload))
-        # Process 5 queries, then receive a misaligned query and close the
+        # Process 5 queries, then receive a truncated query and close the
         # connection there
-        mock_socket.recv.side_effect = [
+        mock_socket = tcp_socket([
             pay_len, payload,
             pay_len, payload,
             pay_len, payload,
             pay_len, payload,
             pay_len, payload,
-            'X', payload,
+            pay_len, payload[:5], b'',
             pay_len, payload,
-            pay_len, payload,
-        ]
+        ])
         self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
 
-        self.assertEqual(11, mock_socket.recv.call_count)
-        self.assertEqual(5, mock_socket.sendall.call_count)
+        self.assertEqual(5, len(mock_socket.sent))
         self.assertEqual(1, mock_socket.close.call_count)
 
     def test__dns_handle_tcp_conn_multiple_queries_socket_error(self):
         payload = self.query_payload
-        mock_socket = mock.Mock()
         pay_len = struct.pack("!H", len(payload))
         # Process 5 queries, then receive a socket error and close the
         # connection there
-        mock_socket.recv.side_effect = [
+        mock_socket = tcp_socket([
             pay_len, payload,
             pay_len, payload,
             pay_len, payload,
@@ -150,29 +258,93 @@ class MdnsServiceTest(MdnsTestCase):
             pay_len, payload,
             socket.error(errno.EAGAIN),
             pay_len, payload,
-            pay_len, payload,
-        ]
+        ])
         self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
 
-        self.assertEqual(11, mock_socket.recv.call_count)
-        self.assertEqual(5, mock_socket.sendall.call_count)
+        self.assertEqual(5, len(mock_socket.sent))
         self.assertEqual(1, mock_socket.close.call_count)
 
     def test__dns_handle_tcp_conn_multiple_queries_ignore_bad_query(self):
         payload = self.query_payload
-        mock_socket = mock.Mock()
         pay_len = struct.pack("!H", len(payload))
         # Ignore a broken query and keep going as long as the query len
         # header was correct
-        mock_socket.recv.side_effect = [
+        mock_socket = tcp_socket([
             pay_len, payload,
             pay_len, payload[:-5] + b'hello',
             pay_len, payload,
             pay_len, payload,
             pay_len, payload,
-        ]
+            b'',
+        ])
         self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
 
-        self.assertEqual(11, mock_socket.recv.call_count)
-        self.assertEqual(4, mock_socket.sendall.call_count)
+        self.assertEqual(4, len(mock_socket.sent))
         self.assertEqual(1, mock_socket.close.call_count)
+
+    def test__dns_handle_tcp_conn_out_of_order(self):
+        slow_query = b'\x00\x01slow'
+        fast_query = b'\x00\x02fast'
+        fast_done = eventlet.event.Event()
+
+        def app(request):
+            if request['payload'] == slow_query:
+                fast_done.wait()
+                yield b'slow response'
+            else:
+                fast_done.send()
+                yield b'fast response'
+
+        self.dns_service.app = app
+        mock_socket = tcp_socket([
+            struct.pack('!H', len(slow_query)), slow_query,
+            struct.pack('!H', len(fast_query)), fast_query,
+            b'',
+        ])
+
+        self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
+
+        # The fast query was answered while the slow one was still running
+        self.assertEqual([b'\x00\x0dfast response', b'\x00\x0dslow response'],
+                         mock_socket.sent)
+
+    def test__dns_handle_tcp_conn_same_message_id(self):
+        first_query = b'\x00\x01first'
+        second_query = b'\x00\x01second'
+
+        def app(request):
+            if request['payload'] == first_query:
+                eventlet.sleep(0.01)
+            yield request['payload']
+
+        self.dns_service.app = app
+        mock_socket = tcp_socket([
+            struct.pack('!H', len(first_query)), first_query,
+            struct.pack('!H', len(second_query)), second_query,
+            b'',
+        ])
+
+        self.dns_service._dns_handle_tcp_conn(('1.2.3.4', 42), mock_socket)
+
+        # Queries sharing a message ID are answered in order
+        self.assertEqual([b'\x00\x07' + first_query,
+                          b'\x00\x08' + second_query],
+                         mock_socket.sent)
+
+    def test__dns_handle_tcp_max_conns_per_client(self):
+        mock_client = mock.Mock()
+        mock_socket = mock.Mock()
+
+        def accept():
+            self.dns_service._running.clear()
+            return mock_client, ('1.2.3.4', 42)
+
+        mock_socket.accept.side_effect = accept
+        self.dns_service.tcp_max_conns_per_client = 1
+        self.dns_service._tcp_conns['1.2.3.4'] = 1
+        self.dns_service.tg = mock.Mock()
+
+        self.dns_service._dns_handle_tcp(mock_socket)
+
+        self.assertTrue(mock_client.close.called)
+        self.assertFalse(self.dns_service.tg.add_thread.called)
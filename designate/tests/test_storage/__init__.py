@@ -631,6 +631,50 @@ class StorageTestCase(object):
         # Ensure we can page through the results.
         self._ensure_paging(created, self.storage.find_zones)
 
+    def test_find_recovery_zones(self):
+        zones = [self.create_zone(name='example-%d.org.' % i)
+                 for i in range(4)]
+        max_serial = zones[1].serial
+
+        zones[0].status = 'ERROR'
+        zones[2].serial = max_serial - 1
+        zones[3].status = 'ACTIVE'
+        zones[3].serial = max_serial - 1
+        for zone in (zones[0], zones[2], zones[3]):
+            self.storage.update_zone(self.admin_context, zone)
+
+        expected = sorted([zones[0].id, zones[2].id])
+
+        results = self.storage.find_recovery_zones(
+            self.admin_context, 0, 4095, max_serial)
+
+        self.assertEqual(expected, [zone.id for zone in results])
+        self.assertEqual(zones[0].name, results.objects[
+            expected.index(zones[0].id)].name)
+        self.assertFalse(results[0].obj_attr_is_set('email'))
+
+        # Page through them
+        results = self.storage.find_recovery_zones(
+            self.admin_context, 0, 4095, max_serial, limit=1)
+        self.assertEqual(expected[:1], [zone.id for zone in results])
+
+        results = self.storage.find_recovery_zones(
+            self.admin_context, 0, 4095, max_serial, marker=expected[0])
+        self.assertEqual(expected[1:], [zone.id for zone in results])
+
+    def test_find_recovery_zones_shards(self):
+        zone = self.create_zone()
+        zone.status = 'ERROR'
+        self.storage.update_zone(self.admin_context, zone)
+
+        results = self.storage.find_recovery_zones(
+            self.admin_context, zone.shard, zone.shard, zone.serial)
+        self.assertEqual([zone.id], [result.id for result in results])
+
+        results = self.storage.find_recovery_zones(
+            self.admin_context, zone.shard + 1, 4095, zone.serial)
+        self.assertEqual(0, len(results))
+
     def test_find_zones_criterion(self):
         zone_one = self.create_zone()
         zone_two = self.create_zone(fixture=1)
@@ -705,6 +749,23 @@ class StorageTestCase(object):
             uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
             self.storage.get_zone(self.admin_context, uuid)
 
+    def test_get_zone_version(self):
+        zone = self.create_zone()
+
+        self.assertEqual(
+            1, self.storage.get_zone_version(self.admin_context, zone.id))
+
+        zone.email = 'info@example.net'
+        self.storage.update_zone(self.admin_context, zone)
+
+        self.assertEqual(
+            2, self.storage.get_zone_version(self.admin_context, zone.id))
+
+    def test_get_zone_version_missing(self):
+        with testtools.ExpectedException(exceptions.ZoneNotFound):
+            uuid = 'caf771fc-6b05-4891-bee1-c2a48621f57b'
+            self.storage.get_zone_version(self.admin_context, uuid)
+
     def test_get_deleted_zone(self):
         context = self.get_admin_context()
         context.show_deleted = True
@@ -820,6 +881,37 @@ class StorageTestCase(object):
         with testtools.ExpectedException(exceptions.DuplicateZone):
             self.storage.update_zone(self.admin_context, zone_two)
 
+    def test_update_zone_expected_version(self):
+        zone = self.create_zone(name='example.org.')
+
+        zone.name = 'example.net.'
+        zone = self.storage.update_zone(self.admin_context, zone,
+                                        expected_version=1)
+
+        self.assertEqual('example.net.', zone.name)
+        self.assertEqual(2, zone.version)
+
+    def test_update_zone_version_conflict(self):
+        zone = self.create_zone(name='example.org.')
+        stale = self.storage.get_zone(self.admin_context, zone.id)
+
+        zone.email = 'info@example.net'
+        self.storage.update_zone(self.admin_context, zone)
+
+        stale.name = 'example.net.'
+        with testtools.ExpectedException(exceptions.ZoneVersionConflict):
+            self.storage.update_zone(self.admin_context, stale,
+                                     expected_version=stale.version)
+
+        zone = self.storage.get_zone(self.admin_context, zone.id)
+        self.assertEqual('example.org.', zone.name)
+
+    def test_update_zone_expected_version_missing(self):
+        zone = objects.Zone(id='caf771fc-6b05-4891-bee1-c2a48621f57b')
+        with testtools.ExpectedException(exceptions.ZoneNotFound):
+            self.storage.update_zone(self.admin_context, zone,
+                                     expected_version=1)
+
     def test_update_zone_missing(self):
         zone = objects.Zone(id='caf771fc-6b05-4891-bee1-c2a48621f57b')
         with testtools.ExpectedException(exceptions.ZoneNotFound):
@@ -1034,6 +1126,70 @@ class StorageTestCase(object):
             self.assertNotIn(record, records)
             records.append(record)
 
+    def test_find_recordsets_axfr_wire(self):
+        zone = self.create_zone()
+
+        records = [
+            {"data": "192.0.2.1"},
+        ]
+        recordset = self.create_recordset(zone, type='A', records=records)
+
+        rows = self.storage.find_recordsets_axfr(
+            self.admin_context, {'id': recordset['id']})
+
+        # The encoded rdata is returned alongside the text
+        self.assertEqual(1, len(rows))
+        self.assertEqual('192.0.2.1', rows[0][4])
+        self.assertEqual(b'\xc0\x00\x02\x01', bytes(rows[0][6]))
+
+    def test_find_recordsets_axfr_stream(self):
+        zone = self.create_zone()
+
+        records = [
+            {"data": "10.0.0.1"},
+            {"data": "10.0.0.2"},
+        ]
+        self.create_recordset(zone, records=records)
+
+        criterion = {'zone_id': zone['id']}
+
+        expected = self.storage.find_recordsets_axfr(
+            self.admin_context, criterion)
+        results = self.storage.find_recordsets_axfr(
+            self.admin_context, criterion, stream=True)
+
+        # The rows are returned lazily, with the SOA first
+        self.assertNotIsInstance(results, list)
+        results = list(results)
+
+        self.assertEqual(len(expected), len(results))
+        self.assertEqual('SOA', results[0][1])
+        self.assertEqual(1, len([r for r in results if r[1] == 'SOA']))
+        self.assertEqual(
+            sorted(tuple(r) for r in expected),
+            sorted(tuple(r) for r in results))
+
+    def test_find_recordsets_export_stream(self):
+        zone = self.create_zone()
+
+        records = [
+            {"data": "10.0.0.1"},
+            {"data": "10.0.0.2"},
+        ]
+        self.create_recordset(zone, records=records)
+
+        criterion = {'zone_id': zone['id']}
+
+        expected = self.storage.find_recordsets_export(
+            self.admin_context, criterion)
+        results = self.storage.find_recordsets_export(
+            self.admin_context, criterion, stream=True)
+
+        # The rows are returned lazily, in the same order
+        self.assertNotIsInstance(results, list)
+        self.assertEqual(
+            [tuple(r) for r in expected], [tuple(r) for r in results])
+
     def test_get_recordset(self):
         zone = self.create_zone()
         expected = self.create_recordset(zone)
@@ -1288,6 +1444,66 @@ class StorageTestCase(object):
             recordsets = self.storage.count_recordsets(self.admin_context)
             self.assertEqual(0, recordsets)
 
+    # Zone Journal Tests
+    def _create_zone_journal(self, zone, serial):
+        self.storage.create_zone_journal(
+            self.admin_context, zone.id, serial, [
+                ('DEL', zone.name, 'A', 3600, '192.0.2.%d' % (serial - 1)),
+                ('ADD', zone.name, 'A', 3600, '192.0.2.%d' % serial),
+            ])
+
+    def test_find_zone_journal(self):
+        zone = self.create_zone()
+        other_zone = self.create_zone(fixture=1)
+
+        for serial in (3, 2, 4):
+            self._create_zone_journal(zone, serial)
+        self._create_zone_journal(other_zone, 3)
+
+        results = self.storage.find_zone_journal(
+            self.admin_context, zone.id, 2)
+
+        self.assertEqual([
+            (3, 'ADD', zone.name, 'A', 3600, '192.0.2.3'),
+            (3, 'DEL', zone.name, 'A', 3600, '192.0.2.2'),
+            (4, 'ADD', zone.name, 'A', 3600, '192.0.2.4'),
+            (4, 'DEL', zone.name, 'A', 3600, '192.0.2.3'),
+        ], sorted(tuple(r) for r in results))
+        self.assertEqual([3, 3, 4, 4], [r[0] for r in results])
+
+    def test_delete_zone_journal(self):
+        zone = self.create_zone()
+        other_zone = self.create_zone(fixture=1)
+
+        self._create_zone_journal(zone, 2)
+        self._create_zone_journal(other_zone, 2)
+
+        self.storage.delete_zone_journal(self.admin_context, zone.id)
+
+        self.assertEqual([], self.storage.find_zone_journal(
+            self.admin_context, zone.id, 0))
+        self.assertEqual(2, len(self.storage.find_zone_journal(
+            self.admin_context, other_zone.id, 0)))
+
+    def test_purge_zone_journal(self):
+        zone = self.create_zone()
+        other_zone = self.create_zone(fixture=1)
+
+        for serial in range(2, 7):
+            self._create_zone_journal(zone, serial)
+        for serial in range(2, 4):
+            self._create_zone_journal(other_zone, serial)
+
+        purged = self.storage.purge_zone_journal(
+            self.admin_context, {'zone_shard': 'BETWEEN 0,4095'}, 3)
+
+        self.assertEqual(4, purged)
+        self.assertEqual({4, 5, 6}, set(r[0] for r in (
+            self.storage.find_zone_journal(self.admin_context, zone.id, 0))))
+        self.assertEqual({2, 3}, set(r[0] for r in (
+            self.storage.find_zone_journal(
+                self.admin_context, other_zone.id, 0))))
+
     def test_create_record(self):
         zone = self.create_zone()
         recordset = self.create_recordset(zone, type='A')
@@ -1515,6 +1731,20 @@ class StorageTestCase(object):
         # Ensure the version column was incremented
         self.assertEqual(2, record.version)
 
+    def test_update_record_wire(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(zone, type='A')
+        record = self.create_record(zone, recordset)
+
+        record.data = '192.0.2.255'
+        self.storage.update_record(self.admin_context, record)
+
+        rows = self.storage.find_recordsets_axfr(
+            self.admin_context, {'id': recordset['id']})
+
+        self.assertEqual([b'\xc0\x00\x02\xff'],
+                         [bytes(row[6]) for row in rows])
+
     def test_update_record_duplicate(self):
         zone = self.create_zone()
         recordset = self.create_recordset(zone)
@@ -17,6 +17,7 @@ from oslo_log import log as logging
 import mock
 
 from designate import storage
+from designate.storage.impl_sqlalchemy import tables
 from designate.tests import TestCase
 from designate.tests.test_storage import StorageTestCase
 
@@ -37,6 +38,117 @@ class SqlalchemyStorageTest(StorageTestCase, TestCase):
             self.assertFalse(pong['status'])
             self.assertIsNotNone(pong['rtt'])
 
+    def test_backfill_record_wire(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(
+            zone, type='A', records=[{'data': '192.0.2.1'}])
+
+        # Clear the column, as for records written by an older release
+        self.storage.session.execute(
+            tables.records.update().values(wire=None))
+
+        updated = self.storage.backfill_record_wire(
+            self.admin_context, batch_size=1)
+
+        # The SOA, NS and A records of the zone were all filled in
+        self.assertEqual(3, updated)
+
+        rows = self.storage.find_recordsets_axfr(
+            self.admin_context, {'id': recordset['id']})
+        self.assertEqual(b'\xc0\x00\x02\x01', bytes(rows[0][6]))
+
+        self.assertEqual(
+            0, self.storage.backfill_record_wire(self.admin_context))
+
+    def assertUsage(self, zones, zone_recordsets, zone_records, zone):
+        self.assertEqual(zones, self.storage.get_usage(
+            self.admin_context, 'zones', zone.tenant_id))
+        self.assertEqual(zone_recordsets, self.storage.get_usage(
+            self.admin_context, 'zone_recordsets', zone.id))
+        self.assertEqual(zone_records, self.storage.get_usage(
+            self.admin_context, 'zone_records', zone.id))
+
+    def test_usage_counters(self):
+        zone = self.create_zone()
+        self.create_zone(fixture=1)
+
+        # The SOA and NS recordsets are counted, their managed records not
+        self.assertUsage(2, 2, 0, zone)
+
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}, {'data': '192.0.2.2'}])
+        self.assertUsage(2, 3, 2, zone)
+
+        recordset.records.pop(1)
+        self.storage.update_recordset(self.admin_context, recordset)
+        self.assertUsage(2, 3, 1, zone)
+
+        self.storage.delete_recordset(self.admin_context, recordset.id)
+        self.assertUsage(2, 2, 0, zone)
+
+        self.storage.delete_zone(self.admin_context, zone.id)
+        self.assertUsage(1, 2, 0, zone)
+
+        # Deleting or purging an already deleted zone changes nothing
+        self.admin_context.show_deleted = True
+        self.storage.delete_zone(self.admin_context, zone.id)
+        zone = self.storage.get_zone(self.admin_context, zone.id)
+        self.storage.purge_zone(self.admin_context, zone)
+
+        # The counters of the zone went with it
+        self.assertEqual(1, self.storage.get_usage(
+            self.admin_context, 'zones', zone.tenant_id))
+        self.assertEqual([], self.storage.session.execute(
+            tables.usage_counters.select().where(
+                tables.usage_counters.c.scope_id == zone.id)).fetchall())
+
+    def test_usage_counters_seeded(self):
+        zone = self.create_zone()
+        self.create_recordset(zone, records=[{'data': '192.0.2.1'}])
+
+        # As for counters lost or written by an older release
+        self.storage.session.execute(tables.usage_counters.delete())
+
+        self.assertUsage(1, 3, 1, zone)
+
+        self.create_recordset(
+            zone, fixture=1, records=[{'data': '192.0.2.2'}])
+        self.assertUsage(1, 4, 2, zone)
+
+    def test_usage_counters_tenant_change(self):
+        zone = self.create_zone()
+        original_tenant_id = zone.tenant_id
+
+        zone.tenant_id = 'other'
+        self.storage.update_zone(self.admin_context, zone)
+
+        self.assertEqual(0, self.storage.get_usage(
+            self.admin_context, 'zones', original_tenant_id))
+        self.assertEqual(1, self.storage.get_usage(
+            self.admin_context, 'zones', 'other'))
+
+    def test_reconcile_usage(self):
+        zone = self.create_zone()
+        recordset = self.create_recordset(
+            zone, records=[{'data': '192.0.2.1'}])
+
+        # Drift the counters, as if their updates were lost
+        self.storage.session.execute(
+            tables.usage_counters.update().values(count=10))
+        self.storage.session.execute(
+            tables.usage_counters.delete().where(
+                tables.usage_counters.c.resource == 'zone_recordsets'))
+        self.storage.session.execute(
+            tables.records.delete().where(
+                tables.records.c.recordset_id == recordset.id))
+
+        self.assertEqual(
+            3, self.storage.reconcile_usage(self.admin_context))
+        self.assertUsage(1, 3, 0, zone)
+
+        self.assertEqual(
+            0, self.storage.reconcile_usage(self.admin_context))
+
     def test_schema_table_names(self):
         table_names = [
             u'blacklists',
@@ -55,7 +167,9 @@ class SqlalchemyStorageTest(StorageTestCase, TestCase):
             u'service_statuses',
             u'tlds',
             u'tsigkeys',
+            u'usage_counters',
             u'zone_attributes',
+            u'zone_journal',
             u'zone_masters',
             u'zone_tasks',
             u'zone_transfer_accepts',
@@ -92,6 +206,9 @@ class SqlalchemyStorageTest(StorageTestCase, TestCase):
                 "rrset_ttl": "CREATE INDEX rrset_ttl ON recordsets (ttl)",  # noqa
                 "rrset_tenant_id": "CREATE INDEX rrset_tenant_id ON recordsets (tenant_id)",  # noqa
             },
+            "zone_journal": {
+                "zone_journal_zone_id_serial": "CREATE INDEX zone_journal_zone_id_serial ON zone_journal (zone_id, serial)",  # noqa
+            },
             "zones": {
                 "delayed_notify": "CREATE INDEX delayed_notify ON zones (delayed_notify)",  # noqa
                 "reverse_name_deleted": "CREATE INDEX reverse_name_deleted ON zones (reverse_name, deleted)",  # noqa
@@ -0,0 +1,278 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+import oslotest.base
+
+from designate.mdns import cache
+
+
+class AXFRCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(AXFRCacheTest, self).setUp()
+        self.cache = cache.AXFRCache(100)
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get(('zone1', 1, 65535, None)))
+
+    def test_set_and_get(self):
+        key = ('zone1', 1, 65535, None)
+        messages = [(2, b'a' * 10), (1, b'b' * 5)]
+
+        self.cache.set(key, messages)
+
+        self.assertEqual(messages, self.cache.get(key))
+        self.assertEqual(15, self.cache.size)
+
+    def test_set_too_large(self):
+        key = ('zone1', 1, 65535, None)
+
+        self.cache.set(key, [(1, b'a' * 101)])
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(0, self.cache.size)
+
+    def test_set_evicts_least_recently_used(self):
+        key1 = ('zone1', 1, 65535, None)
+        key2 = ('zone2', 1, 65535, None)
+        key3 = ('zone3', 1, 65535, None)
+
+        self.cache.set(key1, [(1, b'a' * 40)])
+        self.cache.set(key2, [(1, b'b' * 40)])
+
+        # Touch key1 so key2 becomes the least recently used entry.
+        self.cache.get(key1)
+
+        self.cache.set(key3, [(1, b'c' * 40)])
+
+        self.assertIsNotNone(self.cache.get(key1))
+        self.assertIsNone(self.cache.get(key2))
+        self.assertIsNotNone(self.cache.get(key3))
+        self.assertEqual(80, self.cache.size)
+
+    def test_set_drops_older_serials(self):
+        old_key = ('zone1', 1, 65535, None)
+        new_key = ('zone1', 2, 65535, None)
+        other_key = ('zone1', 2, 512, None)
+
+        self.cache.set(old_key, [(1, b'a' * 10)])
+        self.cache.set(other_key, [(1, b'a' * 10)])
+        self.cache.set(new_key, [(1, b'b' * 10)])
+
+        self.assertIsNone(self.cache.get(old_key))
+        self.assertIsNotNone(self.cache.get(other_key))
+        self.assertIsNotNone(self.cache.get(new_key))
+        self.assertEqual(20, self.cache.size)
+
+    def test_invalidate(self):
+        key = ('zone1', 1, 65535, None)
+        self.cache.set(key, [(1, b'a' * 10)])
+
+        self.cache.invalidate('zone1')
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(0, self.cache.size)
+        self.assertNotIn('zone1', self.cache.zones)
+
+    @mock.patch.object(cache, 'metrics')
+    def test_metrics(self, mock_metrics):
+        key = ('zone1', 1, 65535, None)
+
+        self.cache.get(key)
+        self.cache.set(key, [(1, b'a' * 60)])
+        self.cache.get(key)
+        self.cache.set(('zone2', 1, 65535, None), [(1, b'a' * 60)])
+
+        mock_metrics.counter.assert_has_calls([
+            mock.call('mdns.axfr_cache.miss'),
+            mock.call().increment(),
+            mock.call('mdns.axfr_cache.hit'),
+            mock.call().increment(),
+            mock.call('mdns.axfr_cache.eviction'),
+            mock.call().increment(1),
+        ])
+        mock_metrics.gauge().send.assert_called_with(
+            'mdns.axfr_cache.bytes', 60)
+
+
+class AnswerCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(AnswerCacheTest, self).setUp()
+        self.cache = cache.AnswerCache(2, 10)
+
+    def test_get_miss(self):
+        self.assertIsNone(self.cache.get(('www.example.org.', 1, None)))
+
+    def test_set_and_get(self):
+        key = ('www.example.org.', 1, None)
+
+        self.cache.set(key, 'zone1', 5, 'rrset')
+
+        self.assertEqual(('zone1', 5, 'rrset'), self.cache.get(key))
+
+    def test_set_and_get_negative(self):
+        key = ('www.example.org.', 1, None)
+
+        self.cache.set(key)
+
+        self.assertEqual((None, None, None), self.cache.get(key))
+        self.assertIn(key, self.cache.negative)
+
+    @mock.patch.object(cache.time, 'time')
+    def test_get_expired(self, mock_time):
+        key = ('www.example.org.', 1, None)
+        mock_time.return_value = 100
+        self.cache.set(key, 'zone1', 5, 'rrset')
+
+        mock_time.return_value = 110
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertNotIn('zone1', self.cache.zones)
+
+    def test_set_evicts_least_recently_used(self):
+        key1 = ('a.example.org.', 1, None)
+        key2 = ('b.example.org.', 1, None)
+        key3 = ('c.example.org.', 1, None)
+
+        self.cache.set(key1, 'zone1', 5, 'rrset')
+        self.cache.set(key2)
+
+        # Touch key1 so key2 becomes the least recently used entry.
+        self.cache.get(key1)
+
+        self.cache.set(key3, 'zone1', 5, 'rrset')
+
+        self.assertIsNotNone(self.cache.get(key1))
+        self.assertIsNone(self.cache.get(key2))
+        self.assertIsNotNone(self.cache.get(key3))
+        self.assertEqual(set(), self.cache.negative)
+
+    def test_invalidate_serial(self):
+        self.cache = cache.AnswerCache(10, 10)
+        key1 = ('a.example.org.', 1, None)
+        key2 = ('b.example.org.', 1, None)
+        negative_key = ('c.example.org.', 1, None)
+
+        self.cache.set(key1, 'zone1', 5, 'rrset')
+        self.cache.set(key2, 'zone2', 5, 'rrset')
+        self.cache.set(negative_key)
+
+        # The cached answers are current, nothing is dropped.
+        self.cache.invalidate('zone1', 5)
+        self.assertEqual(3, len(self.cache.data))
+
+        self.cache.invalidate('zone1', 6)
+
+        self.assertIsNone(self.cache.get(key1))
+        self.assertIsNotNone(self.cache.get(key2))
+        self.assertIsNone(self.cache.get(negative_key))
+
+    def test_invalidate_negative_within_zone(self):
+        self.cache = cache.AnswerCache(10, 10)
+        key = ('a.example.org.', 1, None)
+        negative_key = ('b.Example.org.', 1, None)
+        other_negative_key = ('b.example.net.', 1, None)
+
+        self.cache.set(key, 'zone1', 5, 'rrset')
+        self.cache.set(negative_key)
+        self.cache.set(other_negative_key)
+
+        # The cached answers are current, nothing is dropped.
+        self.cache.invalidate('zone1', 5, zone_name='example.org.')
+        self.assertEqual(3, len(self.cache.data))
+
+        self.cache.invalidate('zone1', zone_name='example.org.')
+
+        self.assertIsNone(self.cache.get(negative_key))
+        self.assertIsNotNone(self.cache.get(other_negative_key))
+        self.assertEqual(
+            {'b.example.net.', 'example.net.', 'net.'},
+            set(self.cache.negative_names))
+
+    def test_invalidate_negative_new_zone(self):
+        negative_key = ('www.example.org.', 1, None)
+        self.cache.set(negative_key)
+
+        # Without a cached answer of the zone there is nothing to tell the
+        # refusals are current.
+        self.cache.invalidate('zone1', 1, zone_name='example.org.')
+
+        self.assertIsNone(self.cache.get(negative_key))
+
+    def test_invalidate_all(self):
+        self.cache.set(('a.example.org.', 1, None), 'zone1', 5, 'rrset')
+        self.cache.set(('b.example.org.', 1, None))
+
+        self.cache.invalidate()
+
+        self.assertEqual(0, len(self.cache.data))
+        self.assertEqual(0, len(self.cache.zones))
+        self.assertEqual(0, len(self.cache.negative))
+
+    @mock.patch.object(cache, 'metrics')
+    def test_metrics(self, mock_metrics):
+        key = ('a.example.org.', 1, None)
+
+        self.cache.get(key)
+        self.cache.set(key, 'zone1', 5, 'rrset')
+        self.cache.get(key)
+        self.cache.invalidate('zone1')
+
+        mock_metrics.counter.assert_has_calls([
+            mock.call('mdns.answer_cache.miss'),
+            mock.call().increment(),
+            mock.call('mdns.answer_cache.hit'),
+            mock.call().increment(),
+            mock.call('mdns.answer_cache.invalidation'),
+            mock.call().increment(1),
+        ])
+        mock_metrics.gauge().send.assert_called_with(
+            'mdns.answer_cache.entries', 1)
+
+
+class AnswerCacheEndpointTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(AnswerCacheEndpointTest, self).setUp()
+        self.answer_cache = mock.Mock()
+        self.endpoint = cache.AnswerCacheEndpoint(self.answer_cache)
+
+    def test_filter_rule(self):
+        for event_type in ('dns.zone.create', 'dns.zone.update',
+                           'dns.zone.delete', 'dns.recordset.create',
+                           'dns.record.delete'):
+            self.assertTrue(self.endpoint.filter_rule.match(
+                {}, '', event_type, {}, {}), event_type)
+
+        for event_type in ('dns.zone.export', 'dns.tsigkey.update'):
+            self.assertFalse(self.endpoint.filter_rule.match(
+                {}, '', event_type, {}, {}), event_type)
+
+    def test_info_zone(self):
+        self.endpoint.info({}, 'central', 'dns.zone.create',
+                           {'id': 'zone1', 'name': 'example.org.',
+                            'serial': 5}, {})
+
+        self.answer_cache.invalidate.assert_called_once_with(
+            'zone1', zone_name='example.org.')
+
+    def test_info_recordset(self):
+        self.endpoint.info({}, 'central', 'dns.recordset.create',
+                           {'id': 'rrset1', 'zone_id': 'zone1',
+                            'zone_name': 'example.org.'}, {})
+
+        self.answer_cache.invalidate.assert_called_once_with(
+            'zone1', zone_name='example.org.')
+
+    def test_info_unknown_payload(self):
+        self.endpoint.info({}, 'central', 'dns.recordset.create', None, {})
+
+        self.answer_cache.invalidate.assert_called_once_with(
+            None, zone_name=None)
@@ -60,8 +60,15 @@ class MdnsHandleTest(oslotest.base.BaseTestCase):
 
         self.assertEqual(dns.rcode.NOERROR, tuple(response)[0].rcode())
 
+        # The serial is checked in the background.
+        self.assertFalse(mock_query.called)
+        with mock.patch.object(self.handler, 'zone_sync') as mock_zone_sync:
+            self.handler._sync_notified_zone(
+                *self.tg.add_thread.call_args[0][1:])
+
+        self.assertTrue(mock_zone_sync.called)
         self.assertIn(
-            'Scheduling AXFR for e2bed4dc-9d01-11e4-89d3-123b93f75cba '
+            'Starting AXFR for e2bed4dc-9d01-11e4-89d3-123b93f75cba '
             'from 1.0.0.0:53',
             self.stdlog.logger.output
         )
@@ -88,6 +95,8 @@ class MdnsHandleTest(oslotest.base.BaseTestCase):
 
         self.assertEqual(dns.rcode.NOERROR, tuple(response)[0].rcode())
 
+        self.handler._sync_notified_zone(*self.tg.add_thread.call_args[0][1:])
+
         self.assertIn(
             'Serial 1 is the same for master and us for '
             'e2bed4dc-9d01-11e4-89d3-123b93f75cba',
@@ -210,6 +219,7 @@ class TestRequestHandlerCall(oslotest.base.BaseTestCase):
         # Use a simple handlers that doesn't require a real request
         self.handler._handle_query_error = mock.Mock(return_value='Error')
         self.handler._handle_axfr = mock.Mock(return_value=['AXFR'])
+        self.handler._handle_ixfr = mock.Mock(return_value=['IXFR'])
         self.handler._handle_record_query = mock.Mock(
             return_value=['Record Query'])
         self.handler._handle_notify = mock.Mock(return_value=['Notify'])
@@ -270,7 +280,7 @@ class TestRequestHandlerCall(oslotest.base.BaseTestCase):
             mock.Mock(rdclass=dns.rdataclass.IN, rdtype=dns.rdatatype.IXFR)
         ]
 
-        self.assertEqual(['AXFR'], list(self.handler(request)))
+        self.assertEqual(['IXFR'], list(self.handler(request)))
 
     def test__call__record_query(self):
         request = mock.Mock()
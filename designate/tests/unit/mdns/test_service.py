@@ -15,6 +15,7 @@
 # under the License.
 import mock
 import oslotest.base
+from oslo_concurrency.fixture import lockutils as lock_fixture
 from oslo_config import cfg
 from oslo_config import fixture as cfg_fixture
 
@@ -23,6 +24,7 @@ import designate.rpc
 import designate.service
 from designate import storage
 import designate.utils
+from designate.mdns import cache
 from designate.mdns import handler
 from designate.mdns import service
 from designate.tests import fixtures
@@ -38,16 +40,56 @@ class MdnsServiceTest(oslotest.base.BaseTestCase):
         self.useFixture(self.stdlog)
 
         self.useFixture(cfg_fixture.Config(CONF))
+        self.useFixture(lock_fixture.ExternalLockFixture())
 
         self.service = service.Service()
 
+    @mock.patch.object(designate.rpc, 'get_notification_listener')
     @mock.patch.object(designate.service.DNSService, 'start')
     @mock.patch.object(designate.service.RPCService, 'start')
-    def test_service_start(self, mock_rpc_start, mock_dns_start):
+    def test_service_start(self, mock_rpc_start, mock_dns_start,
+                           mock_get_listener):
         self.service.start()
 
         self.assertTrue(mock_dns_start.called)
         self.assertTrue(mock_rpc_start.called)
+        self.assertTrue(mock_get_listener.return_value.start.called)
+
+    @mock.patch.object(designate.utils, 'get_worker_slot',
+                       mock.Mock(return_value=1))
+    @mock.patch.object(designate.rpc, 'get_notification_listener')
+    @mock.patch.object(designate.service.DNSService, 'start', mock.Mock())
+    @mock.patch.object(designate.service.RPCService, 'start', mock.Mock())
+    def test_service_start_cache_listener(self, mock_get_listener):
+        CONF.set_override('host', 'mdns-host')
+
+        self.service.start()
+
+        targets, endpoints = mock_get_listener.call_args[0]
+        self.assertEqual(['notifications'], [t.topic for t in targets])
+        self.assertIsInstance(
+            endpoints[0], designate.dnsutils.TsigKeyCacheEndpoint)
+        self.assertIs(self.service.tsigkey_cache,
+                      endpoints[0].tsigkey_cache)
+        self.assertIsInstance(endpoints[1], cache.AnswerCacheEndpoint)
+        self.assertIs(self.service.answer_cache, endpoints[1].answer_cache)
+        self.assertEqual('designate-mdns-mdns-host-1',
+                         mock_get_listener.call_args[1]['pool'])
+        designate.utils.get_worker_slot.assert_called_once_with(
+            'designate-mdns-mdns-host')
+
+    @mock.patch.object(designate.utils, 'get_worker_slot',
+                       mock.Mock(return_value=0))
+    @mock.patch.object(designate.rpc, 'get_notification_listener')
+    @mock.patch.object(designate.service.DNSService, 'start', mock.Mock())
+    @mock.patch.object(designate.service.RPCService, 'start', mock.Mock())
+    def test_service_start_cache_listener_pool(self, mock_get_listener):
+        CONF.set_override('cache_listener_pool', 'mdns-pool', 'service:mdns')
+
+        self.service.start()
+
+        self.assertEqual(
+            'mdns-pool-0', mock_get_listener.call_args[1]['pool'])
 
     def test_service_stop(self):
         self.service.dns_service.stop = mock.Mock()
@@ -58,6 +100,14 @@ class MdnsServiceTest(oslotest.base.BaseTestCase):
 
         self.assertIn('Stopping mdns service', self.stdlog.logger.output)
 
+    def test_service_stop_cache_listener(self):
+        self.service.dns_service.stop = mock.Mock()
+        self.service._cache_listener = mock.Mock()
+
+        self.service.stop()
+
+        self.assertTrue(self.service._cache_listener.stop.called)
+
     def test_service_name(self):
         self.assertEqual('mdns', self.service.service_name)
 
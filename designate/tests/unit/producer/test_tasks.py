@@ -24,6 +24,7 @@ import mock
 import oslotest.base
 from oslo_config import cfg
 from oslo_config import fixture as cfg_fixture
+import oslo_messaging as messaging
 from oslo_utils import timeutils
 
 from designate import context
@@ -32,6 +33,7 @@ from designate.central import rpcapi as central_api
 from designate.producer import tasks
 from designate.tests.unit import RoObject
 from designate.utils import generate_uuid
+from designate.worker import rpcapi as worker_api
 
 DUMMY_TASK_GROUP = cfg.OptGroup(
     name='producer_task:dummy',
@@ -244,3 +246,88 @@ class PeriodicSecondaryRefreshTest(oslotest.base.BaseTestCase):
             self.task()
 
         self.assertFalse(self.central.xfr_zone.called)
+
+
+class ZoneJournalPurgeTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(ZoneJournalPurgeTest, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+
+        # Mock a ctxt...
+        self.ctxt = mock.Mock()
+        self.useFixture(fixtures.MockPatchObject(
+            context.DesignateContext, 'get_admin_context',
+            return_value=self.ctxt
+        ))
+
+        # Mock a central...
+        self.central = mock.Mock()
+        self.useFixture(fixtures.MockPatchObject(
+            central_api.CentralAPI, 'get_instance',
+            return_value=self.central
+        ))
+
+        self.task = tasks.ZoneJournalPurgeTask()
+        self.task.my_partitions = 0, 9
+
+    def test_purge_zone_journal(self):
+        CONF.set_override('max_serials', 10,
+                          'producer_task:zone_journal_purge')
+
+        self.task()
+
+        self.central.purge_zone_journal.assert_called_once_with(
+            self.ctxt, {'zone_shard': 'BETWEEN 0,9'}, 10)
+        self.assertTrue(self.ctxt.all_tenants)
+
+
+class WorkerPeriodicRecoveryTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(WorkerPeriodicRecoveryTest, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+
+        # Mock a ctxt...
+        self.ctxt = mock.Mock()
+        self.useFixture(fixtures.MockPatchObject(
+            context.DesignateContext, 'get_admin_context',
+            return_value=self.ctxt
+        ))
+
+        # Mock a worker...
+        self.worker = mock.Mock()
+        self.useFixture(fixtures.MockPatchObject(
+            worker_api.WorkerAPI, 'get_instance',
+            return_value=self.worker
+        ))
+
+        self.task = tasks.WorkerPeriodicRecovery()
+        self.task.my_partitions = 0, 9
+
+    def test_resumes_after_marker(self):
+        self.worker.recover_shard.side_effect = ['marker', None]
+
+        self.task()
+        self.task()
+
+        self.worker.recover_shard.assert_has_calls([
+            mock.call(self.ctxt, 0, 9, marker=None),
+            mock.call(self.ctxt, 0, 9, marker='marker'),
+        ])
+        self.assertIsNone(self.task.marker)
+        self.assertTrue(self.ctxt.all_tenants)
+
+    def test_keeps_marker_on_error(self):
+        self.task.marker = 'marker'
+        self.worker.recover_shard.side_effect = messaging.MessagingTimeout()
+
+        self.task()
+
+        self.assertEqual('marker', self.task.marker)
+
+    def test_partition_change_resets_marker(self):
+        self.task.marker = 'marker'
+
+        self.task.on_partition_change(range(10, 20), None, None)
+
+        self.assertIsNone(self.task.marker)
+        self.assertEqual(range(10, 20), self.task.my_partitions)
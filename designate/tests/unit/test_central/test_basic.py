@@ -232,6 +232,10 @@ class CentralBasic(TestCase):
         super(CentralBasic, self).setUp()
         self.CONF = self.useFixture(cfg_fixture.Config(cfg.CONF)).conf
 
+        # The zone journal is covered by the functional tests, the mocked
+        # zones and recordsets used here don't support it.
+        self.CONF.set_override('zone_journal', False, 'service:central')
+
         mock_storage = mock.Mock(spec=designate.storage.base.Storage)
 
         pool_list = objects.PoolList.from_list(
@@ -753,7 +757,10 @@ class CentralZoneTestCase(CentralBasic):
         central_service.storage.find_zones = Mock()
         central_service._is_superzone(self.context, 'example.org.', '1')
         _, crit = self.service.storage.find_zones.call_args[0]
-        self.assertEqual({'name': '%.example.org.', 'pool_id': '1'}, crit)
+        self.assertEqual({
+            'reverse_name': 'BETWEEN .gro.elpmaxe.,.gro.elpmaxe/',
+            'pool_id': '1',
+        }, crit)
 
     @patch('designate.central.service.utils.increment_serial')
     def FIXME_test_increment_zone_serial(self, utils_inc_ser):
@@ -1802,6 +1809,7 @@ class CentralZoneTestCase(CentralBasic):
                 action='',
                 status='',
                 serial='',
+                recordset_id=CentralZoneTestCase.recordset__id,
             ),
             increment_serial=False
         )
@@ -1901,7 +1909,8 @@ class CentralZoneTestCase(CentralBasic):
         self.service._delete_record_in_storage(
             self.context,
             RoObject(serial=2),
-            RwObject(action='', status='', serial=''),
+            RwObject(action='', status='', serial='',
+                     recordset_id=CentralZoneTestCase.recordset__id),
             increment_serial=False
         )
         r = self.service.storage.update_record.call_args[0][1]
@@ -2025,16 +2034,12 @@ class IsSubzoneTestCase(CentralBasic):
     def setUp(self):
         super(IsSubzoneTestCase, self).setUp()
 
-        def find_zone(ctx, criterion):
-            LOG.debug("Calling find_zone on %r" % criterion)
-            if criterion['name'] == 'example.com.':
-                LOG.debug("Returning %r" % criterion['name'])
-                return criterion['name']
+        def find_zones(ctx, criterion):
+            LOG.debug("Calling find_zones on %r" % criterion)
+            return [RoObject(name=name) for name in criterion['name']
+                    if name in ('com.', 'example.com.')]
 
-            LOG.debug("Not found")
-            raise exceptions.ZoneNotFound
-
-        self.service.storage.find_zone = find_zone
+        self.service.storage.find_zones = find_zones
 
     def test_is_subzone_false(self):
         r = self.service._is_subzone(self.context, 'com',
@@ -2055,7 +2060,7 @@ class IsSubzoneTestCase(CentralBasic):
         r = self.service._is_subzone(
             self.context, 'foo.a.b.example.com.',
             CentralZoneTestCase.pool__id)
-        self.assertEqual('example.com.', r)
+        self.assertEqual('example.com.', r.name)
 
 
 class CentralZoneExportTests(CentralBasic):
@@ -2200,6 +2205,7 @@ class CentralQuotaTest(unittest.TestCase):
     def test_zone_record_quota_allows_lowering_value(self, quota, storage):
         service = Service()
         service.storage.count_records.return_value = 10
+        service.storage.get_usage.return_value = 10
 
         recordset = mock.Mock()
         recordset.managed = False
@@ -0,0 +1,228 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import re
+import time
+
+import mock
+import oslotest.base
+from oslo_config import cfg
+from oslo_config import fixture as cfg_fixture
+
+from designate.central import matchers
+
+PATTERNS = [
+    r'example.org.',
+    r'^blacklisted.org.$',
+    r'com.$',
+    r'^([A-Za-z0-9_\-]+\.)*example\.com\.$',
+    r'^(?:[a-z]*\.)*example\.net\.$',
+    r'^example\.io\.$',
+    r'\.io\.$',
+    r'^.*\..*\.q\.$',
+    r'(?i)EXAMPLE\.biz\.$',
+    r'(?P<name>zz)\.$',
+    r'\bfoo\b',
+    r'^x{2,4}\.$',
+    r'\d\.\D\s?\S$',
+    r'[^a-z]\.\B.$',
+]
+
+UNSAFE_PATTERNS = [
+    r'(([a-z])+.)+[A-Z]([a-z])+$',
+    r'^(a|ab)*c\.$',
+    r'^(a?b)+\.$',
+    r'(?:[a-z]\.?)*q$',
+    r'^(?:x{2}){2,}$',
+    r'^.*\..*\..*\.q\.$',
+    r'^(\w+)\.\1\.$',
+    r'^(?P<a>\w+)\.(?P=a)\.$',
+    r'example(?=\.com)',
+    r'(?<!www)\.example\.com\.$',
+    r'(?x) example \. com',
+]
+
+NAMES = [
+    'org.', 'www.example.org.', 'blacklisted.org.', 'a.blacklisted.org.',
+    'example.com.', 'A-b.example.com.', 'a..example.com.', 'aexample.com.',
+    'example.net.', 'a.b.example.net.', 'A.example.net.', 'x.example.io.',
+    'example.io.', 'abab.c', 'aBc.Def', 'ababc.', 'a.b.c.q.', 'a.q.',
+    'www.EXAMPLE.Biz.', 'ab.ab.', 'ab.ac.', 'zz.', 'a.foo.', 'afoo.',
+    'xxx.', 'xxxxx.', '1.a b', '1.ab', 'A.-.', 'example.com.\n',
+]
+
+
+class SuffixTrieTest(oslotest.base.BaseTestCase):
+    def test_find(self):
+        trie = matchers.SuffixTrie()
+        trie.add('com.', 'com')
+        trie.add('example.com.', 'example')
+        trie.add('', 'root')
+
+        self.assertEqual(
+            [(12, 'root'), (8, 'com'), (0, 'example')],
+            list(trie.find('example.com.')))
+        self.assertEqual([(8, 'root')], list(trie.find('example.')))
+
+
+class BlacklistMatcherTest(oslotest.base.BaseTestCase):
+    def test_search_like_re(self):
+        for pattern in PATTERNS:
+            matcher = matchers.BlacklistMatcher([pattern])
+            for name in NAMES:
+                self.assertEqual(
+                    bool(re.search(pattern, name)), matcher.search(name),
+                    '%r against %r' % (pattern, name))
+
+    def test_search_all_patterns(self):
+        matcher = matchers.BlacklistMatcher(PATTERNS)
+
+        for name in NAMES:
+            self.assertEqual(
+                any(re.search(pattern, name) for pattern in PATTERNS),
+                matcher.search(name), name)
+
+    def test_compiled_forms(self):
+        matcher = matchers.BlacklistMatcher(PATTERNS)
+
+        # The literal suffixes are in the trie, the rest joined in one regex
+        # but for the ones with global flags or named groups
+        self.assertEqual(4, len(list(matcher.trie.find('example.com.'))) +
+                         len(list(matcher.trie.find('example.net.'))) +
+                         len(list(matcher.trie.find('x.example.io.'))))
+        self.assertEqual(
+            '|'.join('(?:%s)' % pattern
+                     for pattern in PATTERNS[:3] + [PATTERNS[7]] +
+                     PATTERNS[10:]),
+            matcher.regexes[0].pattern)
+        self.assertEqual(PATTERNS[8:10],
+                         [regex.pattern for regex in matcher.regexes[1:]])
+
+    def test_labels_matching_dots(self):
+        # Those are nested repeats re could backtrack over
+        matcher = matchers.BlacklistMatcher([r'^([^a]+\.)*example\.com\.$'])
+
+        self.assertEqual(0, len(list(matcher.trie.find('example.com.'))))
+        self.assertEqual(0, len(matcher.regexes))
+
+    def test_invalid_pattern(self):
+        matcher = matchers.BlacklistMatcher(['(', 'example.org.'])
+
+        self.assertTrue(matcher.search('example.org.'))
+        self.assertFalse(matcher.search('example.net.'))
+
+    @mock.patch.object(matchers.LOG, 'error')
+    def test_unsafe_pattern(self, mock_error):
+        matcher = matchers.BlacklistMatcher([r'^(a+)+$', r'^b\.'])
+
+        self.assertEqual(1, len(matcher.regexes))
+        self.assertFalse(matcher.search('a' * 4096 + 'b'))
+        self.assertTrue(matcher.search('b.example.com.'))
+        mock_error.assert_called_once_with(
+            mock.ANY, {'pattern': r'^(a+)+$', 'error': mock.ANY})
+
+
+class CompilePatternTest(oslotest.base.BaseTestCase):
+    def test_compile_pattern(self):
+        for pattern in PATTERNS + [r'^[a-z.]*example\.(?:com|net)\.$'
+                                   r'|^(?:a|b)?x{3}\.$',
+                                   r'^[(|*]\(\*\)x{}\.', r'^(ab)+\.$']:
+            regex = matchers.compile_pattern(pattern)
+            self.assertEqual(pattern, regex.pattern)
+
+    def test_compile_unsafe_pattern(self):
+        for pattern in UNSAFE_PATTERNS:
+            self.assertRaises(ValueError, matchers.compile_pattern, pattern)
+
+    def test_compile_invalid_pattern(self):
+        self.assertRaisesRegex(ValueError, 'Invalid pattern',
+                               matchers.compile_pattern, '(')
+
+    def test_compile_literal_names(self):
+        # Literal names preceded by labels are evaluated in the trie
+        matchers.compile_pattern(r'^([A-Za-z0-9_\-]+\.)*example\.com\.$')
+        self.assertRaises(ValueError, matchers.compile_pattern,
+                          r'^([A-Za-z0-9_.]+\.)*example\.com\.$')
+
+    def test_search_time(self):
+        for pattern in [r'^[a-z.]*[a-z]*q$', r'\w+\w+\.$', r'.*.*x']:
+            regex = matchers.compile_pattern(pattern)
+            start = time.time()
+            regex.search('a' * 254 + '!')
+            self.assertLess(time.time() - start, 1)
+
+
+class TldMatcherTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TldMatcherTest, self).setUp()
+        self.matcher = matchers.TldMatcher(['com', 'co.uk'])
+
+    def test_has_tld(self):
+        self.assertTrue(self.matcher.has_tld('example.com.'))
+        self.assertTrue(self.matcher.has_tld('a.b.example.co.uk.'))
+        self.assertTrue(self.matcher.has_tld('com.'))
+        self.assertFalse(self.matcher.has_tld('example.uk.'))
+        self.assertFalse(self.matcher.has_tld('example.xco.uk.'))
+        self.assertFalse(self.matcher.has_tld('examplecom.'))
+
+    def test_is_tld(self):
+        self.assertTrue(self.matcher.is_tld('co.uk.'))
+        self.assertTrue(self.matcher.is_tld('COM.'))
+        self.assertFalse(self.matcher.is_tld('uk.'))
+        self.assertFalse(self.matcher.is_tld('example.com.'))
+
+
+class MatcherCacheTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(MatcherCacheTest, self).setUp()
+        self.useFixture(cfg_fixture.Config(cfg.CONF))
+        self.load = mock.Mock(side_effect=lambda context: object())
+        self.cache = matchers.MatcherCache(self.load, 'tld_cache_ttl')
+
+    def test_get(self):
+        matcher = self.cache.get('context')
+
+        self.assertIs(matcher, self.cache.get('context'))
+        self.load.assert_called_once_with('context')
+
+    def test_invalidate(self):
+        matcher = self.cache.get('context')
+        self.cache.invalidate()
+
+        self.assertIsNot(matcher, self.cache.get('context'))
+        self.assertEqual(2, self.load.call_count)
+
+    def test_expired(self):
+        cfg.CONF.set_override('tld_cache_ttl', 0, 'service:central')
+
+        self.cache.get('context')
+        self.cache.get('context')
+
+        self.assertEqual(2, self.load.call_count)
+
+
+class MatcherCacheEndpointTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(MatcherCacheEndpointTest, self).setUp()
+        self.cache = mock.Mock()
+        self.endpoint = matchers.MatcherCacheEndpoint(
+            self.cache, r'^dns\.blacklist\.(create|update|delete)$')
+
+    def test_filter_rule(self):
+        self.assertTrue(self.endpoint.filter_rule.match(
+            {}, 'central', 'dns.blacklist.update', {}, {}))
+        self.assertFalse(self.endpoint.filter_rule.match(
+            {}, 'central', 'dns.zone.update', {}, {}))
+
+    def test_info(self):
+        self.endpoint.info({}, 'central', 'dns.blacklist.delete', {}, {})
+
+        self.cache.invalidate.assert_called_once_with()
@@ -18,6 +18,7 @@ import socket
 import dns
 import dns.exception
 import dns.message
+import dns.name
 import dns.rcode
 import dns.rdatatype
 import dns.zone
@@ -211,6 +212,92 @@ class TestUtils(designate.tests.TestCase):
         self.assertEqual(middleware.process_request(notify), (response,))
 
 
+class TestSerializationMiddleware(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestSerializationMiddleware, self).setUp()
+        patcher = mock.patch.object(
+            dnsutils.context.DesignateContext, 'get_admin_context')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.query = dns.message.make_query('example.org.', 'AXFR')
+        self.request = {
+            'payload': self.query.to_wire(),
+            'addr': ('192.0.2.1', 53),
+        }
+
+    @mock.patch.object(dnsutils, 'metrics')
+    def test_metrics(self, mock_metrics):
+        def application(message):
+            for i in range(2):
+                yield dns.message.make_response(message)
+
+        middleware = dnsutils.SerializationMiddleware(application)
+
+        wires = list(middleware(self.request))
+
+        dimensions = {'opcode': 'QUERY', 'qtype': 'AXFR'}
+        mock_metrics.counter.assert_has_calls([
+            mock.call('dns.requests'),
+            mock.call('dns.response_messages'),
+            mock.call('dns.response_bytes'),
+        ])
+        counter = mock_metrics.counter.return_value
+        counter.increment.assert_has_calls([
+            mock.call(dimensions=dict(dimensions, rcode='NOERROR')),
+            mock.call(2, dimensions=dimensions),
+            mock.call(sum(len(wire) for wire in wires),
+                      dimensions=dimensions),
+        ])
+        mock_metrics.timer.return_value.timing.assert_called_once_with(
+            'dns.request_time', mock.ANY, dimensions=dimensions)
+
+    @mock.patch.object(dnsutils, 'metrics')
+    def test_metrics_refused(self, mock_metrics):
+        def application(message):
+            response = dns.message.make_response(message)
+            response.set_rcode(dns.rcode.REFUSED)
+            yield response
+
+        middleware = dnsutils.SerializationMiddleware(application)
+
+        self.assertEqual(1, len(list(middleware(self.request))))
+
+        counter = mock_metrics.counter.return_value
+        counter.increment.assert_any_call(dimensions={
+            'opcode': 'QUERY', 'qtype': 'AXFR', 'rcode': 'REFUSED'})
+
+
+class TestRdataWire(oslotest.base.BaseTestCase):
+    def test_rdata_to_wire(self):
+        self.assertEqual(
+            b'\x00\x0a\x04mail\x07example\x03org\x00',
+            dnsutils.rdata_to_wire('MX', '10 mail.example.org.'))
+
+    def test_rdata_to_wire_invalid(self):
+        self.assertIsNone(dnsutils.rdata_to_wire('A', 'not-an-ip'))
+
+    def test_rdata_from_wire(self):
+        data = '"v=spf1 -all" "second string"'
+        wire = dnsutils.rdata_to_wire('TXT', data)
+
+        self.assertEqual(
+            data, dnsutils.rdata_from_wire('TXT', wire).to_text())
+
+
+class TestSerialGte(oslotest.base.BaseTestCase):
+    def test_serial_gte(self):
+        self.assertTrue(dnsutils.serial_gte(2, 2))
+        self.assertTrue(dnsutils.serial_gte(3, 2))
+        self.assertFalse(dnsutils.serial_gte(2, 3))
+
+    def test_serial_gte_wrap_around(self):
+        self.assertTrue(dnsutils.serial_gte(1, 2 ** 32 - 1))
+        self.assertFalse(dnsutils.serial_gte(2 ** 32 - 1, 1))
+        self.assertTrue(dnsutils.serial_gte(2 ** 31 - 1, 0))
+        self.assertFalse(dnsutils.serial_gte(2 ** 31, 0))
+
+
 class TestDoAfxr(oslotest.base.BaseTestCase):
     def setUp(self):
         super(TestDoAfxr, self).setUp()
@@ -320,3 +407,71 @@ class TestDoAfxr(oslotest.base.BaseTestCase):
 
         self.assertTrue(mock_xfr.called)
         self.assertTrue(mock_from_xfr.called)
+
+
+class TestTsigKeyCache(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestTsigKeyCache, self).setUp()
+        self.storage = mock.Mock()
+        self.tsigkey = objects.TsigKey(
+            id='e4e1a9b1-5b02-4f1e-9f77-ec3a7a4c0b2b',
+            name='test-key',
+            secret='c2VjcmV0',
+        )
+        self.storage.find_tsigkey.return_value = self.tsigkey
+        self.cache = dnsutils.TsigKeyCache(self.storage, 60)
+        self.keyname = dns.name.from_text('test-key')
+
+    def test_get(self):
+        self.assertEqual(self.tsigkey, self.cache.get(self.keyname))
+        self.assertEqual(self.tsigkey, self.cache.get(self.keyname))
+
+        self.storage.find_tsigkey.assert_called_once_with(
+            mock.ANY, {'name': 'test-key'})
+
+    @mock.patch('time.time')
+    def test_get_expired(self, mock_time):
+        mock_time.return_value = 1000
+        self.cache.get(self.keyname)
+
+        mock_time.return_value = 1061
+        self.cache.get(self.keyname)
+
+        self.assertEqual(2, self.storage.find_tsigkey.call_count)
+
+    def test_get_not_found(self):
+        self.storage.find_tsigkey.side_effect = exceptions.TsigKeyNotFound
+
+        self.assertRaises(
+            exceptions.TsigKeyNotFound, self.cache.get, self.keyname)
+        self.assertEqual({}, self.cache.data)
+
+    def test_invalidate(self):
+        self.cache.get(self.keyname)
+
+        dnsutils.TsigKeyCacheEndpoint(self.cache).info(
+            {}, 'central.host', 'dns.tsigkey.update', {}, {})
+
+        self.cache.get(self.keyname)
+        self.assertEqual(2, self.storage.find_tsigkey.call_count)
+
+    def test_keyring_and_middleware_share_lookup(self):
+        keyring = dnsutils.TsigKeyring(self.cache)
+        middleware = dnsutils.TsigInfoMiddleware(mock.Mock(), self.cache)
+
+        request = mock.Mock(had_tsig=True, keyname=self.keyname)
+        request.environ = {'context': mock.Mock()}
+
+        self.assertEqual(b'secret', keyring.get(self.keyname))
+        self.assertIsNone(middleware.process_request(request))
+
+        self.assertEqual(self.tsigkey, request.environ['tsigkey'])
+        self.assertEqual(self.tsigkey.id,
+                         request.environ['context'].tsigkey_id)
+        self.assertEqual(1, self.storage.find_tsigkey.call_count)
+
+    def test_keyring_not_found(self):
+        self.storage.find_tsigkey.side_effect = exceptions.TsigKeyNotFound
+        keyring = dnsutils.TsigKeyring(self.cache)
+
+        self.assertIsNone(keyring.get(self.keyname))
@@ -0,0 +1,82 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import os
+
+import fixtures
+import oslotest.base
+from oslo_config import cfg
+from oslo_config import fixture as cfg_fixture
+
+from designate import exceptions
+from designate import export_store
+from designate.export_store import impl_file
+
+CONF = cfg.CONF
+
+
+class TestFileExportStore(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestFileExportStore, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+
+        self.path = os.path.join(
+            self.useFixture(fixtures.TempDir()).path, 'exports')
+        CONF.set_override('path', self.path, 'export_store:file')
+        CONF.set_override('chunk_size', 4, 'export_store:file')
+
+        self.store = export_store.get_export_store()
+
+    def test_get_export_store(self):
+        self.assertIsInstance(self.store, impl_file.FileExportStore)
+
+    def test_path_not_a_directory(self):
+        open(self.path, 'w').close()
+
+        self.assertRaises(
+            exceptions.ConfigurationError, export_store.get_export_store)
+
+    def test_write_and_read(self):
+        self.store.write('1', iter(['$ORIGIN ', 'example.org.\n']))
+
+        self.assertEqual(
+            [b'$ORI', b'GIN ', b'exam', b'ple.', b'org.', b'\n'],
+            list(self.store.read('1'))
+        )
+        self.assertEqual(['1.zone'], os.listdir(self.path))
+
+    def test_write_replaces(self):
+        self.store.write('1', ['old'])
+        self.store.write('1', ['new'])
+
+        self.assertEqual(b'new', b''.join(self.store.read('1')))
+
+    def test_write_fails(self):
+        def chunks():
+            yield '$ORIGIN example.org.\n'
+            raise IOError()
+
+        self.assertRaises(IOError, self.store.write, '1', chunks())
+
+        self.assertEqual([], os.listdir(self.path))
+
+    def test_read_not_found(self):
+        self.assertRaises(
+            exceptions.ZoneExportNotFound, self.store.read, '1')
+
+    def test_delete(self):
+        self.store.write('1', ['$ORIGIN example.org.\n'])
+
+        self.store.delete('1')
+        self.store.delete('1')
+
+        self.assertRaises(
+            exceptions.ZoneExportNotFound, self.store.read, '1')
@@ -0,0 +1,88 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+import oslotest.base
+
+from designate import storage
+
+
+class FakeService(object):
+    def __init__(self):
+        self.storage = mock.Mock()
+        self.calls = []
+
+    @storage.transaction
+    def outer(self, inner_callbacks=1):
+        storage.transaction_state()['outer'] = True
+        storage.before_commit(lambda: self.calls.append('outer'))
+        for _ in range(inner_callbacks):
+            self.inner()
+        self.calls.append('outer done')
+
+    @storage.transaction
+    def inner(self):
+        self.calls.append('inner sees %s' % storage.transaction_state())
+        storage.before_commit(lambda: self.calls.append('inner'))
+
+    @storage.transaction
+    def failing(self):
+        storage.transaction_state()['failing'] = True
+        storage.before_commit(lambda: self.calls.append('failing'))
+        raise ValueError()
+
+
+class TransactionStateTest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TransactionStateTest, self).setUp()
+        self.service = FakeService()
+
+    def test_before_commit_outside_transaction(self):
+        calls = []
+        storage.before_commit(lambda: calls.append('called'))
+
+        self.assertEqual(['called'], calls)
+        self.assertEqual({}, storage.transaction_state())
+
+    def test_before_commit_outermost_transaction(self):
+        self.service.outer(inner_callbacks=2)
+
+        self.assertEqual([
+            "inner sees {'outer': True}",
+            "inner sees {'outer': True}",
+            'outer done',
+            'outer',
+            'inner',
+            'inner',
+        ], self.service.calls)
+        self.assertEqual(3, self.service.storage.commit.call_count)
+        self.assertEqual({}, storage.transaction_state())
+
+    def test_before_commit_runs_before_commit(self):
+        self.service.storage.commit.side_effect = (
+            lambda: self.service.calls.append('commit'))
+
+        self.service.inner()
+
+        self.assertEqual(["inner sees {}", 'inner', 'commit'],
+                         self.service.calls)
+
+    def test_rollback_clears_state(self):
+        self.assertRaises(ValueError, self.service.failing)
+
+        self.service.storage.rollback.assert_called_once_with()
+        self.service.storage.commit.assert_not_called()
+        self.assertEqual([], self.service.calls)
+        self.assertEqual({}, storage.transaction_state())
+
+        self.service.inner()
+
+        self.assertEqual(["inner sees {}", 'inner'], self.service.calls)
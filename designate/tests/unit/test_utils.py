@@ -213,6 +213,15 @@ class TestUtils(oslotest.base.BaseTestCase):
 
         self.assertEqual('Hello World', result)
 
+    def test_render_template_stream(self):
+        template = jinja2.Template(
+            '{% for name in names %}Hello {{name}}\n{% endfor %}')
+
+        result = utils.render_template_stream(
+            template, names=iter(['World', 'Moon']))
+
+        self.assertEqual('Hello World\nHello Moon\n', ''.join(result))
+
     @mock.patch('six.moves.builtins.open', new_callable=mock.mock_open)
     @mock.patch('os.path.exists')
     def test_render_template_to_file(self, mock_exists, mock_open):
@@ -501,3 +510,22 @@ class TestUtils(oslotest.base.BaseTestCase):
             'SO_REUSEPORT not available, ignoring.',
             self.stdlog.logger.output
         )
+
+    @mock.patch.dict(utils._WORKER_SLOTS, clear=True)
+    @mock.patch('oslo_concurrency.lockutils.external_lock')
+    def test_get_worker_slot(self, mock_external_lock):
+        locks = [mock.Mock(), mock.Mock()]
+        locks[0].acquire.return_value = False
+        locks[1].acquire.return_value = True
+        mock_external_lock.side_effect = locks
+
+        self.assertEqual(1, utils.get_worker_slot('designate-mdns-host'))
+        # The slot is kept for as long as the process runs
+        self.assertEqual(1, utils.get_worker_slot('designate-mdns-host'))
+
+        mock_external_lock.assert_has_calls([
+            mock.call('designate-mdns-host-0'),
+            mock.call('designate-mdns-host-1'),
+        ])
+        locks[1].acquire.assert_called_once_with(blocking=False)
+        self.assertFalse(locks[1].release.called)
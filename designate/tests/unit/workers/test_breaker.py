@@ -0,0 +1,146 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import eventlet
+import mock
+import oslotest.base
+
+from designate.worker import breaker
+
+
+class TestCircuitBreaker(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestCircuitBreaker, self).setUp()
+        self.breaker = breaker.CircuitBreaker(
+            'target1', max_failures=2, reset_time=10
+        )
+
+    def _fail(self):
+        with self.breaker.call():
+            raise IOError()
+
+    def _succeed(self):
+        with self.breaker.call():
+            pass
+
+    def _succeed_slowly(self):
+        with self.breaker.call():
+            eventlet.sleep(1)
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertRaises(IOError, self._fail)
+        self._succeed()
+        self.assertRaises(IOError, self._fail)
+        self.assertEqual(breaker.CLOSED, self.breaker.state)
+
+        self.assertRaises(IOError, self._fail)
+
+        self.assertEqual(breaker.OPEN, self.breaker.state)
+        self.assertRaises(breaker.CircuitOpen, self._succeed)
+
+    def test_disabled(self):
+        self.breaker.max_failures = 0
+
+        for i in range(5):
+            self.assertRaises(IOError, self._fail)
+
+        self.assertEqual(breaker.CLOSED, self.breaker.state)
+
+    @mock.patch.object(breaker.time, 'time')
+    def test_half_open_probe_closes(self, mock_time):
+        mock_time.return_value = 100
+        self.breaker.failures = 1
+        self.assertRaises(IOError, self._fail)
+
+        mock_time.return_value = 110
+        with self.breaker.call():
+            # Only the probe goes through while the circuit is half open
+            self.assertEqual(breaker.HALF_OPEN, self.breaker.state)
+            self.assertRaises(breaker.CircuitOpen, self._succeed)
+
+        self.assertEqual(breaker.CLOSED, self.breaker.state)
+        self._succeed()
+
+    @mock.patch.object(breaker.time, 'time')
+    def test_half_open_probe_reopens(self, mock_time):
+        mock_time.return_value = 100
+        self.breaker.failures = 1
+        self.assertRaises(IOError, self._fail)
+
+        mock_time.return_value = 110
+        self.assertRaises(IOError, self._fail)
+
+        self.assertEqual(breaker.OPEN, self.breaker.state)
+        self.assertEqual(110, self.breaker.opened_at)
+        self.assertRaises(breaker.CircuitOpen, self._succeed)
+
+    @mock.patch.object(breaker.time, 'time')
+    def test_half_open_probe_killed(self, mock_time):
+        mock_time.return_value = 100
+        self.breaker.failures = 1
+        self.assertRaises(IOError, self._fail)
+
+        mock_time.return_value = 110
+        probe = eventlet.spawn(self._succeed_slowly)
+        eventlet.sleep(0)
+        self.assertEqual(breaker.HALF_OPEN, self.breaker.state)
+        probe.kill()
+
+        # The next call probes the target again
+        self.assertEqual(breaker.OPEN, self.breaker.state)
+        self.assertEqual(100, self.breaker.opened_at)
+        self._succeed()
+        self.assertEqual(breaker.CLOSED, self.breaker.state)
+
+    def test_timeout_is_not_a_failure(self):
+        self.breaker.failures = 1
+
+        with eventlet.Timeout(0.01, False):
+            self._succeed_slowly()
+
+        self.assertEqual(breaker.CLOSED, self.breaker.state)
+        self.assertEqual(1, self.breaker.failures)
+
+    def test_max_concurrency(self):
+        self.breaker = breaker.CircuitBreaker(
+            'target1', max_failures=2, reset_time=10, max_concurrency=1
+        )
+        event = eventlet.Event()
+        calls = []
+
+        def call(name):
+            with self.breaker.call():
+                calls.append(name)
+                event.wait()
+
+        first = eventlet.spawn(call, 'first')
+        second = eventlet.spawn(call, 'second')
+        eventlet.sleep(0)
+
+        self.assertEqual(['first'], calls)
+
+        event.send()
+        first.wait()
+        second.wait()
+        self.assertEqual(['first', 'second'], calls)
+
+    @mock.patch.object(breaker, 'metrics')
+    def test_metrics(self, mock_metrics):
+        self.breaker.failures = 1
+        self.assertRaises(IOError, self._fail)
+        self.assertRaises(breaker.CircuitOpen, self._succeed)
+
+        mock_metrics.counter.assert_has_calls([
+            mock.call('worker.circuit_breaker.opened'),
+            mock.call().increment(dimensions={'target': 'target1'}),
+            mock.call('worker.circuit_breaker.short_circuited'),
+            mock.call().increment(dimensions={'target': 'target1'}),
+        ])
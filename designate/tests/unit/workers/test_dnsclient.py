@@ -0,0 +1,134 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import socket
+
+import dns.exception
+import dns.flags
+import dns.message
+import dns.query
+import eventlet
+import mock
+import oslotest.base
+
+from designate.worker import dnsclient
+from designate.worker import utils as wutils
+
+
+class TestDNSClient(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestDNSClient, self).setUp()
+        self.client = dnsclient.DNSClient(retransmit_interval=0.05)
+
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.addCleanup(self.server.close)
+        self.port = self.server.getsockname()[1]
+
+    def _serve(self, count=1, drop=0, flags=0):
+        """Answer count queries, after dropping the first drop of them"""
+        def serve():
+            for i in range(drop + count):
+                wire, addr = self.server.recvfrom(512)
+                if i < drop:
+                    continue
+                response = dns.message.make_response(
+                    dns.message.from_wire(wire))
+                response.flags |= flags
+                self.server.sendto(response.to_wire(), addr)
+        return eventlet.spawn(serve)
+
+    def test_query(self):
+        server = self._serve(count=2)
+        queries = [wutils.prepare_msg('example.org.') for i in range(2)]
+        # Both queries use the same socket, with the same message id.
+        queries[1].id = queries[0].id
+
+        pool = eventlet.GreenPool()
+        responses = list(pool.imap(
+            lambda query: self.client.query(
+                query, '127.0.0.1', port=self.port, timeout=1),
+            queries))
+        server.wait()
+
+        self.assertNotEqual(queries[0].id, queries[1].id)
+        for query, response in zip(queries, responses):
+            self.assertTrue(query.is_response(response))
+        self.assertEqual(1, len(self.client._socks))
+        self.assertEqual({}, self.client._pending)
+
+    def test_query_retransmits(self):
+        server = self._serve(drop=2)
+        query = wutils.prepare_msg('example.org.')
+
+        response = self.client.query(
+            query, '127.0.0.1', port=self.port, timeout=1)
+        server.wait()
+
+        self.assertTrue(query.is_response(response))
+
+    def test_query_timeout(self):
+        query = wutils.prepare_msg('example.org.')
+
+        self.assertRaises(
+            dns.exception.Timeout,
+            self.client.query, query, '127.0.0.1', port=self.port,
+            timeout=0.2)
+        self.assertEqual({}, self.client._pending)
+
+    @mock.patch.object(dns.query, 'tcp')
+    def test_query_truncated(self, mock_tcp):
+        server = self._serve(flags=dns.flags.TC)
+        query = wutils.prepare_msg('example.org.')
+
+        response = self.client.query(
+            query, '127.0.0.1', port=self.port, timeout=1)
+        server.wait()
+
+        self.assertEqual(mock_tcp.return_value, response)
+        mock_tcp.assert_called_once_with(
+            query, '127.0.0.1', port=self.port, timeout=mock.ANY)
+
+    def test_query_rotates_socket(self):
+        self.client.queries_per_socket = 2
+        server = self._serve(count=3)
+
+        socks = []
+        ports = []
+        for i in range(3):
+            query = wutils.prepare_msg('example.org.')
+            self.client.query(query, '127.0.0.1', port=self.port, timeout=1)
+            socks.append(self.client._socks[socket.AF_INET])
+            ports.append(socks[-1].getsockname()[1])
+        server.wait()
+
+        # The third query moved on to a new source port
+        self.assertIs(socks[0], socks[1])
+        self.assertIsNot(socks[1], socks[2])
+        self.assertNotEqual(ports[1], ports[2])
+        self.assertEqual(-1, socks[1].fileno())
+        self.assertEqual({socks[2]: 1}, dict(self.client._queries))
+        self.assertEqual({socks[2]: 0}, dict(self.client._in_flight))
+
+    def test_read_responses_scoped_address(self):
+        query = wutils.prepare_msg('example.org.')
+        wire = dns.message.make_response(query).to_wire()
+        responses = eventlet.queue.LightQueue()
+        self.client._pending[(query.id, 'fe80::1', 53)] = responses
+
+        sock = mock.Mock()
+        sock.recvfrom.side_effect = [
+            (wire, ('fe80::1%eth0', 53, 0, 2)), OSError()]
+        sock.fileno.return_value = -1
+
+        self.client._read_responses(sock)
+
+        self.assertEqual(wire, responses.get_nowait())
@@ -13,6 +13,10 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import time
+
+import eventlet
+import futurist
 import mock
 
 from designate import exceptions
@@ -79,3 +83,119 @@ class TestProcessingExecutor(TestCase):
         exe = processing.Executor()
 
         self.assertEqual('func_name', exe.task_name(mock_task))
+
+    def test_execute_delayed_tasks(self):
+        def t1():
+            return 1
+
+        exe = processing.Executor()
+
+        start_time = time.time()
+        results = exe.run([t1, t1], delay=0.1)
+
+        self.assertEqual([1, 1], results)
+        self.assertGreaterEqual(time.time() - start_time, 0.1)
+        self.assertEqual(0, len(exe._scheduler))
+
+    def test_start_and_wait(self):
+        def t1():
+            return 1
+
+        def failed_task():
+            raise exceptions.BadAction('Not Great')
+
+        exe = processing.Executor()
+
+        futures = exe.start([t1, failed_task], delay=0.01)
+
+        self.assertEqual([1, None], exe.wait(futures))
+
+    def test_execute_in_lanes(self):
+        def lane():
+            return processing.current_lane()
+
+        def start_subtask():
+            return exe.run(lane, lane=processing.POLL)[0]
+
+        exe = processing.Executor()
+
+        self.assertEqual([processing.INTERACTIVE], exe.run(lane))
+        self.assertEqual([processing.POLL],
+                         exe.run(lane, lane=processing.POLL))
+        self.assertEqual([processing.POLL], exe.run(start_subtask))
+        # Work started from a background lane stays in it
+        self.assertEqual([processing.RECOVERY],
+                         exe.run(start_subtask, lane=processing.RECOVERY))
+
+        with processing.lane(processing.EXPORT):
+            self.assertEqual([processing.EXPORT], exe.run(lane))
+        self.assertEqual(processing.INTERACTIVE, processing.current_lane())
+
+    @mock.patch.object(processing, 'metrics')
+    def test_lane_rejects_tasks_over_queue_size(self, mock_metrics):
+        self.config(recovery_threads=1, recovery_queue_size=1,
+                    group='service:worker')
+        event = eventlet.Event()
+
+        def t1():
+            return event.wait()
+
+        exe = processing.Executor()
+
+        futures = exe.start(t1, lane=processing.RECOVERY)
+        # Let the first task take the lane's thread
+        eventlet.sleep(0)
+        futures += exe.start([t1, t1], lane=processing.RECOVERY)
+        event.send(1)
+
+        self.assertEqual([1, 1], exe.wait(futures[:2]))
+        self.assertIsInstance(futures[2].exception(),
+                              futurist.RejectedSubmission)
+        self.assertIn('Rejected task', self.stdlog.logger.output)
+        mock_metrics.counter.assert_called_once_with(
+            'worker.executor.rejected')
+        mock_metrics.timing.assert_called_with(
+            'worker.executor.wait_time', mock.ANY,
+            dimensions={'lane': processing.RECOVERY})
+
+    def test_do_rejected_task(self):
+        def t1():
+            raise futurist.RejectedSubmission('Lane recovery is full')
+
+        self.assertIsNone(processing.Executor.do(t1))
+        self.assertIn('Gave up on task', self.stdlog.logger.output)
+
+    def test_lane_config_invalid(self):
+        self.assertEqual((5, 0), processing._lane_config('unknown'))
+        self.assertIn('Invalid configuration of the unknown lane',
+                      self.stdlog.logger.output)
+
+
+class TestScheduler(TestCase):
+    def test_schedule_runs_in_due_order(self):
+        scheduler = processing.Scheduler()
+        calls = []
+        done = eventlet.Event()
+
+        scheduler.schedule(0.05, lambda: calls.append(2))
+        scheduler.schedule(0.1, lambda: done.send())
+        scheduler.schedule(0.01, lambda: calls.append(1))
+        self.assertEqual(3, len(scheduler))
+
+        done.wait()
+
+        self.assertEqual([1, 2], calls)
+        self.assertEqual(0, len(scheduler))
+        self.assertIsNone(scheduler._timer)
+
+    def test_schedule_survives_failed_call(self):
+        scheduler = processing.Scheduler()
+        done = eventlet.Event()
+
+        def failed_call():
+            raise Exception('Not Great')
+
+        scheduler.schedule(0, failed_call)
+        scheduler.schedule(0.01, lambda: done.send(True))
+
+        self.assertTrue(done.wait())
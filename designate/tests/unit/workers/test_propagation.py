@@ -0,0 +1,72 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+import oslotest.base
+
+from designate.worker import propagation
+
+
+class TestPropagationModel(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestPropagationModel, self).setUp()
+        self.model = propagation.PropagationModel(
+            min_delay=0.5, max_delay=30, percentile=90
+        )
+        self.ns = mock.Mock(host='192.0.2.1', port=53)
+
+    def test_delays_without_observations(self):
+        self.assertEqual(5, self.model.first_poll_delay(self.ns, 5))
+        self.assertEqual(15, self.model.retry_delay(self.ns, 1, 5, 15))
+
+    def test_first_poll_delay(self):
+        for seconds in (2, 2, 4):
+            self.model.observe(self.ns, seconds)
+
+        # 2 + 0.2 * (4 - 2)
+        self.assertAlmostEqual(2.4, self.model.first_poll_delay(self.ns, 5))
+
+    def test_first_poll_delay_clamped(self):
+        self.model.observe(self.ns, 0.1)
+        self.assertEqual(0.5, self.model.first_poll_delay(self.ns, 5))
+
+        self.model.observe(mock.Mock(host='192.0.2.2', port=53), 100)
+        self.assertEqual(30, self.model.first_poll_delay(
+            mock.Mock(host='192.0.2.2', port=53), 5))
+
+    def test_retry_delay_waits_for_percentile(self):
+        for seconds in range(1, 11):
+            self.model.observe(self.ns, seconds)
+
+        # The 90th percentile is 9 seconds
+        self.assertEqual(6, self.model.retry_delay(self.ns, 1, 3, 15))
+
+    def test_retry_delay_backs_off(self):
+        self.model.observe(self.ns, 2)
+
+        self.assertEqual(4, self.model.retry_delay(self.ns, 1, 2, 15))
+        self.assertEqual(8, self.model.retry_delay(self.ns, 2, 6, 15))
+        self.assertEqual(30, self.model.retry_delay(self.ns, 5, 14, 15))
+
+    @mock.patch.object(propagation, 'metrics')
+    def test_observe_metrics(self, mock_metrics):
+        self.model.observe(self.ns, 2)
+
+        dimensions = {'nameserver': '192.0.2.1:53'}
+        mock_metrics.timing.assert_called_once_with(
+            'worker.propagation_time', 2, dimensions=dimensions
+        )
+        mock_metrics.gauge().send.assert_has_calls([
+            mock.call('worker.propagation_time.ewma', 2,
+                      dimensions=dimensions),
+            mock.call('worker.propagation_time.percentile', 2,
+                      dimensions=dimensions),
+        ])
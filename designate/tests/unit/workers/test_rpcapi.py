@@ -0,0 +1,59 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import mock
+import oslotest.base
+from oslo_config import cfg
+from oslo_config import fixture as cfg_fixture
+
+from designate import rpc
+from designate.worker import rpcapi
+
+CONF = cfg.CONF
+
+
+@mock.patch.object(rpc, 'get_client')
+class WorkerAPITest(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(WorkerAPITest, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+
+    def test_version_cap(self, mock_get_client):
+        rpcapi.WorkerAPI()
+        self.assertEqual('1.1', mock_get_client.call_args[1]['version_cap'])
+
+        CONF.set_override('rpc_version_cap', '1.0', 'service:worker')
+        rpcapi.WorkerAPI()
+        self.assertEqual('1.0', mock_get_client.call_args[1]['version_cap'])
+
+    def test_recover_shard(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.can_send_version.return_value = True
+        client.prepare.return_value.call.return_value = 'marker'
+
+        self.assertEqual('marker', rpcapi.WorkerAPI().recover_shard(
+            'context', 1, 10, marker='previous'))
+
+        client.prepare.assert_called_once_with(version='1.1')
+        client.prepare.return_value.call.assert_called_once_with(
+            'context', 'recover_shard', begin=1, end=10, marker='previous')
+
+    def test_recover_shard_old_workers(self, mock_get_client):
+        client = mock_get_client.return_value
+        client.can_send_version.return_value = False
+
+        self.assertIsNone(rpcapi.WorkerAPI().recover_shard(
+            'context', 1, 10, marker='previous'))
+
+        client.can_send_version.assert_called_once_with('1.1')
+        client.cast.assert_called_once_with(
+            'context', 'recover_shard', begin=1, end=10)
+        client.prepare.assert_not_called()
@@ -13,6 +13,7 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import futurist
 import mock
 import oslo_messaging as messaging
 import oslotest.base
@@ -185,9 +186,64 @@ class TestService(oslotest.base.BaseTestCase):
             self.context, self.zone
         )
 
+    @mock.patch.object(service, 'metrics')
+    def test_update_zone_coalesces(self, mock_metrics):
+        zones = [mock.Mock(id='zone1', serial=serial) for serial in (1, 3, 2)]
+
+        def do_zone_action(context, zone):
+            if zone is zones[0]:
+                # Updates requested while the first one is in progress
+                self.service.update_zone(self.context, zones[1])
+                self.service.update_zone(self.context, zones[2])
+
+        self.service._do_zone_action = mock.Mock(side_effect=do_zone_action)
+
+        self.service.update_zone(self.context, zones[0])
+
+        self.service._do_zone_action.assert_has_calls([
+            mock.call(self.context, zones[0]),
+            mock.call(self.context, zones[1]),
+        ])
+        self.assertEqual(2, self.service._do_zone_action.call_count)
+        mock_metrics.counter.assert_called_once_with(
+            'worker.update_zone.coalesced'
+        )
+        self.assertEqual({}, self.service._zone_updates)
+
+    def test_update_zone_failure(self):
+        self.service._do_zone_action = mock.Mock(side_effect=Exception())
+
+        self.assertRaises(
+            Exception,
+            self.service.update_zone, self.context, self.zone
+        )
+
+        self.assertEqual({}, self.service._zone_updates)
+
+    def test_delete_zone_drops_pending_update(self):
+        zone = mock.Mock(id='zone1', serial=1)
+
+        def do_zone_action(context, zone):
+            if zone.action == 'UPDATE':
+                self.service.update_zone(self.context, zone)
+                self.service.delete_zone(self.context, deleted_zone)
+
+        deleted_zone = mock.Mock(id='zone1', action='DELETE')
+        zone.action = 'UPDATE'
+        self.service._do_zone_action = mock.Mock(side_effect=do_zone_action)
+
+        self.service.update_zone(self.context, zone)
+
+        self.service._do_zone_action.assert_has_calls([
+            mock.call(self.context, zone),
+            mock.call(self.context, deleted_zone),
+        ])
+        self.assertEqual(2, self.service._do_zone_action.call_count)
+
     @mock.patch.object(service.zonetasks, 'ZoneAction')
     def test_do_zone_action(self, mock_zone_action):
         self.service._executor = mock.Mock()
+        self.service._executor.start.return_value = []
         self.service._pool = mock.Mock()
         self.service.get_pool = mock.Mock()
         pool = mock.Mock()
@@ -205,13 +261,37 @@ class TestService(oslotest.base.BaseTestCase):
             self.zone.action
         )
 
-        self.service._executor.run.assert_called_with([mock_zone_action()])
+        self.service._executor.start.assert_called_with(
+            [], lane=processing.POLL
+        )
+        self.service._executor.do.assert_called_with(mock_zone_action())
+
+    @mock.patch.object(service.zonetasks, 'ZoneAction')
+    @mock.patch.object(service.zonetasks, 'SendNotify', mock.Mock())
+    def test_do_zone_action_notify_rejected(self, mock_zone_action):
+        notified = futurist.Future()
+        notified.set_result(True)
+        rejected = futurist.Future()
+        rejected.set_exception(futurist.RejectedSubmission())
+        self.service._executor = mock.Mock()
+        self.service._executor.start.return_value = [notified, rejected]
+        self.service._executor.do.return_value = True
+        self.service.get_pool = mock.Mock()
+        self.service.get_pool.return_value.also_notifies = [
+            mock.Mock(host='192.168.1.1', port=53),
+            mock.Mock(host='192.168.1.2', port=53),
+        ]
+
+        self.assertEqual(
+            [True, True, None],
+            self.service._do_zone_action(self.context, self.zone))
 
     @mock.patch.object(service.zonetasks, 'ZoneAction')
     @mock.patch.object(service.zonetasks, 'SendNotify')
     def test_do_zone_action_also_notifies(self, mock_send_notify,
                                           mock_zone_action):
         self.service._executor = mock.Mock()
+        self.service._executor.start.return_value = []
         self.service._pool = mock.Mock()
         self.service.get_pool = mock.Mock()
         pool = mock.Mock()
@@ -231,9 +311,10 @@ class TestService(oslotest.base.BaseTestCase):
             self.zone.action
         )
 
-        self.service._executor.run.assert_called_with(
-            [mock_zone_action(), mock_send_notify()]
+        self.service._executor.start.assert_called_with(
+            [mock_send_notify()], lane=processing.POLL
         )
+        self.service._executor.do.assert_called_with(mock_zone_action())
 
     def test_get_pool(self):
         pool = mock.Mock()
@@ -248,16 +329,55 @@ class TestService(oslotest.base.BaseTestCase):
     def test_recover_shard(self, mock_recover_shard):
         self.service._executor = mock.Mock()
         self.service._pool = mock.Mock()
+        self.service.tg = mock.Mock()
 
-        self.service.recover_shard(self.context, 1, 10)
+        mock_recover_shard.return_value.find_zones.return_value = 'marker'
+
+        next_marker = self.service.recover_shard(
+            self.context, 1, 10, marker='previous')
 
         mock_recover_shard.assert_called_with(
             self.service.executor,
             self.context,
-            1, 10
+            1, 10,
+            worker_api=self.service,
+            marker='previous'
+        )
+
+        self.assertEqual('marker', next_marker)
+        self.service.tg.add_thread.assert_called_once_with(
+            self.service._recover_shard, (1, 10), mock_recover_shard()
         )
+        self.assertEqual({(1, 10)}, self.service._shard_recoveries)
+
+        # The recovery runs outside the executor's lanes
+        self.service._recover_shard((1, 10), mock_recover_shard())
 
-        self.service.executor.run.assert_called_with(mock_recover_shard())
+        self.service.executor.do.assert_called_once_with(
+            mock_recover_shard())
+        self.service.executor.start.assert_not_called()
+        self.assertEqual(set(), self.service._shard_recoveries)
+
+    @mock.patch.object(service.zonetasks, 'RecoverShard')
+    def test_recover_shard_in_progress(self, mock_recover_shard):
+        self.service.tg = mock.Mock()
+        self.service._shard_recoveries.add((1, 10))
+
+        next_marker = self.service.recover_shard(
+            self.context, 5, 20, marker='previous')
+
+        self.assertEqual('previous', next_marker)
+        mock_recover_shard.assert_not_called()
+        self.service.tg.add_thread.assert_not_called()
+
+    def test_recover_shard_failed(self):
+        self.service._executor = mock.Mock()
+        self.service._executor.do.side_effect = ValueError()
+        self.service._shard_recoveries.add((1, 10))
+
+        self.service._recover_shard((1, 10), mock.Mock())
+
+        self.assertEqual(set(), self.service._shard_recoveries)
 
     @mock.patch.object(service.zonetasks, 'ExportZone')
     def test_start_zone_export(self, mock_export_zone):
@@ -275,4 +395,6 @@ class TestService(oslotest.base.BaseTestCase):
             export
         )
 
-        self.service.executor.run.assert_called_with(mock_export_zone())
+        self.service.executor.run.assert_called_with(
+            mock_export_zone(), lane=processing.EXPORT
+        )
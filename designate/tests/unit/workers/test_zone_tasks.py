@@ -13,7 +13,10 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.mport threading
+import time
+
 import dns.exception
+import fixtures
 import mock
 import oslotest.base
 from oslo_config import cfg
@@ -21,8 +24,11 @@ from oslo_config import fixture as cfg_fixture
 
 from designate import exceptions
 from designate import objects
+from designate import utils as dutils
 from designate.tests.unit import utils
+from designate.worker import breaker
 from designate.worker import processing
+from designate.worker import propagation
 from designate.worker import utils as wutils
 from designate.worker.tasks import zone
 
@@ -103,7 +109,6 @@ class TestZoneAction(oslotest.base.BaseTestCase):
         self.task = zone.ZoneAction(
             self.executor, self.context, self.pool, mock.Mock(), 'CREATE'
         )
-        self.task._wait_for_nameservers = mock.Mock()
 
     def test_constructor(self):
         self.assertTrue(self.task)
@@ -114,7 +119,6 @@ class TestZoneAction(oslotest.base.BaseTestCase):
         result = self.task()
         self.assertTrue(result)
 
-        self.assertTrue(self.task._wait_for_nameservers.called)
         self.assertTrue(self.task._zone_action_on_targets.called)
         self.assertTrue(self.task._poll_for_zone.called)
 
@@ -125,7 +129,6 @@ class TestZoneAction(oslotest.base.BaseTestCase):
         )
         task._zone_action_on_targets = mock.Mock(return_value=True)
         task._poll_for_zone = mock.Mock(return_value=True)
-        task._wait_for_nameservers = mock.Mock()
 
         self.assertTrue(task())
 
@@ -139,14 +142,14 @@ class TestZoneAction(oslotest.base.BaseTestCase):
         self.task._zone_action_on_targets = mock.Mock(return_value=False)
         self.assertFalse(self.task())
 
-    @mock.patch.object(zone, 'time')
-    def test_wait_for_nameservers(self, mock_time):
-        # It is just a time.sleep :(
-        task = zone.ZoneAction(
-            self.executor, self.context, self.pool, mock.Mock(), 'CREATE'
+    @mock.patch.object(zone, 'ZonePoller')
+    def test_poll_for_zone_waits_for_nameservers(self, mock_zone_poller):
+        self.task._poll_for_zone()
+
+        mock_zone_poller.assert_called_once_with(
+            self.executor, self.context, self.pool, self.task.zone,
+            first_poll_delay=self.task.delay
         )
-        task._wait_for_nameservers()
-        mock_time.sleep.assert_called_with(task.delay)
 
 
 class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
@@ -165,6 +168,8 @@ class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
 
         self.context = mock.Mock()
         self.executor = mock.Mock()
+        self.useFixture(cfg_fixture.Config(CONF))
+        self.useFixture(fixtures.MockPatchObject(breaker, '_breakers', {}))
 
     @mock.patch.object(wutils, 'notify')
     def test_call_create(self, mock_notify):
@@ -217,7 +222,6 @@ class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
         mock_notify.assert_not_called()
 
     @mock.patch.object(wutils, 'notify')
-    @mock.patch('time.sleep', mock.Mock())
     def test_call_exception_raised(self, mock_notify):
         self.backend.create_zone.side_effect = exceptions.BadRequest()
         self.zone = objects.Zone(name='example.org.', action='CREATE')
@@ -232,6 +236,23 @@ class TestZoneActionOnTarget(oslotest.base.BaseTestCase):
 
         mock_notify.assert_not_called()
 
+    def test_call_circuit_open(self):
+        CONF.set_override('circuit_breaker_failures', 2, 'service:worker')
+        self.backend.delete_zone.side_effect = exceptions.Backend()
+        self.zone = objects.Zone(name='example.org.', action='DELETE')
+        self.actor = zone.ZoneActionOnTarget(
+            self.executor,
+            self.context,
+            self.zone,
+            self.target,
+        )
+
+        for i in range(3):
+            self.assertFalse(self.actor())
+
+        # The third attempt was short-circuited
+        self.assertEqual(2, self.backend.delete_zone.call_count)
+
 
 class TestSendNotify(oslotest.base.BaseTestCase):
     def setUp(self):
@@ -334,6 +355,25 @@ class TestZoneActor(oslotest.base.BaseTestCase):
 
         self.assertEqual(['foo'], results)
 
+    def test_execute_retries_failed_targets(self):
+        self.pool.targets = ['target 1', 'target 2']
+        self.actor._max_retries = 3
+        self.actor._retry_interval = 2
+        self.actor.executor.run.side_effect = [[False, True], [True]]
+
+        results = self.actor._execute()
+
+        self.assertEqual([True, True], results)
+        self.assertEqual(2, self.actor.executor.run.call_count)
+        self.assertEqual(
+            [0, 2],
+            [call[1]['delay']
+             for call in self.actor.executor.run.call_args_list]
+        )
+        retried = self.actor.executor.run.call_args[0][0]
+        self.assertEqual(['target 1'], [task.target for task in retried])
+        self.assertEqual(2, retried[0].attempt)
+
     def test_call(self):
         self.actor.pool.targets = ['target 1']
         self.actor.executor.run.return_value = [True]
@@ -530,10 +570,14 @@ class TestZonePoller(oslotest.base.BaseTestCase):
 class TestZonePollerPolling(oslotest.base.BaseTestCase):
     def setUp(self):
         super(TestZonePollerPolling, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
         self.executor = processing.Executor()
         self.context = mock.Mock()
         self.zone = mock.Mock(name='example.com.', action='UPDATE', serial=10)
-        self.pool = mock.Mock(nameservers=['ns1', 'ns2'])
+        self.pool = mock.Mock(nameservers=[
+            mock.Mock(host='192.0.2.1', port=53),
+            mock.Mock(host='192.0.2.2', port=53),
+        ])
         self.threshold = 80
 
         self.poller = zone.ZonePoller(
@@ -544,9 +588,12 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
         )
 
         self.max_retries = 4
-        self.retry_interval = 2
+        self.retry_interval = 0.01
         self.poller._max_retries = self.max_retries
         self.poller._retry_interval = self.retry_interval
+        self.poller._propagation = propagation.PropagationModel(
+            min_delay=0.01, max_delay=0.05, percentile=90
+        )
 
     @mock.patch.object(zone, 'PollForZone')
     def test_do_poll(self, mock_poll_for_zone):
@@ -558,34 +605,174 @@ class TestZonePollerPolling(oslotest.base.BaseTestCase):
         self.assertEqual(2, result.positives)
         self.assertEqual(0, result.no_zones)
         self.assertEqual([10, 10], result.results)
+        self.assertEqual(
+            ['192.0.2.1:53', '192.0.2.2:53'],
+            sorted(self.poller.propagation.nameservers)
+        )
 
-    @mock.patch.object(zone, 'time', mock.Mock())
-    def test_do_poll_with_retry(self):
-        exe = mock.Mock()
-        exe.run.side_effect = [
-            [0, 0], [10, 10]
-        ]
-        self.poller.executor = exe
+    @mock.patch.object(zone, 'PollForZone')
+    def test_do_poll_with_retry(self, mock_poll_for_zone):
+        serials = {
+            '192.0.2.1': [0, 10],
+            '192.0.2.2': [10],
+        }
+        mock_poll_for_zone.side_effect = lambda executor, zone, ns: (
+            mock.Mock(return_value=serials[ns.host].pop(0))
+        )
 
         result = self.poller._do_poll()
 
         self.assertTrue(result)
+        self.assertEqual(2, result.positives)
 
-        zone.time.sleep.assert_called_with(self.retry_interval)
+        # Only the nameserver that missed the change was polled again
+        self.assertEqual(3, mock_poll_for_zone.call_count)
 
-        # retried once
-        self.assertEqual(1, len(zone.time.sleep.mock_calls))
+    @mock.patch.object(zone, 'PollForZone')
+    def test_do_poll_with_retry_until_fail(self, mock_poll_for_zone):
+        mock_poll_for_zone.return_value = mock.Mock(return_value=0)
 
-    @mock.patch.object(zone, 'time', mock.Mock())
-    def test_do_poll_with_retry_until_fail(self):
-        exe = mock.Mock()
-        exe.run.return_value = [0, 0]
+        result = self.poller._do_poll()
 
+        self.assertEqual(0, result.positives)
+        self.assertEqual(
+            self.max_retries * 2, mock_poll_for_zone.call_count
+        )
+
+    def test_do_poll_schedule(self):
+        exe = mock.Mock()
+        future = mock.Mock()
+        future.add_done_callback.side_effect = lambda callback: callback(
+            mock.Mock(result=mock.Mock(return_value=0))
+        )
+        exe.start.return_value = [future]
         self.poller.executor = exe
+        self.poller.first_poll_delay = 5
 
         self.poller._do_poll()
 
-        self.assertEqual(self.max_retries, len(zone.time.sleep.mock_calls))
+        # Without observations, the configured delays are used
+        self.assertEqual(
+            [5, 5] + [self.retry_interval] * (self.max_retries - 1) * 2,
+            sorted([call[1]['delay'] for call in exe.start.call_args_list],
+                   reverse=True)
+        )
+
+    @mock.patch.object(zone, 'PollForZone')
+    def test_do_poll_adaptive_first_poll(self, mock_poll_for_zone):
+        mock_poll_for_zone.return_value = mock.Mock(return_value=10)
+        self.poller.first_poll_delay = 5
+        self.poller.propagation.observe(self.pool.nameservers[0], 0.02)
+        self.poller.propagation.observe(self.pool.nameservers[1], 0.02)
+
+        self.poller.executor = mock.Mock(wraps=self.executor)
+        self.poller._do_poll()
+
+        self.assertEqual(
+            [0.02, 0.02],
+            [call[1]['delay']
+             for call in self.poller.executor.start.call_args_list]
+        )
+
+    @mock.patch.object(zone, 'PollForZone')
+    def test_do_poll_not_adaptive(self, mock_poll_for_zone):
+        CONF.set_override('poll_adaptive', False, 'service:worker')
+        mock_poll_for_zone.return_value = mock.Mock(return_value=10)
+        self.poller.first_poll_delay = 0.01
+        self.poller.propagation.observe(self.pool.nameservers[0], 0.05)
+
+        self.poller.executor = mock.Mock(wraps=self.executor)
+        self.poller._do_poll()
+
+        self.assertEqual(
+            [0.01, 0.01],
+            [call[1]['delay']
+             for call in self.poller.executor.start.call_args_list]
+        )
+
+
+class TestRecoverShard(oslotest.base.BaseTestCase):
+    def setUp(self):
+        super(TestRecoverShard, self).setUp()
+        self.useFixture(cfg_fixture.Config(CONF))
+        self.context = mock.Mock()
+        self.worker_api = mock.Mock()
+        self.task = zone.RecoverShard(
+            processing.Executor(), self.context, 0, 10,
+            worker_api=self.worker_api
+        )
+
+    def test_call(self):
+        zones = [
+            mock.Mock(action='CREATE'),
+            mock.Mock(action='UPDATE'),
+            mock.Mock(action='DELETE'),
+        ]
+        self.task.zones = zones
+        lanes = []
+        self.worker_api.update_zone.side_effect = (
+            lambda context, zone: lanes.append(processing.current_lane())
+        )
+
+        self.task()
+
+        self.worker_api.create_zone.assert_called_once_with(
+            self.context, zones[0])
+        self.worker_api.update_zone.assert_called_once_with(
+            self.context, zones[1])
+        self.worker_api.delete_zone.assert_called_once_with(
+            self.context, zones[2])
+        self.assertEqual([processing.RECOVERY], lanes)
+
+    def test_call_finds_zones(self):
+        self.task._storage = mock.Mock()
+        self.task._storage.find_recovery_zones.return_value = [
+            mock.Mock(id='1', action='UPDATE')
+        ]
+
+        self.assertIsNone(self.task())
+
+        self.worker_api.update_zone.assert_called_once_with(
+            self.context, mock.ANY)
+
+    def test_find_zones_pages(self):
+        CONF.set_override('per_page', 2,
+                          'producer_task:worker_periodic_recovery')
+        self.task.marker = '0'
+        self.task._storage = mock.Mock()
+        self.task._storage.find_recovery_zones.side_effect = [
+            [mock.Mock(id='1'), mock.Mock(id='2')],
+            [mock.Mock(id='3')],
+        ]
+
+        self.assertIsNone(self.task.find_zones())
+
+        self.assertEqual(['1', '2', '3'], [z.id for z in self.task.zones])
+        calls = self.task._storage.find_recovery_zones.call_args_list
+        self.assertEqual(
+            [('0', 2), ('2', 2)],
+            [(c[1]['marker'], c[1]['limit']) for c in calls]
+        )
+
+    def test_find_zones_budget(self):
+        CONF.set_override('per_page', 2,
+                          'producer_task:worker_periodic_recovery')
+        CONF.set_override('batch_size', 3,
+                          'producer_task:worker_periodic_recovery')
+        self.task._storage = mock.Mock()
+        self.task._storage.find_recovery_zones.side_effect = [
+            [mock.Mock(id='1'), mock.Mock(id='2')],
+            [mock.Mock(id='3')],
+        ]
+
+        self.assertEqual('3', self.task.find_zones())
+
+        self.assertEqual(3, len(self.task.zones))
+        calls = self.task._storage.find_recovery_zones.call_args_list
+        self.assertEqual(
+            [(None, 2), ('2', 1)],
+            [(c[1]['marker'], c[1]['limit']) for c in calls]
+        )
 
 
 class TestUpdateStatus(oslotest.base.BaseTestCase):
@@ -666,6 +853,7 @@ class TestPollForZone(oslotest.base.BaseTestCase):
         self.task = zone.PollForZone(self.executor, self.zone, self.ns)
         self.task._max_retries = 3
         self.task._retry_interval = 2
+        self.useFixture(fixtures.MockPatchObject(breaker, '_breakers', {}))
 
     @mock.patch.object(zone.wutils, 'get_serial', mock.Mock(return_value=10))
     def test_get_serial(self):
@@ -698,6 +886,17 @@ class TestPollForZone(oslotest.base.BaseTestCase):
 
         self.assertIsNone(result)
 
+    def test_call_circuit_open(self):
+        self.task._get_serial = mock.Mock(return_value=10)
+        ns_breaker = breaker.get_breaker('ns.example.org:53')
+        ns_breaker.state = breaker.OPEN
+        ns_breaker.opened_at = time.time()
+
+        result = self.task()
+
+        self.assertIsNone(result)
+        self.task._get_serial.assert_not_called()
+
 
 class TestExportZone(oslotest.base.BaseTestCase):
     def setUp(self):
@@ -714,6 +913,7 @@ class TestExportZone(oslotest.base.BaseTestCase):
         self.task._central_api = mock.Mock()
         self.task._storage = mock.Mock()
         self.task._quota = mock.Mock()
+        self.task._export_store = mock.Mock()
 
         self.task._quota.limit_check = mock.Mock()
         self.task._storage.count_recordsets = mock.Mock(return_value=1)
@@ -727,6 +927,37 @@ class TestExportZone(oslotest.base.BaseTestCase):
             self.export.location
         )
 
+    def test_sync_export_stores_zonefile(self):
+        self.zone.name = 'example.com.'
+        self.zone.ttl = 3600
+        recordsets = [('example.com.', None, 'A', '192.0.2.1')]
+        self.task._storage.find_recordsets_export.return_value = iter(
+            recordsets)
+        chunks = []
+        self.task._export_store.write.side_effect = (
+            lambda export_id, zonefile: chunks.extend(zonefile)
+        )
+
+        self.task()
+
+        self.task._storage.find_recordsets_export.assert_called_once_with(
+            self.context, {'zone_id': self.zone.id}, stream=True)
+        self.task._export_store.write.assert_called_once_with(
+            self.export.id, mock.ANY)
+        self.assertEqual(
+            dutils.render_template('export-zone.jinja2', zone=self.zone,
+                                   recordsets=recordsets),
+            ''.join(chunks)
+        )
+
+    def test_sync_export_store_fails(self):
+        self.task._export_store.write.side_effect = IOError()
+
+        self.task()
+
+        self.assertEqual('ERROR', self.export.status)
+        self.assertEqual('Failed to store the export', self.export.message)
+
     def test_sync_export_wrong_size_fails(self):
         self.task._quota.limit_check = mock.Mock(
             side_effect=exceptions.OverQuota)
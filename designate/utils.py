@@ -23,6 +23,7 @@ import six
 import pkg_resources
 from jinja2 import Template
 from oslo_config import cfg
+from oslo_concurrency import lockutils
 from oslo_concurrency import processutils
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
@@ -46,6 +47,9 @@ DEFAULT_MDNS_PORT = 5354
 
 DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 
+# The worker slots claimed by this process, with the locks holding them
+_WORKER_SLOTS = {}
+
 
 def find_config(config_path):
     """
@@ -116,6 +120,14 @@ def render_template(template, **template_context):
     return template.render(**template_context)
 
 
+def render_template_stream(template, **template_context):
+    """Render a template piece by piece, as an iterator over the text"""
+    if not isinstance(template, Template):
+        template = load_template(template)
+
+    return template.generate(**template_context)
+
+
 def render_template_to_file(template_name, output_path, makedirs=True,
                             **template_context):
     output_folder = os.path.dirname(output_path)
@@ -396,3 +408,27 @@ def bind_udp(host, port):
 
 def max_prop_time(timeout, max_retries, retry_interval, delay):
     return timeout * max_retries + max_retries * retry_interval + delay
+
+
+def get_worker_slot(name):
+    """
+    Claim the lowest numbered slot of name which no other process of this
+    host holds, for as long as this process runs.
+
+    The workers of a service get the slots 0, 1, ... and a worker which is
+    restarted takes over the slot of the one it replaces, so that the slot
+    can name resources which outlive the processes, like queues.
+
+    :param name: The name of the slots, the lock files of the slots are
+                 named after it in the oslo_concurrency lock_path
+    :returns: The number of the slot
+    """
+    if name not in _WORKER_SLOTS:
+        slot = 0
+        while True:
+            lock = lockutils.external_lock('%s-%d' % (name, slot))
+            if lock.acquire(blocking=False):
+                _WORKER_SLOTS[name] = (slot, lock)
+                break
+            slot += 1
+    return _WORKER_SLOTS[name][0]
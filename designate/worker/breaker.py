@@ -0,0 +1,138 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import contextlib
+import time
+
+import eventlet.semaphore
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from designate.metrics import metrics
+
+LOG = logging.getLogger(__name__)
+CONF = cfg.CONF
+
+CLOSED = 'CLOSED'
+OPEN = 'OPEN'
+HALF_OPEN = 'HALF_OPEN'
+
+_breakers = {}
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a target whose circuit is open"""
+
+
+def get_breaker(name):
+    """Return the CircuitBreaker of the name target, shared by the whole
+    process
+    """
+    if name not in _breakers:
+        config = CONF['service:worker']
+        _breakers[name] = CircuitBreaker(
+            name,
+            max_failures=config.circuit_breaker_failures,
+            reset_time=config.circuit_breaker_reset_time,
+            max_concurrency=config.target_max_concurrency,
+        )
+    return _breakers[name]
+
+
+class CircuitBreaker(object):
+    """Track the health of a target, a backend or a nameserver, and stop
+    calling it while it is failing.
+
+    The circuit opens after max_failures consecutive failures, and every
+    call is short-circuited with CircuitOpen until reset_time seconds have
+    passed. The next call then probes the target, alone, closing the
+    circuit again if it succeeds or opening it for another reset_time if it
+    fails. At most max_concurrency calls are made to the target at once.
+    """
+
+    def __init__(self, name, max_failures, reset_time, max_concurrency=0):
+        self.name = name
+        self.max_failures = max_failures
+        self.reset_time = reset_time
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.dimensions = {'target': name}
+        self._semaphore = None
+        if max_concurrency:
+            self._semaphore = eventlet.semaphore.Semaphore(max_concurrency)
+
+    def _allow(self):
+        if self.state == CLOSED:
+            return True
+        if (self.state == OPEN and
+                time.time() - self.opened_at >= self.reset_time):
+            LOG.info('Probing %s after its circuit was open for %d seconds',
+                     self.name, self.reset_time)
+            self.state = HALF_OPEN
+            return True
+        return False
+
+    def _success(self):
+        if self.state != CLOSED:
+            LOG.info('Closing the circuit of %s', self.name)
+        self.state = CLOSED
+        self.failures = 0
+
+    def _failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.max_failures and
+                self.failures >= self.max_failures):
+            LOG.warning('Opening the circuit of %(name)s after %(failures)d '
+                        'consecutive failures',
+                        {'name': self.name, 'failures': self.failures})
+            metrics.counter('worker.circuit_breaker.opened').increment(
+                dimensions=self.dimensions)
+            self.state = OPEN
+            self.opened_at = time.time()
+
+    def _abandon(self):
+        # The call was killed, by a timeout or a greenthread being stopped,
+        # which tells nothing of the target. Let the next call probe it
+        # rather than leaving the circuit half open with no probe running.
+        if self.state == HALF_OPEN:
+            self.state = OPEN
+
+    @contextlib.contextmanager
+    def call(self):
+        """Guard a call to the target, failing the call if the block raises
+
+        :raises: CircuitOpen if the target mustn't be called
+        """
+        if not self._allow():
+            metrics.counter('worker.circuit_breaker.short_circuited'
+                            ).increment(dimensions=self.dimensions)
+            raise CircuitOpen('The circuit of %s is open' % self.name)
+
+        limit = self._semaphore
+        if limit is None:
+            limit = _no_limit()
+        with limit:
+            try:
+                yield
+            except Exception:
+                self._failure()
+                raise
+            except BaseException:
+                self._abandon()
+                raise
+        self._success()
+
+
+@contextlib.contextmanager
+def _no_limit():
+    yield
@@ -0,0 +1,198 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import random
+import socket
+import struct
+import time
+
+import dns
+import dns.exception
+import dns.flags
+import dns.inet
+import dns.message
+import dns.query
+import eventlet
+import eventlet.queue
+from oslo_log import log as logging
+
+from designate.metrics import metrics
+
+LOG = logging.getLogger(__name__)
+
+_client = None
+
+
+def get_client():
+    """Return the DNSClient shared by the whole process"""
+    global _client
+    if _client is None:
+        _client = DNSClient()
+    return _client
+
+
+class DNSClient(object):
+    """A DNS client multiplexing every UDP query on one socket per address
+    family.
+
+    A reader greenthread per socket hands the responses over to the
+    queries waiting for them, matched on their message id and the address
+    of the server. Queries are retransmitted, with the interval doubling
+    every time, until they are answered or their timeout expires, and are
+    retried over TCP when the response is truncated.
+
+    Sharing a socket leaves only the message id for a spoofed response to
+    guess, so every queries_per_socket queries the client moves on to a new
+    socket, on a new random source port. The old one is closed once the
+    last query sent from it is done.
+    """
+
+    def __init__(self, retransmit_interval=1.0, queries_per_socket=1000):
+        self.retransmit_interval = retransmit_interval
+        self.queries_per_socket = queries_per_socket
+        self._socks = {}
+        self._queries = collections.Counter()
+        self._in_flight = collections.Counter()
+        self._pending = {}
+
+    def query(self, message, host, port=53, timeout=10):
+        """
+        Send the dns message and return the response
+
+        :raises: dns.exception.Timeout if no response came back in time
+        :return: dns.Message of the response to the dns query
+        """
+        deadline = time.time() + timeout
+
+        try:
+            af = dns.inet.af_for_address(host)
+            # The server may answer from another form of its address.
+            host = dns.inet.inet_ntop(af, dns.inet.inet_pton(af, host))
+        except ValueError:
+            # Like dnspython, take anything but an address for a hostname.
+            af = socket.AF_INET
+            host = socket.gethostbyname(host)
+
+        # Only one query per message id can be in flight to a server.
+        key = (message.id, host, port)
+        while key in self._pending:
+            message.id = random.randint(0, 65535)
+            key = (message.id, host, port)
+
+        sock = self._acquire_sock(af)
+        responses = eventlet.queue.LightQueue()
+        self._pending[key] = responses
+        try:
+            wire = message.to_wire()
+            interval = self.retransmit_interval
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise dns.exception.Timeout()
+
+                sock.sendto(wire, (host, port))
+                metrics.counter('worker.dnsclient.sent').increment()
+
+                response = self._wait_for_response(
+                    message, responses, min(interval, remaining))
+                if response is not None:
+                    break
+                interval *= 2
+        finally:
+            del self._pending[key]
+            self._release_sock(sock)
+
+        if response.flags & dns.flags.TC:
+            LOG.debug('Truncated response from %(host)s:%(port)d, retrying '
+                      'over TCP', {'host': host, 'port': port})
+            metrics.counter('worker.dnsclient.tcp_fallback').increment()
+            return dns.query.tcp(message, host, port=port,
+                                 timeout=max(deadline - time.time(), 0.1))
+
+        return response
+
+    @staticmethod
+    def _wait_for_response(message, responses, timeout):
+        deadline = time.time() + timeout
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            try:
+                wire = responses.get(timeout=remaining)
+            except eventlet.queue.Empty:
+                return None
+
+            try:
+                response = dns.message.from_wire(
+                    wire, keyring=message.keyring,
+                    request_mac=message.request_mac, one_rr_per_rrset=False)
+            except dns.exception.DNSException as e:
+                LOG.debug('Ignoring malformed response: %s', e)
+                continue
+
+            if message.is_response(response):
+                return response
+            LOG.debug('Ignoring response not matching the question')
+
+    def _acquire_sock(self, af):
+        old_sock = sock = self._socks.get(af)
+        if sock is None or self._queries[sock] >= self.queries_per_socket:
+            # Bind the new socket first, so its port differs from the old
+            sock = socket.socket(af, socket.SOCK_DGRAM)
+            sock.bind(('::' if af == socket.AF_INET6 else '0.0.0.0', 0))
+            self._socks[af] = sock
+            eventlet.spawn_n(self._read_responses, sock)
+
+            if old_sock is not None and not self._in_flight[old_sock]:
+                self._close_sock(old_sock)
+
+        self._queries[sock] += 1
+        self._in_flight[sock] += 1
+        return sock
+
+    def _release_sock(self, sock):
+        self._in_flight[sock] -= 1
+        if not self._in_flight[sock] and sock not in self._socks.values():
+            self._close_sock(sock)
+
+    def _close_sock(self, sock):
+        del self._queries[sock]
+        del self._in_flight[sock]
+        sock.close()
+
+    def _read_responses(self, sock):
+        while True:
+            try:
+                wire, addr = sock.recvfrom(65535)
+            except (EOFError, OSError) as e:
+                if sock.fileno() == -1:
+                    # The socket was rotated out and closed, eventlet
+                    # raises EOFError in the readers of a closed socket.
+                    return
+                LOG.warning('Error reading DNS responses: %s', e)
+                eventlet.sleep(0.1)
+                continue
+
+            if len(wire) < 2:
+                continue
+
+            # Link-local IPv6 addresses come with their scope (%eth0),
+            # which the address the query was sent to doesn't have.
+            host = addr[0].split('%', 1)[0]
+
+            (message_id,) = struct.unpack('!H', wire[:2])
+            responses = self._pending.get((message_id, host, addr[1]))
+            if responses is None:
+                # A late retransmission, or a response to nothing we asked.
+                continue
+            responses.put(wire)
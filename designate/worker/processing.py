@@ -13,24 +13,54 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import contextlib
+import heapq
+import itertools
 import time
 
+import eventlet
+import eventlet.corolocal
 import futurist
 from oslo_log import log as logging
 from oslo_config import cfg
 
 from designate import exceptions
+from designate.metrics import metrics
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
 
-def default_executor():
-    thread_count = 5
+# The lanes tasks run in, each with its own threads and queue. Tasks run in
+# the lane of the task which started them unless told otherwise, except
+# that the work started from a background lane always stays in it.
+INTERACTIVE = 'interactive'
+POLL = 'poll'
+RECOVERY = 'recovery'
+EXPORT = 'export'
+BACKGROUND_LANES = (RECOVERY, EXPORT)
+
+_local = eventlet.corolocal.local()
+
+
+def _lane_config(lane):
+    threads, queue_size = 5, 0
     try:
-        thread_count = CONF['service:worker'].threads
-    except Exception:
-        pass
+        config = CONF['service:worker']
+        if lane == INTERACTIVE:
+            threads, queue_size = config.threads, config.queue_size
+        else:
+            threads = config['%s_threads' % lane]
+            queue_size = config['%s_queue_size' % lane]
+    except Exception as e:
+        LOG.error('Invalid configuration of the %(lane)s lane, running it '
+                  'with %(threads)d threads: %(error)s',
+                  {'lane': lane, 'threads': threads, 'error': e})
+    return threads, queue_size
+
+
+def default_executor(lane=INTERACTIVE):
+    thread_count, _ = _lane_config(lane)
 
     # TODO(mugsie): if (when) we move away from eventlet this may have to
     # revert back to ThreadPoolExecutor - this is changing due to
@@ -38,15 +68,134 @@ def default_executor():
     return futurist.GreenThreadPoolExecutor(thread_count)
 
 
+def current_lane():
+    """The lane of the task running in this thread"""
+    return getattr(_local, 'lane', None) or INTERACTIVE
+
+
+@contextlib.contextmanager
+def lane(name):
+    """Run the tasks started within the block in the name lane"""
+    previous = getattr(_local, 'lane', None)
+    _local.lane = name
+    try:
+        yield
+    finally:
+        _local.lane = previous
+
+
+class Lane(object):
+    """
+    A pool of threads for one class of tasks, which rejects the tasks
+    submitted once max_queue_size of them are waiting for a thread
+    """
+
+    def __init__(self, name, executor, max_queue_size=0):
+        self.name = name
+        self.executor = executor
+        self.max_queue_size = max_queue_size
+        self.queued = 0
+        self.dimensions = {'lane': name}
+
+    def submit(self, fn, task):
+        if self.max_queue_size and self.queued >= self.max_queue_size:
+            metrics.counter('worker.executor.rejected').increment(
+                dimensions=self.dimensions)
+            raise futurist.RejectedSubmission(
+                'Lane %s has %d tasks queued' % (self.name, self.queued))
+
+        self.queued += 1
+        self._send_queue_depth()
+        return self.executor.submit(self._run, time.time(), fn, task)
+
+    def _run(self, submitted, fn, task):
+        self.queued -= 1
+        self._send_queue_depth()
+        metrics.timing('worker.executor.wait_time', time.time() - submitted,
+                       dimensions=self.dimensions)
+
+        _local.lane = self.name
+        try:
+            return fn(task)
+        finally:
+            _local.lane = None
+
+    def _send_queue_depth(self):
+        metrics.gauge().send('worker.executor.queue_depth', self.queued,
+                             dimensions=self.dimensions)
+
+
+class Scheduler(object):
+    """
+    Park calls until they are due, in a heap served by a single timer, so
+    that waiting doesn't take up a thread
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._timer = None
+        self._timer_due = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, delay, func):
+        """Call func, from the timer's greenthread, in delay seconds"""
+        due = time.time() + delay
+        heapq.heappush(self._heap, (due, next(self._counter), func))
+        if self._timer is None or due < self._timer_due:
+            self._arm()
+
+    def _arm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._heap:
+            self._timer_due = self._heap[0][0]
+            self._timer = eventlet.spawn_after(
+                max(self._timer_due - time.time(), 0), self._run_due)
+
+    def _run_due(self):
+        self._timer = None
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, func = heapq.heappop(self._heap)
+            try:
+                func()
+            except Exception:
+                LOG.exception('Unhandled exception in a scheduled call')
+        self._arm()
+
+
 class Executor(object):
     """
     Object to facilitate the running of a task, or a set of tasks on an
     executor that can map multiple tasks across a configurable number of
-    threads
+    threads, in separate lanes for interactive, polling, recovery and export
+    tasks
     """
 
     def __init__(self, executor=None):
         self._executor = executor or default_executor()
+        self._lanes = {}
+        self._scheduler = Scheduler()
+
+    def get_lane(self, name):
+        if name not in self._lanes:
+            _, queue_size = _lane_config(name)
+            executor = self._executor
+            if name != INTERACTIVE:
+                executor = default_executor(name)
+            self._lanes[name] = Lane(name, executor, queue_size)
+        return self._lanes[name]
+
+    @staticmethod
+    def _lane_for(name):
+        lane = current_lane()
+        if lane in BACKGROUND_LANES:
+            return lane
+        return name or lane
 
     @staticmethod
     def do(task):
@@ -54,6 +203,11 @@ class Executor(object):
             return task()
         except exceptions.BadAction as e:
             LOG.warning(e)
+        except futurist.RejectedSubmission as e:
+            # The task couldn't run all of its work, it is left to be
+            # recovered rather than failed.
+            LOG.warning('Gave up on task %(task)s: %(error)s',
+                        {'task': Executor.task_name(task), 'error': e})
 
     @staticmethod
     def task_name(task):
@@ -63,11 +217,78 @@ class Executor(object):
             return str(task.func_name)
         return 'UnnamedTask'
 
-    def run(self, tasks):
+    def start(self, tasks, delay=0, lane=None):
+        """
+        Start task or set of tasks, without waiting for them to finish
+        :param tasks: the task or tasks you want to execute in the
+                      executor's pool
+        :param delay: the seconds to wait before submitting the tasks to the
+                      pool, they don't take up one of its threads meanwhile
+        :param lane: the lane to run the tasks in, defaults to the lane of
+                     the running task
+
+        :return: The futures of the tasks (list)
+        """
+        if callable(tasks):
+            tasks = [tasks]
+        lane = self.get_lane(self._lane_for(lane))
+
+        if not delay:
+            return [self._submit(lane, task) for task in tasks]
+
+        futures = [futurist.Future() for task in tasks]
+        self._scheduler.schedule(
+            delay, lambda: self._submit_parked(lane, tasks, futures))
+        return futures
+
+    def _submit(self, lane, task):
+        try:
+            return lane.submit(self.do, task)
+        except futurist.RejectedSubmission as e:
+            # Raise the rejection from the future, rather than have the
+            # task that waits for it count it as a failure.
+            LOG.warning('Rejected task %(task)s: %(error)s',
+                        {'task': self.task_name(task), 'error': e})
+            future = futurist.Future()
+            future.set_exception(e)
+            return future
+
+    def _submit_parked(self, lane, tasks, futures):
+        for task, future in zip(tasks, futures):
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                submitted = self._submit(lane, task)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            submitted.add_done_callback(
+                lambda submitted, future=future: self._copy_future(
+                    submitted, future))
+
+    @staticmethod
+    def _copy_future(source, destination):
+        exception = source.exception()
+        if exception is not None:
+            destination.set_exception(exception)
+        else:
+            destination.set_result(source.result())
+
+    @staticmethod
+    def wait(futures):
+        """
+        Wait for the futures returned by start
+        :return: The results of the tasks (list)
+        """
+        return [future.result() for future in futures]
+
+    def run(self, tasks, delay=0, lane=None):
         """
         Run task or set of tasks
         :param tasks: the task or tasks you want to execute in the
                       executor's pool
+        :param delay: the seconds to wait before running the tasks, see start
+        :param lane: the lane to run the tasks in, see start
 
         :return: The results of the tasks (list)
 
@@ -77,7 +298,7 @@ class Executor(object):
 
         if callable(tasks):
             tasks = [tasks]
-        results = [r for r in self._executor.map(self.do, tasks)]
+        results = self.wait(self.start(tasks, delay=delay, lane=lane))
 
         end_time = time.time()
         task_time = end_time - start_time
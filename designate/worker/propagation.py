@@ -0,0 +1,122 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+import collections
+import math
+
+from oslo_config import cfg
+
+from designate.metrics import metrics
+
+CONF = cfg.CONF
+
+# The weight of a new observation in the moving average, and the number of
+# observations the percentile is computed from.
+EWMA_WEIGHT = 0.2
+WINDOW_SIZE = 100
+
+_model = None
+
+
+def get_model():
+    """Return the PropagationModel shared by the whole process"""
+    global _model
+    if _model is None:
+        config = CONF['service:worker']
+        _model = PropagationModel(
+            min_delay=config.poll_min_delay,
+            max_delay=(config.poll_max_delay or
+                       config.poll_retry_interval),
+            percentile=config.poll_latency_percentile,
+        )
+    return _model
+
+
+class NameserverPropagation(object):
+    """The propagation times observed on a nameserver"""
+
+    def __init__(self):
+        self.ewma = None
+        self.samples = collections.deque(maxlen=WINDOW_SIZE)
+
+    def observe(self, seconds):
+        if self.ewma is None:
+            self.ewma = seconds
+        else:
+            self.ewma += EWMA_WEIGHT * (seconds - self.ewma)
+        self.samples.append(seconds)
+
+    def percentile(self, percent):
+        samples = sorted(self.samples)
+        index = int(math.ceil(percent / 100.0 * len(samples))) - 1
+        return samples[max(index, 0)]
+
+
+class PropagationModel(object):
+    """A rolling model of the time zone changes take to show up on each
+    nameserver, used to schedule the polls for the next changes.
+
+    A change is expected around the moving average of its nameserver's
+    propagation times, and almost certainly by their percentile. The first
+    poll is sent at the average, and a poll which misses is retried at the
+    percentile, then backs off exponentially. Every delay is kept within
+    min_delay and max_delay. Until a nameserver has been observed, the
+    delays given by the caller are used as they are.
+    """
+
+    def __init__(self, min_delay, max_delay, percentile):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.percentile = percentile
+        self.nameservers = collections.defaultdict(NameserverPropagation)
+
+    @staticmethod
+    def _key(ns):
+        return '%s:%d' % (ns.host, ns.port)
+
+    def _clamp(self, delay):
+        return min(max(delay, self.min_delay), self.max_delay)
+
+    def observe(self, ns, seconds):
+        """Record that a change took seconds to show up on ns"""
+        key = self._key(ns)
+        propagation = self.nameservers[key]
+        propagation.observe(seconds)
+
+        dimensions = {'nameserver': key}
+        metrics.timing('worker.propagation_time', seconds,
+                       dimensions=dimensions)
+        gauge = metrics.gauge()
+        gauge.send('worker.propagation_time.ewma', propagation.ewma,
+                   dimensions=dimensions)
+        gauge.send('worker.propagation_time.percentile',
+                   propagation.percentile(self.percentile),
+                   dimensions=dimensions)
+
+    def first_poll_delay(self, ns, default):
+        """The seconds to wait before polling ns for a change"""
+        propagation = self.nameservers.get(self._key(ns))
+        if propagation is None:
+            return default
+        return self._clamp(propagation.ewma)
+
+    def retry_delay(self, ns, attempt, elapsed, default):
+        """The seconds to wait before polling ns again, after attempt polls
+        and elapsed seconds haven't found the change
+        """
+        propagation = self.nameservers.get(self._key(ns))
+        if propagation is None:
+            return default
+
+        remaining = propagation.percentile(self.percentile) - elapsed
+        if remaining >= self.min_delay:
+            return self._clamp(remaining)
+        return self._clamp(propagation.ewma * 2 ** attempt)
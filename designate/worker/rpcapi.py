@@ -33,15 +33,20 @@ class WorkerAPI(object):
     API version history:
 
         1.0 - Initial version
+        1.1 - Resume recover_shard after a marker and return the next one
     """
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
 
     def __init__(self, topic=None):
         self.topic = topic if topic else cfg.CONF['service:worker'].topic
 
-        target = messaging.Target(topic=self.topic,
-                                  version=self.RPC_API_VERSION)
-        self.client = rpc.get_client(target, version_cap='1.0')
+        # Only the calls which need a newer version ask for it, so that they
+        # can be held back while older workers are still running.
+        target = messaging.Target(topic=self.topic, version='1.0')
+        self.client = rpc.get_client(
+            target,
+            version_cap=(cfg.CONF['service:worker'].rpc_version_cap or
+                         self.RPC_API_VERSION))
 
     @classmethod
     def get_instance(cls):
@@ -69,9 +74,17 @@ class WorkerAPI(object):
         return self.client.cast(
             context, 'delete_zone', zone=zone)
 
-    def recover_shard(self, context, begin, end):
-        return self.client.cast(
-            context, 'recover_shard', begin=begin, end=end)
+    def recover_shard(self, context, begin, end, marker=None):
+        if not self.client.can_send_version('1.1'):
+            # Workers before 1.1 recover every zone of the shards on each
+            # run and don't return a marker.
+            self.client.cast(
+                context, 'recover_shard', begin=begin, end=end)
+            return None
+
+        cctxt = self.client.prepare(version='1.1')
+        return cctxt.call(
+            context, 'recover_shard', begin=begin, end=end, marker=marker)
 
     def start_zone_export(self, context, zone, export):
         return self.client.cast(
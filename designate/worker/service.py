@@ -26,6 +26,7 @@ from designate import service
 from designate import storage
 from designate.central import rpcapi as central_api
 from designate.context import DesignateContext
+from designate.metrics import metrics
 from designate.worker.tasks import zone as zonetasks
 from designate.worker import processing
 
@@ -42,7 +43,7 @@ class AlsoNotifyTask(object):
 
 
 class Service(service.RPCService):
-    RPC_API_VERSION = '1.0'
+    RPC_API_VERSION = '1.1'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -53,6 +54,13 @@ class Service(service.RPCService):
         self._executor = None
         self._pools_map = None
 
+        # The zone updates in progress, and the newest update requested for
+        # each of them since, if any.
+        self._zone_updates = {}
+
+        # The (begin, end) shard ranges being recovered.
+        self._shard_recoveries = set()
+
         super(Service, self).__init__(
             self.service_name, cfg.CONF['service:worker'].topic,
             threads=cfg.CONF['service:worker'].threads,
@@ -143,20 +151,29 @@ class Service(service.RPCService):
 
     def _do_zone_action(self, context, zone):
         pool = self.get_pool(zone.pool_id)
-        all_tasks = []
-        all_tasks.append(zonetasks.ZoneAction(
-            self.executor, context, pool, zone, zone.action
-        ))
 
         # Send a NOTIFY to each also-notifies
+        notify_tasks = []
         for also_notify in pool.also_notifies:
             notify_target = AlsoNotifyTask()
             notify_target.options = {'host': also_notify.host,
                                      'port': also_notify.port}
-            all_tasks.append(zonetasks.SendNotify(self.executor,
-                                                  zone,
-                                                  notify_target))
-        return self.executor.run(all_tasks)
+            notify_tasks.append(zonetasks.SendNotify(self.executor,
+                                                     zone,
+                                                     notify_target))
+        futures = self.executor.start(notify_tasks, lane=processing.POLL)
+
+        # The ZoneAction mostly waits for the tasks it runs in the executor,
+        # run it here rather than tying up one of the executor's threads.
+        result = self.executor.do(zonetasks.ZoneAction(
+            self.executor, context, pool, zone, zone.action
+        ))
+
+        # The NOTIFYs which were rejected, and logged then, have no result.
+        return [result] + [
+            None if future.exception() else future.result()
+            for future in futures
+        ]
 
     @rpc.expected_exceptions()
     def create_zone(self, context, zone):
@@ -174,7 +191,29 @@ class Service(service.RPCService):
         :param zone: Zone to be updated
         :return: None
         """
-        self._do_zone_action(context, zone)
+        if zone.id in self._zone_updates:
+            # An update of the zone is in progress, only push the newest of
+            # the updates requested meanwhile once it is done.
+            pending = self._zone_updates[zone.id]
+            if pending is not None:
+                metrics.counter('worker.update_zone.coalesced').increment()
+            if pending is None or zone.serial >= pending[1].serial:
+                self._zone_updates[zone.id] = (context, zone)
+            return
+
+        zone_id = zone.id
+        self._zone_updates[zone_id] = None
+        try:
+            while True:
+                self._do_zone_action(context, zone)
+
+                pending = self._zone_updates.get(zone_id)
+                if pending is None:
+                    break
+                self._zone_updates[zone_id] = None
+                context, zone = pending
+        finally:
+            self._zone_updates.pop(zone_id, None)
 
     @rpc.expected_exceptions()
     def delete_zone(self, context, zone):
@@ -183,18 +222,56 @@ class Service(service.RPCService):
         :param zone: Zone to be deleted
         :return: None
         """
+        if self._zone_updates.get(zone.id) is not None:
+            # Don't push the zone again once it is deleted.
+            self._zone_updates[zone.id] = None
+            metrics.counter('worker.update_zone.coalesced').increment()
         self._do_zone_action(context, zone)
 
     @rpc.expected_exceptions()
-    def recover_shard(self, context, begin, end):
+    def recover_shard(self, context, begin, end, marker=None):
         """
         :param begin: the beginning of the shards to recover
         :param end: the end of the shards to recover
-        :return: None
+        :param marker: the ID of the zone to resume the recovery after
+        :return: the ID of the zone to resume the next recovery after, None
+                 once the shards were gone through
         """
-        return self.executor.run(zonetasks.RecoverShard(
-            self.executor, context, begin, end
-        ))
+        for shards in self._shard_recoveries:
+            if shards[0] <= end and begin <= shards[1]:
+                # Resume from the same zone once the recovery is done.
+                LOG.info('Zones in shards %(begin)s to %(end)s are still '
+                         'being recovered, skipping', {
+                             'begin': shards[0],
+                             'end': shards[1]
+                         })
+                metrics.counter('worker.recovery.skipped').increment()
+                return marker
+
+        task = zonetasks.RecoverShard(
+            self.executor, context, begin, end, worker_api=self,
+            marker=marker
+        )
+        next_marker = task.find_zones()
+
+        # Only wait for the zones to be found, they are recovered in the
+        # background.
+        shards = (begin, end)
+        self._shard_recoveries.add(shards)
+        self.tg.add_thread(self._recover_shard, shards, task)
+        return next_marker
+
+    def _recover_shard(self, shards, task):
+        # The recovery waits for the zone actions it starts in the recovery
+        # lane, run it in a thread of its own so it can't hold up the lane's
+        # threads the zone actions need.
+        try:
+            self.executor.do(task)
+        except Exception:
+            LOG.exception('Failed to recover zones in shards %(begin)s to '
+                          '%(end)s', {'begin': shards[0], 'end': shards[1]})
+        finally:
+            self._shard_recoveries.discard(shards)
 
     @rpc.expected_exceptions()
     def start_zone_export(self, context, zone, export):
@@ -205,4 +282,4 @@ class Service(service.RPCService):
         """
         return self.executor.run(zonetasks.ExportZone(
             self.executor, context, zone, export
-        ))
+        ), lane=processing.EXPORT)
@@ -18,6 +18,7 @@ from oslo_config import cfg
 from oslo_log import log as logging
 
 from designate.central import rpcapi as central_rpcapi
+from designate import export_store
 from designate import quota
 from designate import storage
 from designate import utils
@@ -105,6 +106,7 @@ class Task(TaskConfig):
 
         self._storage = None
         self._quota = None
+        self._export_store = None
         self._central_api = None
         self._worker_api = None
 
@@ -127,6 +129,12 @@ class Task(TaskConfig):
             self._quota = quota.get_quota()
         return self._quota
 
+    @property
+    def export_store(self):
+        if not self._export_store:
+            self._export_store = export_store.get_export_store()
+        return self._export_store
+
     @property
     def central_api(self):
         if not self._central_api:
@@ -13,13 +13,19 @@
 # WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 # License for the specific language governing permissions and limitations
 # under the License.
+import collections
 import time
-from collections import namedtuple
 
 import dns
+import eventlet
+import eventlet.queue
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from designate.metrics import metrics
+from designate.worker import breaker
+from designate.worker import processing
+from designate.worker import propagation
 from designate.worker import utils as wutils
 from designate.worker.tasks import base
 from designate import exceptions
@@ -53,16 +59,18 @@ class ThresholdMixin(object):
 
 class ZoneActionOnTarget(base.Task):
     """
-    Perform a Create/Update/Delete of the zone on a pool target
+    Perform a Create/Update/Delete of the zone on a pool target, the
+    ZoneActor retries it on failure
 
     :return: Success/Failure of the target action (bool)
     """
-    def __init__(self, executor, context, zone, target):
+    def __init__(self, executor, context, zone, target, attempt=1):
         super(ZoneActionOnTarget, self).__init__(executor)
         self.zone = zone
         self.action = zone.action
         self.target = target
         self.context = context
+        self.attempt = attempt
         self.task_name = 'ZoneActionOnTarget-%s' % self.action.title()
 
     def __call__(self):
@@ -73,35 +81,37 @@ class ZoneActionOnTarget(base.Task):
                       'target': self.target
                   })
 
-        for retry in range(0, self.max_retries):
-            try:
-                if self.action == 'CREATE':
-                    self.target.backend.create_zone(self.context, self.zone)
-                    SendNotify(self.executor, self.zone, self.target)()
-                elif self.action == 'UPDATE':
-                    self.target.backend.update_zone(self.context, self.zone)
-                    SendNotify(self.executor, self.zone, self.target)()
-                elif self.action == 'DELETE':
-                    self.target.backend.delete_zone(self.context, self.zone)
-
-                LOG.debug("Successful %s zone %s on %s",
-                          self.action, self.zone.name, self.target)
-                return True
-            except Exception as e:
-                LOG.info('Failed to %(action)s zone %(zone)s on '
-                         'target %(target)s on attempt %(attempt)d, '
-                         'Error: %(error)s.',
-                         {
-                             'action': self.action,
-                             'zone': self.zone.name,
-                             'target': self.target.id,
-                             'attempt': retry + 1,
-                             'error': str(e)
-                         })
-                time.sleep(self.retry_interval)
+        try:
+            with breaker.get_breaker(self.target.id).call():
+                self._do_action()
+
+            LOG.debug("Successful %s zone %s on %s",
+                      self.action, self.zone.name, self.target)
+            return True
+        except Exception as e:
+            LOG.info('Failed to %(action)s zone %(zone)s on '
+                     'target %(target)s on attempt %(attempt)d, '
+                     'Error: %(error)s.',
+                     {
+                         'action': self.action,
+                         'zone': self.zone.name,
+                         'target': self.target.id,
+                         'attempt': self.attempt,
+                         'error': str(e)
+                     })
 
         return False
 
+    def _do_action(self):
+        if self.action == 'CREATE':
+            self.target.backend.create_zone(self.context, self.zone)
+            SendNotify(self.executor, self.zone, self.target)()
+        elif self.action == 'UPDATE':
+            self.target.backend.update_zone(self.context, self.zone)
+            SendNotify(self.executor, self.zone, self.target)()
+        elif self.action == 'DELETE':
+            self.target.backend.delete_zone(self.context, self.zone)
+
 
 class SendNotify(base.Task):
     """
@@ -165,10 +175,25 @@ class ZoneActor(base.Task, ThresholdMixin):
             raise exceptions.BadAction('Unexpected action: %s' % action)
 
     def _execute(self):
-        results = self.executor.run([
-            ZoneActionOnTarget(self.executor, self.context, self.zone, target)
-            for target in self.pool.targets
-        ])
+        targets = list(self.pool.targets)
+        results = [False] * len(targets)
+
+        # Retry the targets that failed, they wait for their next attempt
+        # in the executor's scheduler rather than in one of its threads.
+        pending = list(range(len(targets)))
+        for retry in range(0, self.max_retries):
+            attempt_results = self.executor.run([
+                ZoneActionOnTarget(self.executor, self.context, self.zone,
+                                   targets[i], attempt=retry + 1)
+                for i in pending
+            ], delay=self.retry_interval if retry else 0)
+
+            for i, result in zip(pending, attempt_results):
+                results[i] = result
+            pending = [i for i in pending if results[i] is not True]
+            if not pending:
+                break
+
         return results
 
     def _update_status(self):
@@ -214,12 +239,6 @@ class ZoneAction(base.Task):
         self.action = action
         self.task_name = 'ZoneAction-%s' % self.action.title()
 
-    def _wait_for_nameservers(self):
-        """
-        Pause to give the nameservers a chance to update
-        """
-        time.sleep(self.delay)
-
     def _zone_action_on_targets(self):
         actor = ZoneActor(
             self.executor, self.context, self.pool, self.zone
@@ -227,7 +246,9 @@ class ZoneAction(base.Task):
         return actor()
 
     def _poll_for_zone(self):
-        poller = ZonePoller(self.executor, self.context, self.pool, self.zone)
+        # Give the nameservers a chance to update before the first poll.
+        poller = ZonePoller(self.executor, self.context, self.pool, self.zone,
+                            first_poll_delay=self.delay)
         return poller()
 
     def __call__(self):
@@ -237,8 +258,6 @@ class ZoneAction(base.Task):
         if not self._zone_action_on_targets():
             return False
 
-        self._wait_for_nameservers()
-
         if self.action == 'DELETE':
             self.zone.serial = 0
 
@@ -252,7 +271,7 @@ class ZoneAction(base.Task):
 # Zone Polling
 ##############
 
-DNSQueryResult = namedtuple(
+DNSQueryResult = collections.namedtuple(
     'DNSQueryResult', [
         'positives',
         'no_zones',
@@ -326,7 +345,9 @@ class PollForZone(base.Task):
                   })
 
         try:
-            serial = self._get_serial()
+            with breaker.get_breaker(
+                    '%s:%d' % (self.ns.host, self.ns.port)).call():
+                serial = self._get_serial()
             LOG.debug('Found serial %(serial)d on %(host)s for zone %(zone)s',
                       {
                           'serial': serial,
@@ -335,6 +356,9 @@ class PollForZone(base.Task):
                       })
             return serial
             # TODO(timsim): cache if it's higher than cache
+        except breaker.CircuitOpen as e:
+            LOG.debug('Not polling for zone %(zone)s: %(error)s',
+                      {'zone': self.zone.name, 'error': e})
         except dns.exception.Timeout:
             LOG.info('Timeout polling for serial %(serial)d '
                      '%(host)s for zone %(zone)s',
@@ -364,47 +388,103 @@ class ZonePoller(base.Task, ThresholdMixin):
     :return: Whether the change was successfully polled for on a satisfactory
              number of nameservers in the pool
     """
-    def __init__(self, executor, context, pool, zone):
+    def __init__(self, executor, context, pool, zone, first_poll_delay=0):
         super(ZonePoller, self).__init__(executor)
         self.context = context
         self.pool = pool
         self.zone = zone
+        self.first_poll_delay = first_poll_delay
+        self._propagation = None
 
     def _update_status(self):
         task = UpdateStatus(self.executor, self.context, self.zone)
         task()
 
+    @property
+    def propagation(self):
+        if self._propagation is None:
+            self._propagation = propagation.get_model()
+        return self._propagation
+
+    def _found(self, serial):
+        if serial is None:
+            return False
+        if self.zone.action == 'DELETE':
+            return serial == 0
+        return serial >= self.zone.serial
+
     def _do_poll(self):
         """
         Poll nameservers, compute basic success, return detailed query results
         for further computation. Retry on failure to poll (meet threshold for
         success).
 
+        Each nameserver is polled on its own schedule, from the time changes
+        took to show up on it when poll_adaptive is enabled, until the
+        threshold is met.
+
         :return: a DNSQueryResult object with the results of polling
         """
         nameservers = self.pool.nameservers
-
-        retry_interval = self.retry_interval
-        query_result = DNSQueryResult(0, 0, 0, 0)
-        results = []
-        for retry in range(0, self.max_retries):
-            results = self.executor.run([
-                PollForZone(self.executor, self.zone, ns)
-                for ns in nameservers
-            ])
-
-            query_result = parse_query_results(results, self.zone)
-
-            if self._compare_threshold(query_result.positives, len(results)):
-                LOG.debug('Successful poll for %(zone)s',
-                         {'zone': self.zone.name})
-                break
-
-            LOG.debug('Unsuccessful poll for %(zone)s on attempt %(n)d',
-                      {'zone': self.zone.name, 'n': retry + 1})
-            time.sleep(retry_interval)
-
-        return query_result
+        adaptive = self.config.poll_adaptive
+
+        results = [None] * len(nameservers)
+        attempts = [0] * len(nameservers)
+        last_miss = [0.0] * len(nameservers)
+        pending = {}
+        done = eventlet.queue.LightQueue()
+
+        def poll(i, delay):
+            attempts[i] += 1
+            future = self.executor.start(
+                PollForZone(self.executor, self.zone, nameservers[i]),
+                delay=delay, lane=processing.POLL)[0]
+            future.add_done_callback(lambda future: done.put((i, future)))
+            pending[i] = future
+
+        start_time = time.time()
+        for i, ns in enumerate(nameservers):
+            delay = self.first_poll_delay
+            if adaptive:
+                delay = self.propagation.first_poll_delay(ns, delay)
+            poll(i, delay)
+
+        while pending:
+            i, future = done.get()
+            del pending[i]
+            results[i] = future.result()
+            elapsed = time.time() - start_time
+            ns = nameservers[i]
+
+            if self._found(results[i]):
+                # The change showed up some time since the last poll which
+                # missed it.
+                self.propagation.observe(ns, (last_miss[i] + elapsed) / 2)
+
+                query_result = parse_query_results(results, self.zone)
+                if self._compare_threshold(query_result.positives,
+                                           len(results)):
+                    LOG.debug('Successful poll for %(zone)s',
+                              {'zone': self.zone.name})
+                    break
+                continue
+
+            LOG.debug('Unsuccessful poll for %(zone)s on %(ns)s on attempt '
+                      '%(n)d', {'zone': self.zone.name, 'ns': ns,
+                                'n': attempts[i]})
+            last_miss[i] = elapsed
+            if attempts[i] < self.max_retries:
+                delay = self.retry_interval
+                if adaptive:
+                    delay = self.propagation.retry_delay(
+                        ns, attempts[i], elapsed, delay)
+                poll(i, delay)
+
+        # Don't send the polls still waiting for their turn.
+        for future in pending.values():
+            future.cancel()
+
+        return parse_query_results(results, self.zone)
 
     def _on_failure(self, error_status):
         LOG.info('Could not find %(serial)s for %(zone)s on enough '
@@ -527,46 +607,66 @@ class RecoverShard(base.Task):
     Given a beginning and ending shard, create the work to recover any
     zones in an undesirable state within those shards.
 
-    :return: No return value
+    The zones are paged through from marker on, up to the per-run budget of
+    worker_periodic_recovery, so that the next run can resume after them.
+    They are recovered through worker_api, when it is a local worker rather
+    than the worker RPC API they are recovered in the recovery lane of the
+    executor.
+
+    :return: The ID of the zone to resume the recovery after on the next run,
+             None once the shards were gone through
     """
-    def __init__(self, executor, context, begin, end):
+    def __init__(self, executor, context, begin, end, worker_api=None,
+                 marker=None):
         super(RecoverShard, self).__init__(executor)
         self.context = context
         self.begin_shard = begin
         self.end_shard = end
+        self.marker = marker
+        self.next_marker = None
+        self.zones = None
+        self._worker_api = worker_api
 
-    def _get_zones(self):
-        criterion = {
-            'shard': "BETWEEN %s,%s" % (self.begin_shard, self.end_shard),
-            'status': 'ERROR'
-        }
-        error_zones = self.storage.find_zones(self.context, criterion)
+    def find_zones(self):
+        """
+        Find the zones to recover
+
+        :return: The ID of the zone to resume the recovery after on the next
+                 run, None once the shards were gone through
+        """
+        config = CONF['producer_task:worker_periodic_recovery']
 
         # Include things that have been hanging out in PENDING
         # status for longer than they should
         # Generate the current serial, will provide a UTC Unix TS.
-        current = utils.increment_serial()
-        stale_criterion = {
-            'shard': "BETWEEN %s,%s" % (self.begin_shard, self.end_shard),
-            'status': 'PENDING',
-            'serial': "<%s" % (current - self.max_prop_time)
-        }
-
-        stale_zones = self.storage.find_zones(self.context, stale_criterion)
-        if stale_zones:
-            LOG.warning('Found %(len)d zones PENDING for more than %(sec)d '
-                        'seconds', {
-                            'len': len(stale_zones),
-                            'sec': self.max_prop_time
+        max_serial = utils.increment_serial() - self.max_prop_time
+
+        self.zones = []
+        self.next_marker = self.marker
+        while len(self.zones) < config.batch_size:
+            limit = min(config.per_page, config.batch_size - len(self.zones))
+            zones = self.storage.find_recovery_zones(
+                self.context, self.begin_shard, self.end_shard, max_serial,
+                marker=self.next_marker, limit=limit)
+            self.zones.extend(zones)
+
+            if len(zones) < limit:
+                self.next_marker = None
+                break
+            self.next_marker = zones[-1].id
+
+        if self.zones:
+            LOG.warning('Found %(len)d zones to recover in shards %(begin)s '
+                        'to %(end)s', {
+                            'len': len(self.zones),
+                            'begin': self.begin_shard,
+                            'end': self.end_shard
                         })
-            error_zones.extend(stale_zones)
-
-        return error_zones
 
-    def __call__(self):
-        zones = self._get_zones()
+        return self.next_marker
 
-        for zone in zones:
+    def _recover_zone(self, zone):
+        with processing.lane(processing.RECOVERY):
             if zone.action == 'CREATE':
                 self.worker_api.create_zone(self.context, zone)
             elif zone.action == 'UPDATE':
@@ -574,6 +674,19 @@ class RecoverShard(base.Task):
             elif zone.action == 'DELETE':
                 self.worker_api.delete_zone(self.context, zone)
 
+    def __call__(self):
+        if self.zones is None:
+            self.find_zones()
+
+        pool = eventlet.GreenPool(self.config.recovery_threads)
+        for zone in self.zones:
+            metrics.counter('worker.recovery.zones').increment(
+                dimensions={'action': zone.action})
+            pool.spawn_n(self._recover_zone, zone)
+        pool.waitall()
+
+        return self.next_marker
+
 
 ##############
 # Zone Exports
@@ -621,6 +734,15 @@ class ExportZone(base.Task):
                 export.message = 'Zone is too large to export'
                 return export
 
+            try:
+                self._store_export(context, export)
+            except Exception:
+                LOG.exception('Failed to store the export of zone %s',
+                              self.zone.id)
+                export.status = 'ERROR'
+                export.message = 'Failed to store the export'
+                return export
+
             export.location = \
                 'designate://v2/zones/tasks/exports/%(eid)s/export' % \
                 {'eid': export.id}
@@ -633,6 +755,17 @@ class ExportZone(base.Task):
 
         return export
 
+    def _store_export(self, context, export):
+        """Render the zone file as its records are read from the database,
+        and write it to the export store as it is rendered
+        """
+        criterion = {'zone_id': self.zone.id}
+        recordsets = self.storage.find_recordsets_export(
+            context, criterion, stream=True)
+
+        self.export_store.write(export.id, utils.render_template_stream(
+            'export-zone.jinja2', zone=self.zone, recordsets=recordsets))
+
     def __call__(self):
         criterion = {'zone_id': self.zone.id}
         count = self.storage.count_recordsets(self.context, criterion)
@@ -19,6 +19,8 @@ import dns.query
 from oslo_config import cfg
 from oslo_log import log as logging
 
+from designate.worker import dnsclient
+
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 
@@ -61,7 +63,7 @@ def send_dns_msg(dns_message, host, port=53):
     """
     # This can raise some exceptions, but we'll catch them elsewhere
     if not CONF['service:mdns'].all_tcp:
-        return dns.query.udp(
+        return dnsclient.get_client().query(
             dns_message, host, port=port, timeout=10)
     else:
         return dns.query.tcp(